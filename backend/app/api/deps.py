@@ -0,0 +1,30 @@
+"""
+Shared API dependencies
+"""
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from uuid import UUID
+
+from app.core.database import read_session_factory
+
+
+async def get_current_user_id() -> UUID:
+    """Resolve the current user's ID"""
+    # TODO: Get user_id from authenticated user
+    return UUID("00000000-0000-0000-0000-000000000000")  # Placeholder
+
+
+async def get_read_db(user_id: UUID = Depends(get_current_user_id)) -> AsyncSession:
+    """
+    Dependency for read-only endpoints
+    
+    Uses the read replica when DATABASE_REPLICA_URL is set, except right after
+    the user's own writes (see pin_to_primary).
+    """
+    session_factory = await read_session_factory(user_id)
+    async with session_factory() as session:
+        try:
+            yield session
+        finally:
+            # Nothing to commit on a read session; close() rolls back
+            await session.close()
@@ -1,15 +1,24 @@
 """
 Analysis API endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from sqlalchemy import select
+from typing import List, Optional
 from uuid import UUID
 
-from app.core.database import get_db
+from app.core.database import get_db, pin_to_primary
+from app.api.deps import get_current_user_id, get_read_db
+from app.core.responses import fast_response, to_dicts
+from app.models.change_point import ChangePoint
 from app.models.intervention import Intervention
-from app.schemas.analysis import AnalysisResultResponse, InterventionAnalysisResponse
-from app.services.analysis_service import analyze_intervention
+from app.schemas.analysis import (
+    AnalysisResultResponse,
+    ChangePointResponse,
+    InterventionAnalysisResponse,
+    MetricLagScanResponse,
+)
+from app.services.analysis_service import analyze_intervention, analyze_user_interventions, lag_scan
 
 router = APIRouter()
 
@@ -19,6 +28,7 @@ async def run_analysis(
     intervention_id: UUID,
     background_tasks: BackgroundTasks = BackgroundTasks(),
     db: AsyncSession = Depends(get_db),
+    read_db: AsyncSession = Depends(get_read_db),
     # TODO: Add authentication dependency
 ):
     """Run analysis for an intervention"""
@@ -29,8 +39,9 @@ async def run_analysis(
     
     # TODO: Verify user owns this intervention
     
-    # Run analysis
-    results = await analyze_intervention(str(intervention_id), db)
+    # Run analysis (daily series are read from the replica when available)
+    results = await analyze_intervention(str(intervention_id), db, read_db=read_db)
+    await pin_to_primary(intervention.user_id)
     
     # Calculate summary
     significant_count = sum(1 for r in results if r.is_significant)
@@ -53,8 +64,9 @@ async def run_analysis(
 
 @router.get("/interventions/{intervention_id}/results", response_model=List[AnalysisResultResponse])
 async def get_analysis_results(
+    request: Request,
     intervention_id: UUID,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     # TODO: Add authentication dependency
 ):
     """Get existing analysis results for an intervention"""
@@ -66,11 +78,84 @@ async def get_analysis_results(
     # TODO: Verify user owns this intervention
     
     from app.models.analysis_result import AnalysisResult
-    from sqlalchemy import select
     
     result = await db.execute(
         select(AnalysisResult).where(AnalysisResult.intervention_id == intervention_id)
     )
     results = result.scalars().all()
     
-    return results
+    return fast_response(request, to_dicts(results, AnalysisResultResponse))
+
+
+@router.post("/joint", response_model=List[AnalysisResultResponse])
+async def run_joint_analysis(
+    user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
+    read_db: AsyncSession = Depends(get_read_db),
+):
+    """Estimate all of the current user's interventions jointly, one regression per metric"""
+    results = await analyze_user_interventions(str(user_id), db, read_db=read_db)
+    await pin_to_primary(user_id)
+    
+    return [AnalysisResultResponse.model_validate(r) for r in results]
+
+
+@router.get("/interventions/{intervention_id}/lags", response_model=List[MetricLagScanResponse])
+async def scan_lags(
+    request: Request,
+    intervention_id: UUID,
+    max_lag: int = Query(28, ge=0, le=180),
+    db: AsyncSession = Depends(get_read_db),
+    # TODO: Add authentication dependency
+):
+    """Effect size and significance per metric at lags of 0..max_lag days after the start"""
+    intervention = await db.get(Intervention, intervention_id)
+    
+    if not intervention:
+        raise HTTPException(status_code=404, detail="Intervention not found")
+    
+    # TODO: Verify user owns this intervention
+    
+    scans = await lag_scan(str(intervention_id), db, max_lag=max_lag)
+    
+    return fast_response(request, scans)
+
+
+@router.get("/change-points", response_model=List[ChangePointResponse])
+async def list_change_points(
+    request: Request,
+    metric_type: Optional[str] = None,
+    user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """List change points found in the current user's daily series by the nightly scan"""
+    query = select(ChangePoint).where(ChangePoint.user_id == user_id)
+    if metric_type:
+        query = query.where(ChangePoint.metric_type == metric_type)
+    result = await db.execute(query.order_by(ChangePoint.date, ChangePoint.metric_type))
+    
+    return fast_response(request, to_dicts(result.scalars().all(), ChangePointResponse))
+
+
+@router.get("/interventions/{intervention_id}/change-points", response_model=List[ChangePointResponse])
+async def get_intervention_change_points(
+    request: Request,
+    intervention_id: UUID,
+    db: AsyncSession = Depends(get_read_db),
+    # TODO: Add authentication dependency
+):
+    """Get change points suggested as the onset of an intervention's effect, strongest first"""
+    intervention = await db.get(Intervention, intervention_id)
+    
+    if not intervention:
+        raise HTTPException(status_code=404, detail="Intervention not found")
+    
+    # TODO: Verify user owns this intervention
+    
+    result = await db.execute(
+        select(ChangePoint)
+        .where(ChangePoint.intervention_id == intervention_id)
+        .order_by(ChangePoint.score.desc())
+    )
+    
+    return fast_response(request, to_dicts(result.scalars().all(), ChangePointResponse))
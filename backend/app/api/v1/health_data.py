@@ -1,87 +1,203 @@
 """
 Health data API endpoints
 """
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, BackgroundTasks, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from typing import List
+from typing import List, Optional
 from uuid import UUID
-import os
-import aiofiles
-from datetime import date
+from datetime import date, datetime
+import re
 
-from app.core.database import get_db
+from app.core.database import get_db, pin_to_primary
+from app.api.deps import get_current_user_id, get_read_db
 from app.core.config import settings
+from app.core.responses import fast_response, to_dicts
 from app.models.data_import import DataImport
 from app.models.health_metric import HealthMetric
-from app.schemas.data_import import DataImportResponse, DataImportStatusResponse
-from app.schemas.health_metric import DailyMetricResponse
-from app.services.health_data_service import process_health_export
+from app.models.upload_session import UploadSession
+from app.models.workout import Workout
+from app.schemas.data_import import (
+    DataImportResponse,
+    DataImportStatusResponse,
+    UploadSessionCreate,
+    UploadSessionResponse,
+)
+from app.schemas.health_metric import DailyMetricResponse, DenseSampleResponse
+from app.schemas.workout import ActivitySummaryResponse, WorkoutDetailResponse, WorkoutResponse
+from app.services.health_data_service import process_health_export, export_raw_metrics
+from app.services.upload_service import (
+    UploadOffsetError,
+    complete_upload,
+    create_upload_session,
+    export_extension,
+    store_upload,
+    write_upload_chunk,
+)
+from app.utils.profiling import profiling_requested
 
 router = APIRouter()
 
+CONTENT_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+)")
+
 
 @router.post("/upload", response_model=DataImportResponse, status_code=201)
 async def upload_health_data(
+    request: Request,
+    response: Response,
     file: UploadFile = File(...),
     background_tasks: BackgroundTasks = BackgroundTasks(),
+    user_id: UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
-    # TODO: Add authentication dependency
 ):
-    """Upload Apple Health export file"""
-    
-    # Validate file type
-    if not (file.filename.endswith(".xml") or file.filename.endswith(".zip")):
-        raise HTTPException(status_code=400, detail="File must be .xml or .zip")
+    """
+    Upload Apple Health export file
     
-    # Check file size
-    file_size = 0
+    Large exports on flaky connections should use the resumable /uploads
+    endpoints instead. Re-uploading a file that is already imported (or being
+    imported) returns that import with status 200 instead of importing it
+    again. Requests carrying a valid X-Profile-Token header also profile the
+    import.
+    """
     content = await file.read()
-    file_size = len(content) / (1024 * 1024)  # MB
     
-    if file_size > settings.MAX_UPLOAD_SIZE_MB:
-        raise HTTPException(
-            status_code=400,
-            detail=f"File size exceeds maximum of {settings.MAX_UPLOAD_SIZE_MB}MB",
+    try:
+        export_extension(file.filename)
+        import_record, created = await store_upload(
+            user_id, file.filename, content, db, profile=profiling_requested(request.headers)
         )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    # TODO: Get user_id from authenticated user
-    user_id = UUID("00000000-0000-0000-0000-000000000000")  # Placeholder
+    if created:
+        await pin_to_primary(user_id)
+        _start_import(background_tasks, import_record)
+    else:
+        response.status_code = 200
     
-    # Create import record
-    import_record = DataImport(
-        user_id=user_id,
-        filename=file.filename,
-        file_size_mb=file_size,
-        status="pending",
-    )
+    return import_record
+
+
+@router.post("/uploads", response_model=UploadSessionResponse, status_code=201)
+async def create_upload(
+    upload: UploadSessionCreate,
+    user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Start a resumable upload
+    
+    Send the file with PUT /uploads/{id} in chunks carrying a
+    "Content-Range: bytes start-end/size" header, then POST
+    /uploads/{id}/complete. After an interruption, GET /uploads/{id} and
+    continue from received_bytes.
+    """
+    try:
+        export_extension(upload.filename)
+        return await create_upload_session(user_id, upload.filename, upload.size_bytes, db)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/uploads/{upload_id}", response_model=UploadSessionResponse)
+async def get_upload(
+    upload_id: UUID,
+    db: AsyncSession = Depends(get_db),
+    # TODO: Add authentication dependency
+):
+    """Get a resumable upload, including how many bytes have been received"""
+    upload = await db.get(UploadSession, upload_id)
     
-    db.add(import_record)
-    await db.commit()
-    await db.refresh(import_record)
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload not found")
     
-    # Save file temporarily
-    os.makedirs(settings.TEMP_STORAGE_PATH, exist_ok=True)
-    file_path = os.path.join(settings.TEMP_STORAGE_PATH, f"{import_record.id}.zip")
+    return upload
+
+
+@router.put("/uploads/{upload_id}", response_model=UploadSessionResponse)
+async def upload_chunk(
+    request: Request,
+    upload_id: UUID,
+    db: AsyncSession = Depends(get_db),
+    # TODO: Add authentication dependency
+):
+    """Store one chunk of a resumable upload at the offset given by Content-Range"""
+    upload = await db.get(UploadSession, upload_id)
     
-    async with aiofiles.open(file_path, "wb") as f:
-        await f.write(content)
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload not found")
     
-    # Process in background
+    match = CONTENT_RANGE.fullmatch(request.headers.get("content-range", ""))
+    if not match:
+        raise HTTPException(status_code=400, detail="Content-Range header must be 'bytes start-end/size'")
+    start, end, total = (int(group) for group in match.groups())
+    if total != upload.size_bytes or end < start:
+        raise HTTPException(status_code=400, detail="Content-Range doesn't match the upload")
+    if end - start + 1 > settings.UPLOAD_CHUNK_MAX_MB * 1024 * 1024:
+        raise HTTPException(status_code=413, detail=f"Chunks are limited to {settings.UPLOAD_CHUNK_MAX_MB}MB")
+    
+    data = await request.body()
+    if len(data) != end - start + 1:
+        raise HTTPException(status_code=400, detail="Body length doesn't match Content-Range")
+    
+    try:
+        return await write_upload_chunk(upload_id, start, data, db)
+    except UploadOffsetError as e:
+        raise HTTPException(status_code=409, detail=str(e), headers={"Upload-Offset": str(e.received_bytes)})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/uploads/{upload_id}/complete", response_model=DataImportResponse, status_code=201)
+async def complete_upload_session(
+    request: Request,
+    response: Response,
+    upload_id: UUID,
+    background_tasks: BackgroundTasks = BackgroundTasks(),
+    db: AsyncSession = Depends(get_db),
+    # TODO: Add authentication dependency
+):
+    """
+    Finish a resumable upload and start importing it
+    
+    As with /upload, a duplicate of an existing import returns that import
+    with status 200, as does completing an upload again.
+    """
+    upload = await db.get(UploadSession, upload_id)
+    
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    
+    try:
+        import_record, created = await complete_upload(upload_id, db, profile=profiling_requested(request.headers))
+    except UploadOffsetError as e:
+        raise HTTPException(status_code=409, detail=f"Upload incomplete: {e.received_bytes} of {upload.size_bytes} bytes received")
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    if created:
+        await pin_to_primary(import_record.user_id)
+        _start_import(background_tasks, import_record)
+    else:
+        response.status_code = 200
+    
+    return import_record
+
+
+def _start_import(background_tasks: BackgroundTasks, import_record: DataImport):
     # Note: For production, use Celery task instead of BackgroundTasks
     # For now, we'll process synchronously in background task
     background_tasks.add_task(
         process_health_export_async,
-        file_path,
-        str(user_id),
+        import_record.storage_key,
+        str(import_record.user_id),
         str(import_record.id),
     )
-    
-    return import_record
 
 
 async def process_health_export_async(
-    file_path: str,
+    storage_key: str,
     user_id: str,
     import_id: str,
 ):
@@ -90,7 +206,7 @@ async def process_health_export_async(
     
     async with AsyncSessionLocal() as db:
         try:
-            await process_health_export(file_path, user_id, import_id, db)
+            await process_health_export(storage_key, user_id, import_id, db)
         except Exception as e:
             print(f"Error processing health export: {e}")
             # Update import record with error
@@ -99,21 +215,15 @@ async def process_health_export_async(
                 import_record.status = "failed"
                 import_record.error_message = str(e)
                 await db.commit()
-        finally:
-            # Clean up file
-            if os.path.exists(file_path):
-                os.remove(file_path)
 
 
 @router.get("/imports", response_model=List[DataImportResponse])
 async def list_imports(
-    db: AsyncSession = Depends(get_db),
-    # TODO: Add authentication dependency
+    request: Request,
+    user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """List all data imports for the current user"""
-    # TODO: Get user_id from authenticated user
-    user_id = UUID("00000000-0000-0000-0000-000000000000")  # Placeholder
-    
     result = await db.execute(
         select(DataImport)
         .where(DataImport.user_id == user_id)
@@ -121,13 +231,13 @@ async def list_imports(
     )
     imports = result.scalars().all()
     
-    return imports
+    return fast_response(request, to_dicts(imports, DataImportResponse))
 
 
 @router.get("/imports/{import_id}", response_model=DataImportResponse)
 async def get_import_status(
     import_id: UUID,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     # TODO: Add authentication dependency
 ):
     """Get status of a data import"""
@@ -143,24 +253,127 @@ async def get_import_status(
 
 @router.get("/metrics", response_model=List[DailyMetricResponse])
 async def get_metrics(
+    request: Request,
     metric_type: str,
     start_date: date,
     end_date: date,
-    db: AsyncSession = Depends(get_db),
-    # TODO: Add authentication dependency
+    resolution: str = Query("auto", pattern="^(auto|daily|weekly|monthly|lttb)$"),
+    max_points: Optional[int] = Query(None, ge=3, le=5000),
+    user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    """Get daily aggregated metrics for a date range"""
-    # TODO: Get user_id from authenticated user
-    user_id = UUID("00000000-0000-0000-0000-000000000000")  # Placeholder
+    """
+    Get aggregated metrics for a date range
     
-    from app.services.health_data_service import get_daily_metrics
+    Long ranges are bucketed weekly/monthly or LTTB-downsampled so the response
+    never exceeds max_points (defaults to METRICS_MAX_POINTS).
+    """
+    from app.services.health_data_service import get_timeline_metrics
     
-    metrics = await get_daily_metrics(
+    metrics = await get_timeline_metrics(
         str(user_id),
         metric_type,
         start_date,
         end_date,
         db,
+        resolution=resolution,
+        max_points=max_points or settings.METRICS_MAX_POINTS,
     )
     
-    return metrics
+    # Dicts are built by the service in DailyMetricResponse shape
+    return fast_response(request, metrics)
+
+
+@router.get("/samples", response_model=List[DenseSampleResponse])
+async def get_samples(
+    request: Request,
+    metric_type: str,
+    start: datetime,
+    end: datetime,
+    max_points: Optional[int] = Query(None, ge=3, le=20000),
+    user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Get individual samples of a high-frequency metric (e.g. heart_rate)
+    
+    Intended for intraday charts; samples are LTTB-downsampled to max_points
+    (defaults to METRICS_MAX_POINTS).
+    """
+    from app.services.dense_metric_service import get_dense_samples, is_dense_metric
+    from app.utils.downsampling import lttb
+    
+    if not is_dense_metric(metric_type):
+        raise HTTPException(status_code=400, detail=f"{metric_type} is not a high-frequency metric")
+    
+    samples = await get_dense_samples(str(user_id), metric_type, start, end, db)
+    return fast_response(
+        request,
+        lttb(samples, max_points or settings.METRICS_MAX_POINTS, x_key="timestamp", y_key="value"),
+    )
+
+
+@router.get("/workouts", response_model=List[WorkoutResponse])
+async def list_workouts(
+    start_date: date,
+    end_date: date,
+    activity_type: Optional[str] = None,
+    user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Get workouts on local days start_date..end_date (routes via /workouts/{id})"""
+    from app.services.workout_service import get_workouts
+    
+    return await get_workouts(str(user_id), start_date, end_date, db, activity_type=activity_type)
+
+
+@router.get("/workouts/{workout_id}", response_model=WorkoutDetailResponse)
+async def get_workout(
+    workout_id: UUID,
+    user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Get a workout with its route as an encoded polyline"""
+    workout = await db.get(Workout, workout_id)
+    
+    if not workout or workout.user_id != user_id:
+        raise HTTPException(status_code=404, detail="Workout not found")
+    
+    return workout
+
+
+@router.get("/activity-summaries", response_model=List[ActivitySummaryResponse])
+async def list_activity_summaries(
+    start_date: date,
+    end_date: date,
+    user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Get daily activity rings (move, exercise, stand) and their goals"""
+    from app.services.workout_service import get_activity_summaries
+    
+    return await get_activity_summaries(str(user_id), start_date, end_date, db)
+
+
+@router.get("/export")
+async def export_metrics(
+    metric_type: str,
+    start: datetime,
+    end: datetime,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    user_id: UUID = Depends(get_current_user_id),
+):
+    """
+    Stream raw health metric samples as NDJSON or CSV
+    
+    Rows are read through a server-side cursor and written as they arrive, so
+    memory use is constant however many samples are exported.
+    """
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"{metric_type}-{start.date().isoformat()}-{end.date().isoformat()}.{format}"
+    
+    return StreamingResponse(
+        export_raw_metrics(str(user_id), metric_type, start, end, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
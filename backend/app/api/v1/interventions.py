@@ -1,13 +1,15 @@
 """
 Intervention API endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from typing import List
 from uuid import UUID
 
-from app.core.database import get_db
+from app.core.database import get_db, pin_to_primary
+from app.api.deps import get_current_user_id, get_read_db
+from app.core.responses import fast_response, to_dicts
 from app.models.intervention import Intervention
 from app.schemas.intervention import (
     InterventionCreate,
@@ -21,14 +23,10 @@ router = APIRouter()
 @router.post("", response_model=InterventionResponse, status_code=201)
 async def create_intervention(
     intervention: InterventionCreate,
+    user_id: UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
-    # TODO: Add authentication dependency
-    # current_user: User = Depends(get_current_user),
 ):
     """Create a new intervention"""
-    # TODO: Get user_id from authenticated user
-    user_id = UUID("00000000-0000-0000-0000-000000000000")  # Placeholder
-    
     new_intervention = Intervention(
         user_id=user_id,
         **intervention.model_dump(),
@@ -37,31 +35,30 @@ async def create_intervention(
     db.add(new_intervention)
     await db.commit()
     await db.refresh(new_intervention)
+    await pin_to_primary(user_id)
     
     return new_intervention
 
 
 @router.get("", response_model=List[InterventionResponse])
 async def list_interventions(
-    db: AsyncSession = Depends(get_db),
-    # TODO: Add authentication dependency
+    request: Request,
+    user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """List all interventions for the current user"""
-    # TODO: Get user_id from authenticated user
-    user_id = UUID("00000000-0000-0000-0000-000000000000")  # Placeholder
-    
     result = await db.execute(
         select(Intervention).where(Intervention.user_id == user_id).order_by(Intervention.start_date.desc())
     )
     interventions = result.scalars().all()
     
-    return interventions
+    return fast_response(request, to_dicts(interventions, InterventionResponse))
 
 
 @router.get("/{intervention_id}", response_model=InterventionResponse)
 async def get_intervention(
     intervention_id: UUID,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     # TODO: Add authentication dependency
 ):
     """Get a specific intervention"""
@@ -97,6 +94,7 @@ async def update_intervention(
     
     await db.commit()
     await db.refresh(intervention)
+    await pin_to_primary(intervention.user_id)
     
     return intervention
 
@@ -117,5 +115,6 @@ async def delete_intervention(
     
     await db.delete(intervention)
     await db.commit()
+    await pin_to_primary(intervention.user_id)
     
     return None
@@ -3,10 +3,11 @@ Main API router
 """
 from fastapi import APIRouter
 
-from app.api.v1 import interventions, health_data, analysis
+from app.api.v1 import interventions, health_data, analysis, users
 
 api_router = APIRouter()
 
 api_router.include_router(interventions.router, prefix="/interventions", tags=["interventions"])
 api_router.include_router(health_data.router, prefix="/health-data", tags=["health-data"])
 api_router.include_router(analysis.router, prefix="/analysis", tags=["analysis"])
+api_router.include_router(users.router, prefix="/users", tags=["users"])
@@ -0,0 +1,74 @@
+"""
+User API endpoints
+"""
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from uuid import UUID
+
+from app.core.database import get_db, pin_to_primary
+from app.api.deps import get_current_user_id, get_read_db
+from app.models.user import User
+from app.schemas.user import UserResponse, UserUpdate
+
+router = APIRouter()
+
+
+@router.get("/me", response_model=UserResponse)
+async def get_me(
+    user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Get the current user"""
+    user = await db.get(User, user_id)
+    
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    return user
+
+
+@router.patch("/me", response_model=UserResponse)
+async def update_me(
+    user_update: UserUpdate,
+    background_tasks: BackgroundTasks,
+    user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Update the current user
+    
+    Changing timezone re-buckets the user's samples into their new local days
+    in the background.
+    """
+    user = await db.get(User, user_id)
+    
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    timezone_changed = (
+        "timezone" in user_update.model_fields_set and user_update.timezone != user.timezone
+    )
+    
+    for field, value in user_update.model_dump(exclude_unset=True).items():
+        setattr(user, field, value)
+    
+    await db.commit()
+    await db.refresh(user)
+    await pin_to_primary(user_id)
+    
+    if timezone_changed:
+        background_tasks.add_task(rebucket_local_days_async, str(user_id))
+    
+    return user
+
+
+async def rebucket_local_days_async(user_id: str):
+    """Async wrapper for background re-bucketing"""
+    from app.core.database import AsyncSessionLocal
+    from app.services.health_data_service import rebucket_local_days
+    
+    async with AsyncSessionLocal() as db:
+        try:
+            await rebucket_local_days(user_id, db)
+        except Exception as e:
+            print(f"Error re-bucketing local days for user {user_id}: {e}")
@@ -0,0 +1,196 @@
+"""
+Two-level cache for daily metric series
+
+Level 1 is an in-process LRU bounded by the bytes it holds; level 2 is the
+shared Redis. Both store packed series (app.utils.series_encoding) under keys
+that include the user's data version, so invalidating a user is a single
+INCR: their old entries are never read again and age out (LRU / TTL).
+
+Concurrent misses for the same key are collapsed: within a process they wait
+on one load, and across processes a short Redis lock lets one loader run while
+the others poll for its result. Any Redis error falls back to loading from
+the database, and Redis (and with it the cache) is skipped for a while
+after one.
+"""
+import asyncio
+from collections import OrderedDict
+from time import monotonic
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import DAILY_SERIES_CACHE_REQUESTS_TOTAL
+
+# How long Redis is bypassed after an error
+REDIS_RETRY_SECONDS = 30.0
+# How long a miss waits for another process's load before loading itself
+LOCK_WAIT_SECONDS = 2.0
+LOCK_POLL_SECONDS = 0.05
+
+
+class _LRU:
+    """Byte-size bounded LRU of packed values"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries: "OrderedDict[str, bytes]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[bytes]:
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: bytes):
+        if len(value) > self.max_bytes:
+            return
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.size -= len(old)
+        self.entries[key] = value
+        self.size += len(value)
+        while self.size > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= len(evicted)
+
+
+class SeriesCache:
+    """Read-through cache of packed values keyed by user and a caller-chosen key"""
+
+    def __init__(self, namespace: str, max_bytes: int, ttl_seconds: int, version_ttl_seconds: float):
+        self.namespace = namespace
+        self.local = _LRU(max_bytes)
+        self.ttl_seconds = ttl_seconds
+        self.version_ttl_seconds = version_ttl_seconds
+        self._versions: Dict[str, Tuple[int, float]] = {}  # user -> (version, fetched at)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._redis_down_until = 0.0
+
+    def _redis(self):
+        if monotonic() < self._redis_down_until:
+            return None
+        from app.core.redis import get_redis
+        return get_redis()
+
+    def _redis_failed(self, action: str, e: Exception):
+        print(f"Error {action} in Redis, bypassing it for {REDIS_RETRY_SECONDS:.0f}s: {e}")
+        self._redis_down_until = monotonic() + REDIS_RETRY_SECONDS
+
+    def _version_key(self, user_id: str) -> str:
+        return f"cache:{self.namespace}:version:{user_id}"
+
+    async def _version(self, user_id: str) -> Optional[int]:
+        """
+        User's data version, re-read from Redis at most every version_ttl_seconds
+        
+        None while Redis is unavailable: invalidations from other processes
+        can't be seen then, so nothing should be served from cache.
+        """
+        cached = self._versions.get(user_id)
+        if cached and monotonic() - cached[1] < self.version_ttl_seconds:
+            return cached[0]
+        redis = self._redis()
+        if redis is None:
+            return None
+        try:
+            version = int(await redis.get(self._version_key(user_id)) or 0)
+        except Exception as e:
+            self._redis_failed("reading the cache version", e)
+            return None
+        self._versions[user_id] = (version, monotonic())
+        return version
+
+    async def invalidate_user(self, user_id: str):
+        """
+        Make every cached entry of the user stale, in all processes
+        
+        Always tries Redis, even while reads bypass it: a skipped bump would
+        leave other processes serving the old series until they expire.
+        """
+        self._versions.pop(user_id, None)
+        from app.core.redis import get_redis
+        try:
+            version = int(await get_redis().incr(self._version_key(user_id)))
+        except Exception as e:
+            self._redis_failed("bumping the cache version", e)
+            return
+        self._redis_down_until = 0.0
+        self._versions[user_id] = (version, monotonic())
+
+    async def get_or_load(self, user_id: str, key: str, load: Callable[[], Awaitable[bytes]]) -> bytes:
+        """Packed value for (user_id, key), calling load() on a miss at both levels"""
+        version = await self._version(user_id)
+        if version is None:
+            DAILY_SERIES_CACHE_REQUESTS_TOTAL.labels("miss").inc()
+            return await load()
+        full_key = f"cache:{self.namespace}:{user_id}:{version}:{key}"
+
+        value = self.local.get(full_key)
+        if value is not None:
+            DAILY_SERIES_CACHE_REQUESTS_TOTAL.labels("local").inc()
+            return value
+
+        inflight = self._inflight.get(full_key)
+        if inflight is not None:
+            DAILY_SERIES_CACHE_REQUESTS_TOTAL.labels("coalesced").inc()
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[full_key] = future
+        try:
+            value = await self._load_shared(full_key, load)
+            self.local.put(full_key, value)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else was waiting
+            raise
+        finally:
+            del self._inflight[full_key]
+
+    async def _load_shared(self, full_key: str, load: Callable[[], Awaitable[bytes]]) -> bytes:
+        """Redis, else load() under a cross-process lock"""
+        redis = self._redis()
+        if redis is None:
+            DAILY_SERIES_CACHE_REQUESTS_TOTAL.labels("miss").inc()
+            return await load()
+
+        lock_key = f"{full_key}:lock"
+        try:
+            value = await redis.get(full_key)
+            if value is not None:
+                DAILY_SERIES_CACHE_REQUESTS_TOTAL.labels("redis").inc()
+                return value
+
+            locked = await redis.set(lock_key, 1, nx=True, ex=int(LOCK_WAIT_SECONDS) + 1)
+            if not locked:
+                # Another process is loading this key; wait for its result
+                deadline = monotonic() + LOCK_WAIT_SECONDS
+                while monotonic() < deadline:
+                    await asyncio.sleep(LOCK_POLL_SECONDS)
+                    value = await redis.get(full_key)
+                    if value is not None:
+                        DAILY_SERIES_CACHE_REQUESTS_TOTAL.labels("redis").inc()
+                        return value
+        except Exception as e:
+            self._redis_failed("reading the cache", e)
+            DAILY_SERIES_CACHE_REQUESTS_TOTAL.labels("miss").inc()
+            return await load()
+
+        DAILY_SERIES_CACHE_REQUESTS_TOTAL.labels("miss").inc()
+        value = await load()
+        try:
+            await redis.set(full_key, value, ex=self.ttl_seconds)
+            await redis.delete(lock_key)
+        except Exception as e:
+            self._redis_failed("writing the cache", e)
+        return value
+
+
+daily_series_cache = SeriesCache(
+    "daily",
+    max_bytes=settings.METRICS_CACHE_LOCAL_MB * 1024 * 1024,
+    ttl_seconds=settings.METRICS_CACHE_TTL_SECONDS,
+    version_ttl_seconds=settings.METRICS_CACHE_VERSION_TTL_SECONDS,
+)
@@ -11,19 +11,62 @@ class Settings(BaseSettings):
     # Database
     DATABASE_URL: str
     TIMESCALEDB_ENABLED: bool = True
+    TIMESCALEDB_SPACE_PARTITIONS: int = 0  # hash partitions on user_id for health_metrics, 0 = time only
+    TIMESCALEDB_CHUNK_INTERVAL_DAYS: int = 0  # 0 = auto (7 days, 28 with space partitioning)
+    TIMESCALEDB_COMPRESS_AFTER_DAYS: int = 7
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: int = 30  # seconds to wait for a connection
+    DB_POOL_RECYCLE: int = 1800  # seconds before a connection is replaced
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100  # asyncpg prepared statements per connection, 0 for pgbouncer
+    DB_ECHO: bool = False
+    DATABASE_REPLICA_URL: str = ""  # optional read replica for GET endpoints
+    REPLICA_PIN_SECONDS: int = 60  # read a user's data from the primary this long after they write
+    
+    # Retention tiers: raw samples -> hourly rollups -> daily rollups (0 = keep forever).
+    # Once enabled, keep it enabled: reads only consult the rollups while it is on
+    RAW_RETENTION_DAYS: int = 0
+    HOURLY_RETENTION_DAYS: int = 365
+    
+    # Analysis: nightly change-point scan of every user's daily series
+    CHANGE_POINT_MIN_DAYS: int = 7  # shortest level the scan reports
+    CHANGE_POINT_PENALTY: float = 3.0  # a shift must cut squared error by this * log(days) noise variances
+    CHANGE_POINT_MATCH_DAYS: int = 30  # link a shift to an intervention starting this close to it
+    
+    # Scheduled recompute of analyses for users whose data changed; runs every
+    # 15 minutes during ANALYSIS_RECOMPUTE_HOURS (crontab hour field, UTC)
+    ANALYSIS_RECOMPUTE_HOURS: str = "1-5"
+    ANALYSIS_RECOMPUTE_MAX_USERS: int = 100  # per run
+    ANALYSIS_RECOMPUTE_MAX_SECONDS: int = 600  # stop starting new users after this long
+    ANALYSIS_RECOMPUTE_PAUSE_SECONDS: float = 1.0  # idle time between users, to leave the DB headroom
     
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
     
+    # Daily series cache: in-process LRU in front of Redis, invalidated per
+    # user when an import completes
+    METRICS_CACHE_ENABLED: bool = True
+    METRICS_CACHE_LOCAL_MB: int = 64  # per process
+    METRICS_CACHE_TTL_SECONDS: int = 86400  # Redis entries
+    METRICS_CACHE_VERSION_TTL_SECONDS: float = 2.0  # how stale another process's invalidation can be
+    
     # Supabase
     SUPABASE_URL: str
     SUPABASE_ANON_KEY: str
     SUPABASE_SERVICE_ROLE_KEY: str
     
-    # Storage
-    STORAGE_PROVIDER: str = "supabase"
-    TEMP_STORAGE_PATH: str = "/tmp/health-uploads"
+    # Storage (uploads are handed to import workers by storage key)
+    STORAGE_PROVIDER: str = "local"  # see app.core.storage.STORAGE_BACKENDS
+    STORAGE_LOCAL_PATH: str = "storage"  # must be shared by the API and workers
     MAX_UPLOAD_SIZE_MB: int = 500
+    UPLOAD_CHUNK_MAX_MB: int = 16  # largest chunk accepted by PUT /health-data/uploads/{id}
+    UPLOAD_SESSION_TTL_HOURS: int = 24  # unfinished resumable uploads are dropped after this
+    IMPORT_STALE_HOURS: int = 6  # a re-upload replaces a pending/processing import older than this
+    ROUTE_IMPORT_WORKERS: int = 4  # threads parsing workout-routes/*.gpx during an import
+    
+    # Charts
+    METRICS_MAX_POINTS: int = 500
     
     # Celery
     CELERY_BROKER_URL: str = "redis://localhost:6379/0"
@@ -43,6 +86,14 @@ class Settings(BaseSettings):
     
     # Monitoring
     SENTRY_DSN: str = ""
+    METRICS_CELERY_QUEUES: List[str] = ["celery"]
+    CELERY_METRICS_PORT: int = 9808  # Prometheus endpoint served by each Celery worker
+    
+    # Profiling (off by default; requests opt in with the X-Profile-Token header)
+    PROFILING_ENABLED: bool = False
+    PROFILING_TOKEN: str = ""
+    PROFILING_OUTPUT_DIR: str = "/tmp/profiles"
+    PROFILING_INTERVAL_MS: float = 5.0
     ENVIRONMENT: str = "development"
     
     # CORS
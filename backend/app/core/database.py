@@ -1,21 +1,96 @@
 """
 Database configuration and session management
 """
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker, AsyncEngine
 from sqlalchemy.orm import declarative_base
-from sqlalchemy import event, text
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy import event, text, exc
+from time import perf_counter
+from typing import Optional
 from app.core.config import settings
+from app.core.metrics import (
+    DB_POOL_CHECKOUT_SECONDS,
+    DB_POOL_CHECKED_OUT,
+    DB_POOL_OVERFLOW_TOTAL,
+    DB_POOL_TIMEOUTS_TOTAL,
+)
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that reports checkout wait time, usage and overflow"""
+    metrics_label = "primary"
+    
+    def connect(self):
+        start = perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            DB_POOL_TIMEOUTS_TOTAL.labels(self.metrics_label).inc()
+            raise
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.labels(self.metrics_label).observe(perf_counter() - start)
+            DB_POOL_CHECKED_OUT.labels(self.metrics_label).set(self.checkedout())
+    
+    def recreate(self):
+        new_pool = super().recreate()
+        new_pool.metrics_label = self.metrics_label
+        return new_pool
+    
+    def _inc_overflow(self):
+        created = super()._inc_overflow()
+        if created and self._overflow > 0:
+            DB_POOL_OVERFLOW_TOTAL.labels(self.metrics_label).inc()
+        return created
+
+
+def create_engine_from_url(url: str, label: str) -> AsyncEngine:
+    """Create an instrumented async engine using the pool settings"""
+    # Replace postgresql:// with postgresql+asyncpg:// for async support
+    if url.startswith("postgresql://"):
+        url = url.replace("postgresql://", "postgresql+asyncpg://")
+    
+    new_engine = create_async_engine(
+        url,
+        echo=settings.DB_ECHO,
+        future=True,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args={"prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE},
+    )
+    
+    pool = new_engine.sync_engine.pool
+    pool.metrics_label = label
+    
+    @event.listens_for(pool, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        DB_POOL_CHECKED_OUT.labels(label).set(pool.checkedout())
+    
+    return new_engine
+
+
+def pool_status(db_engine: AsyncEngine) -> dict:
+    """Snapshot of an engine's connection pool usage"""
+    pool = db_engine.sync_engine.pool
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "idle": pool.checkedin(),
+    }
+
 
 # Create async engine
-# Replace postgresql:// with postgresql+asyncpg:// for async support
-database_url = settings.DATABASE_URL
-if database_url.startswith("postgresql://"):
-    database_url = database_url.replace("postgresql://", "postgresql+asyncpg://")
-
-engine = create_async_engine(
-    database_url,
-    echo=settings.ENVIRONMENT == "development",
-    future=True,
+engine = create_engine_from_url(settings.DATABASE_URL, "primary")
+
+# Optional read replica
+replica_engine: Optional[AsyncEngine] = (
+    create_engine_from_url(settings.DATABASE_REPLICA_URL, "replica")
+    if settings.DATABASE_REPLICA_URL
+    else None
 )
 
 # Create session factory
@@ -27,6 +102,18 @@ AsyncSessionLocal = async_sessionmaker(
     autoflush=False,
 )
 
+ReplicaSessionLocal = (
+    async_sessionmaker(
+        replica_engine,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        autocommit=False,
+        autoflush=False,
+    )
+    if replica_engine is not None
+    else None
+)
+
 # Base class for models
 Base = declarative_base()
 
@@ -34,31 +121,20 @@ Base = declarative_base()
 async def init_timescaledb():
     """Initialize TimescaleDB extension and create hypertable"""
     if settings.TIMESCALEDB_ENABLED:
-        async with engine.begin() as conn:
-            # Enable TimescaleDB extension
-            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS timescaledb;"))
-            
-            # Create hypertable if it doesn't exist
-            try:
-                await conn.execute(text(
-                    "SELECT create_hypertable('health_metrics', 'timestamp', "
-                    "chunk_time_interval => INTERVAL '7 days', "
-                    "if_not_exists => TRUE);"
-                ))
-            except Exception:
-                # Hypertable might already exist or table doesn't exist yet
-                pass
-            
-            # Enable compression
-            try:
-                await conn.execute(text(
-                    "ALTER TABLE health_metrics SET ("
-                    "timescaledb.compress, "
-                    "timescaledb.compress_segmentby = 'user_id, metric_type'"
-                    ");"
-                ))
-            except Exception:
-                pass
+        from app.core.timescale import setup_timescaledb
+        await setup_timescaledb(engine)
+
+
+async def dispose_engines():
+    """
+    Close every pooled connection (application shutdown, end of a Celery task)
+    
+    asyncpg connections belong to the event loop that opened them, and each
+    Celery task runs its own loop, so tasks must not leave any in the pool.
+    """
+    await engine.dispose()
+    if replica_engine is not None:
+        await replica_engine.dispose()
 
 
 async def get_db() -> AsyncSession:
@@ -72,3 +148,42 @@ async def get_db() -> AsyncSession:
             raise
         finally:
             await session.close()
+
+
+def _pin_key(user_id) -> str:
+    return f"db:primary-pin:{user_id}"
+
+
+async def pin_to_primary(user_id):
+    """
+    Route a user's reads to the primary for REPLICA_PIN_SECONDS
+    
+    Call after committing a user's writes so they read their own fresh data
+    while the replica catches up.
+    """
+    if replica_engine is None:
+        return
+    
+    from app.core.redis import get_redis
+    
+    try:
+        await get_redis().set(_pin_key(user_id), 1, ex=settings.REPLICA_PIN_SECONDS)
+    except Exception as e:
+        print(f"Error pinning user {user_id} to primary: {e}")
+
+
+async def read_session_factory(user_id) -> async_sessionmaker:
+    """Pick the session factory for a user's read-only queries"""
+    if ReplicaSessionLocal is None:
+        return AsyncSessionLocal
+    
+    from app.core.redis import get_redis
+    
+    try:
+        pinned = await get_redis().exists(_pin_key(user_id))
+    except Exception:
+        # Can't tell whether the replica is fresh enough, so play it safe
+        pinned = True
+    
+    return AsyncSessionLocal if pinned else ReplicaSessionLocal
+
@@ -0,0 +1,194 @@
+"""
+Prometheus metrics
+
+Set PROMETHEUS_MULTIPROC_DIR (to an empty, writable directory) when running
+several uvicorn or Celery worker processes so every process's samples are
+aggregated at scrape time.
+"""
+import os
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Dict
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# API
+HTTP_REQUEST_DURATION_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+# Database connection pool
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_seconds",
+    "Time spent waiting to check a connection out of the pool",
+    ["pool"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Connections currently checked out of the pool",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW_TOTAL = Counter(
+    "db_pool_overflow_total",
+    "Connections opened beyond pool_size (overflow)",
+    ["pool"],
+)
+DB_POOL_TIMEOUTS_TOTAL = Counter(
+    "db_pool_timeouts_total",
+    "Checkouts that timed out waiting for a connection",
+    ["pool"],
+)
+
+# Import pipeline
+IMPORTS_TOTAL = Counter(
+    "health_imports_total",
+    "Health data imports by final status",
+    ["status"],
+)
+IMPORT_RECORDS_TOTAL = Counter(
+    "health_import_records_total",
+    "Health metric rows written by imports",
+)
+IMPORT_RECORDS_PER_SECOND = Gauge(
+    "health_import_records_per_second",
+    "Throughput of the most recently finished import",
+    multiprocess_mode="livemax",
+)
+IMPORT_DURATION_SECONDS = Histogram(
+    "health_import_duration_seconds",
+    "Wall-clock time of a whole import",
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600),
+)
+IMPORT_STAGE_SECONDS = Histogram(
+    "health_import_stage_seconds",
+    "Time per import spent in each pipeline stage (parse, transform, insert)",
+    ["stage"],
+    buckets=(0.1, 0.5, 1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800),
+)
+IMPORT_BATCH_COMMIT_SECONDS = Histogram(
+    "health_import_batch_commit_seconds",
+    "Latency of one batch insert + commit",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
+# Celery
+CELERY_TASK_DURATION_SECONDS = Histogram(
+    "celery_task_duration_seconds",
+    "Celery task run time",
+    ["task", "state"],
+    buckets=(0.1, 0.5, 1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800),
+)
+CELERY_QUEUE_DEPTH = Gauge(
+    "celery_queue_depth",
+    "Messages waiting in a Celery queue",
+    ["queue"],
+    multiprocess_mode="livemax",
+)
+
+# Analysis
+ANALYSIS_DURATION_SECONDS = Histogram(
+    "analysis_duration_seconds",
+    "Time to compute an analysis",
+    ["analysis"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+
+DAILY_SERIES_CACHE_REQUESTS_TOTAL = Counter(
+    "daily_series_cache_requests_total",
+    "Daily series reads by where they were served from",
+    ["result"],  # local, coalesced, redis, miss
+)
+
+
+class StageTimer:
+    """Accumulate wall-clock time per named stage"""
+
+    def __init__(self):
+        self.totals: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, perf_counter() - start)
+
+    def add(self, name: str, seconds: float):
+        self.totals[name] = self.totals.get(name, 0.0) + seconds
+
+
+class PrometheusMiddleware:
+    """ASGI middleware recording request latency per route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Label by route template (/interventions/{intervention_id}), not raw path
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION_SECONDS.labels(
+                scope["method"],
+                route.path if route is not None else "unmatched",
+                str(status),
+            ).observe(perf_counter() - start)
+
+
+def metrics_registry() -> CollectorRegistry:
+    """Registry to expose: aggregated across processes in multiprocess mode"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def render_metrics() -> bytes:
+    """Render all metrics in the Prometheus text format"""
+    return generate_latest(metrics_registry())
+
+
+async def update_queue_depths(queues):
+    """Refresh the Celery queue depth gauges from the Redis broker"""
+    from app.core.config import settings
+    import redis.asyncio as aioredis
+
+    client = aioredis.from_url(settings.CELERY_BROKER_URL)
+    try:
+        for queue in queues:
+            CELERY_QUEUE_DEPTH.labels(queue).set(await client.llen(queue))
+    finally:
+        await client.close()
+
+
+METRICS_CONTENT_TYPE = CONTENT_TYPE_LATEST
@@ -0,0 +1,32 @@
+"""
+Shared Redis client for the API and Celery tasks
+
+An asyncio Redis client's connections belong to the event loop they were
+opened on. The API runs one loop, but each Celery task runs its own
+(asyncio.run), so there is one client per running loop; a client is
+dropped along with its loop.
+"""
+import asyncio
+import weakref
+
+import redis.asyncio as aioredis
+
+from app.core.config import settings
+
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aioredis.Redis]" = weakref.WeakKeyDictionary()
+
+
+def get_redis() -> aioredis.Redis:
+    """Return the running event loop's async Redis client, creating it on first use"""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = aioredis.from_url(settings.REDIS_URL)
+    return client
+
+
+async def close_redis():
+    """Close the running event loop's Redis client (application shutdown, end of a Celery task)"""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
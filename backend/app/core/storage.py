@@ -0,0 +1,138 @@
+"""
+Object storage for uploaded health exports
+
+The API writes uploads through the backend chosen by STORAGE_PROVIDER and
+passes only the object key to import workers, which read the object back
+through the same backend. Backends implement StorageBackend; register new
+ones in STORAGE_BACKENDS.
+"""
+import os
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, Optional
+
+import aiofiles
+import aiofiles.os
+
+from app.core.config import settings
+
+
+class StorageBackend(ABC):
+    """Byte objects addressed by slash-separated keys"""
+
+    @abstractmethod
+    async def create(self, key: str):
+        """Create (or truncate) an empty object"""
+
+    @abstractmethod
+    async def write_at(self, key: str, offset: int, data: bytes):
+        """Write data into an existing object at offset (for resumable uploads)"""
+
+    @abstractmethod
+    async def size(self, key: str) -> Optional[int]:
+        """Size of an object in bytes, None if it doesn't exist"""
+
+    @abstractmethod
+    async def move(self, source: str, destination: str):
+        """Rename an object"""
+
+    @abstractmethod
+    async def delete(self, key: str):
+        """Delete an object; missing objects are ignored"""
+
+    @abstractmethod
+    def local_path(self, key: str):
+        """
+        Async context manager yielding a local file path with the object's content
+
+        Remote backends download to a temporary file that is removed on exit.
+        """
+
+    async def save(self, key: str, data: bytes):
+        """Store a whole object at once"""
+        await self.create(key)
+        await self.write_at(key, 0, data)
+
+    async def read_chunks(self, key: str, chunk_size: int = 1024 * 1024) -> AsyncIterator[bytes]:
+        """Stream an object's content"""
+        async with self.local_path(key) as path:
+            async with aiofiles.open(path, "rb") as f:
+                while True:
+                    chunk = await f.read(chunk_size)
+                    if not chunk:
+                        return
+                    yield chunk
+
+
+class LocalStorage(StorageBackend):
+    """
+    Objects as files under a root directory
+
+    API and workers must see the same directory (one host, or a shared
+    volume as in docker-compose).
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+
+    def _path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Invalid storage key: {key!r}")
+        return path
+
+    async def create(self, key: str):
+        path = self._path(key)
+        await aiofiles.os.makedirs(os.path.dirname(path), exist_ok=True)
+        async with aiofiles.open(path, "wb"):
+            pass
+
+    async def write_at(self, key: str, offset: int, data: bytes):
+        async with aiofiles.open(self._path(key), "r+b") as f:
+            await f.seek(offset)
+            await f.write(data)
+
+    async def size(self, key: str) -> Optional[int]:
+        try:
+            return (await aiofiles.os.stat(self._path(key))).st_size
+        except FileNotFoundError:
+            return None
+
+    async def move(self, source: str, destination: str):
+        path = self._path(destination)
+        await aiofiles.os.makedirs(os.path.dirname(path), exist_ok=True)
+        await aiofiles.os.rename(self._path(source), path)
+
+    async def delete(self, key: str):
+        try:
+            await aiofiles.os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    @asynccontextmanager
+    async def local_path(self, key: str):
+        path = self._path(key)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Storage object not found: {key}")
+        yield path
+
+
+STORAGE_BACKENDS: Dict[str, Callable[[], StorageBackend]] = {
+    "local": lambda: LocalStorage(settings.STORAGE_LOCAL_PATH),
+}
+
+_storage: Optional[StorageBackend] = None
+
+
+def get_storage() -> StorageBackend:
+    """Return the process-wide storage backend for STORAGE_PROVIDER"""
+    global _storage
+    if _storage is None:
+        factory = STORAGE_BACKENDS.get(settings.STORAGE_PROVIDER)
+        if factory is None:
+            raise ValueError(
+                f"Unknown STORAGE_PROVIDER {settings.STORAGE_PROVIDER!r} "
+                f"(available: {', '.join(sorted(STORAGE_BACKENDS))})"
+            )
+        _storage = factory()
+    return _storage
@@ -0,0 +1,105 @@
+"""
+TimescaleDB layout for the health_metrics hypertable
+
+Shared by app startup (init_timescaledb) and scripts/init_db.py so both
+setup paths produce the same hypertable.
+"""
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+
+HYPERTABLE = "health_metrics"
+
+
+def chunk_interval_days() -> int:
+    """
+    Chunk time interval for health_metrics
+
+    Hash partitioning splits every time slice into TIMESCALEDB_SPACE_PARTITIONS
+    chunks, so the automatic interval is longer with it on to keep chunks from
+    getting too small.
+    """
+    if settings.TIMESCALEDB_CHUNK_INTERVAL_DAYS > 0:
+        return settings.TIMESCALEDB_CHUNK_INTERVAL_DAYS
+    return 28 if settings.TIMESCALEDB_SPACE_PARTITIONS > 0 else 7
+
+
+def create_hypertable_sql(table: str = HYPERTABLE) -> str:
+    """create_hypertable() call for table, with user_id hash partitioning if configured"""
+    options = [f"chunk_time_interval => INTERVAL '{chunk_interval_days()} days'"]
+    if settings.TIMESCALEDB_SPACE_PARTITIONS > 0:
+        options += [
+            "partitioning_column => 'user_id'",
+            f"number_partitions => {settings.TIMESCALEDB_SPACE_PARTITIONS}",
+        ]
+    options.append("if_not_exists => TRUE")
+    return f"SELECT create_hypertable('{table}', 'timestamp', {', '.join(options)});"
+
+
+def setup_steps() -> List[Tuple[str, str]]:
+    """(description, SQL) for each TimescaleDB setup step, in order"""
+    steps = [
+        ("Enabling TimescaleDB extension", "CREATE EXTENSION IF NOT EXISTS timescaledb;"),
+        ("Creating hypertable", create_hypertable_sql()),
+        (
+            "Setting chunk interval",
+            f"SELECT set_chunk_time_interval('{HYPERTABLE}', INTERVAL '{chunk_interval_days()} days');",
+        ),
+    ]
+    if settings.TIMESCALEDB_SPACE_PARTITIONS > 0:
+        # Only succeeds while the hypertable is empty; existing data has to be
+        # converted with scripts/migrate_hypertable.py
+        steps.append((
+            "Adding user_id hash partitioning",
+            f"SELECT add_dimension('{HYPERTABLE}', 'user_id', "
+            f"number_partitions => {settings.TIMESCALEDB_SPACE_PARTITIONS}, if_not_exists => TRUE);",
+        ))
+    steps.append((
+        "Enabling compression",
+        f"ALTER TABLE {HYPERTABLE} SET ("
+        "timescaledb.compress, "
+        "timescaledb.compress_segmentby = 'user_id, metric_type'"
+        ");",
+    ))
+    steps.append((
+        "Adding compression policy",
+        f"SELECT add_compression_policy('{HYPERTABLE}', "
+        f"INTERVAL '{settings.TIMESCALEDB_COMPRESS_AFTER_DAYS} days', if_not_exists => TRUE);",
+    ))
+    return steps
+
+
+async def setup_timescaledb(engine: AsyncEngine, log: Optional[Callable[[str], None]] = None):
+    """
+    Apply every setup step, continuing past steps that fail
+
+    Each step runs in its own autocommit connection so one failure (e.g. the
+    hypertable already has data) doesn't abort the rest. Pass log=print to
+    report progress.
+    """
+    for description, sql in setup_steps():
+        try:
+            async with engine.connect() as conn:
+                conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+                await conn.execute(text(sql))
+            if log:
+                log(f"✓ {description}")
+        except Exception as e:
+            if log:
+                log(f"Note: {description}: {e}")
+
+
+async def hypertable_dimensions(engine: AsyncEngine, table: str = HYPERTABLE) -> List[str]:
+    """Partitioning columns of a hypertable (empty if it isn't one)"""
+    async with engine.connect() as conn:
+        result = await conn.execute(
+            text(
+                "SELECT column_name FROM timescaledb_information.dimensions "
+                "WHERE hypertable_name = :table ORDER BY dimension_number"
+            ),
+            {"table": table},
+        )
+        return [row[0] for row in result]
@@ -2,13 +2,23 @@
 FastAPI application entry point
 """
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from contextlib import asynccontextmanager
+from sqlalchemy import text
 
 from app.core.config import settings
 from app.api.v1.router import api_router
-from app.core.database import engine, Base
+from app.core.database import engine, replica_engine, Base, dispose_engines, pool_status
+from app.core.redis import close_redis, get_redis
+from app.utils.profiling import ProfilingMiddleware
+from app.core.metrics import (
+    METRICS_CONTENT_TYPE,
+    PrometheusMiddleware,
+    render_metrics,
+    update_queue_depths,
+)
 
 
 @asynccontextmanager
@@ -27,7 +37,8 @@ async def lifespan(app: FastAPI):
     yield
     
     # Shutdown
-    await engine.dispose()
+    await dispose_engines()
+    await close_redis()
 
 
 app = FastAPI(
@@ -35,6 +46,7 @@ app = FastAPI(
     description="API for testing health interventions with Apple Health data",
     version="0.1.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # CORS middleware
@@ -53,6 +65,12 @@ if settings.ENVIRONMENT == "production":
         allowed_hosts=settings.ALLOWED_HOSTS,
     )
 
+# Request latency metrics
+app.add_middleware(PrometheusMiddleware)
+
+# Opt-in per-request profiling
+app.add_middleware(ProfilingMiddleware)
+
 # Include API router
 app.include_router(api_router, prefix="/api/v1")
 
@@ -70,8 +88,34 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Detailed health check"""
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        database = "connected"
+    except Exception:
+        database = "unavailable"
+    
+    try:
+        await get_redis().ping()
+        redis = "connected"
+    except Exception:
+        redis = "unavailable"
+    
     return {
-        "status": "healthy",
-        "database": "connected",  # TODO: Add actual DB check
-        "redis": "connected",  # TODO: Add actual Redis check
+        "status": "healthy" if database == redis == "connected" else "degraded",
+        "database": database,
+        "redis": redis,
+        "database_pool": pool_status(engine),
+        "replica_pool": pool_status(replica_engine) if replica_engine is not None else None,
     }
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint"""
+    try:
+        await update_queue_depths(settings.METRICS_CELERY_QUEUES)
+    except Exception:
+        pass  # Broker unavailable; keep the last known depths
+    
+    return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
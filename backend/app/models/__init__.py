@@ -1 +1,15 @@
 # Database models
+# Import every model so cross-table foreign keys (e.g. to users) resolve
+from app.models import (  # noqa: F401
+    analysis_result,
+    change_point,
+    data_import,
+    dense_metric_day,
+    health_metric,
+    health_metric_rollup,
+    intervention,
+    intervention_running_stat,
+    upload_session,
+    user,
+    workout,
+)
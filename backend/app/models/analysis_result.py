@@ -27,6 +27,12 @@ class AnalysisResult(Base):
     sample_size_baseline = Column(Integer)
     sample_size_intervention = Column(Integer)
     generated_insight = Column(Text)
+    # Joint per-user regression: effect of this intervention with the user's
+    # other interventions, trend and weekday held fixed
+    joint_effect = Column(Float)
+    joint_stderr = Column(Float)
+    joint_p_value = Column(Float)
+    joint_sample_size = Column(Integer)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
@@ -0,0 +1,36 @@
+"""
+Change point model (detected shifts in a user's daily metric series)
+"""
+from sqlalchemy import Column, String, Float, Integer, Date, DateTime, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+import uuid
+
+from app.core.database import Base
+
+
+class ChangePoint(Base):
+    """
+    Likely onset of a change in a daily metric, from the nightly scan
+
+    Linked to the user's intervention starting closest to it (within
+    CHANGE_POINT_MATCH_DAYS), as a suggestion of when its effect began.
+    A user's rows are replaced on every scan.
+    """
+    __tablename__ = "change_points"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    metric_type = Column(String(50), nullable=False)
+    date = Column(Date, nullable=False)  # first local day of the new level
+    mean_before = Column(Float, nullable=False)
+    mean_after = Column(Float, nullable=False)
+    percent_change = Column(Float)
+    score = Column(Float, nullable=False)  # squared-error drop in noise variances; higher = clearer
+    intervention_id = Column(UUID(as_uuid=True), ForeignKey("interventions.id", ondelete="SET NULL"), index=True)
+    days_from_start = Column(Integer)  # date - intervention.start_date
+    detected_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("idx_change_points_user_metric_date", "user_id", "metric_type", "date"),
+    )
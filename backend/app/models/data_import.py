@@ -1,8 +1,8 @@
 """
 Data import model
 """
-from sqlalchemy import Column, String, Float, Integer, DateTime, ForeignKey, Text
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Float, Integer, Boolean, DateTime, ForeignKey, Index, Text
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.sql import func
 import uuid
 
@@ -17,8 +17,17 @@ class DataImport(Base):
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     filename = Column(String(255))
     file_size_mb = Column(Float)
+    storage_key = Column(String(500))  # uploaded export in app.core.storage (deleted once processed)
+    content_sha256 = Column(String(64))  # hex digest of the upload, for spotting re-uploads
     records_imported = Column(Integer)
     status = Column(String(20), index=True)  # pending, processing, completed, failed
     error_message = Column(Text)
+    profile = Column(Boolean, default=False)  # run the import under the sampling profiler
+    profile_path = Column(String(500))
+    stage_timings = Column(JSONB)  # seconds per pipeline stage, e.g. {"parse": 12.3, "insert": 40.1}
     started_at = Column(DateTime(timezone=True), server_default=func.now())
     completed_at = Column(DateTime(timezone=True))
+    
+    __table_args__ = (
+        Index("idx_data_imports_user_sha256", "user_id", "content_sha256"),
+    )
@@ -0,0 +1,31 @@
+"""
+Dense metric day model (packed arrays for high-frequency metrics)
+"""
+from sqlalchemy import Column, String, Float, Integer, Date, DateTime, ForeignKey, LargeBinary
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.core.database import Base
+
+
+class DenseMetricDay(Base):
+    """
+    One user's samples of a high-frequency metric (e.g. heart rate) for one day
+    
+    Samples live in packed arrays (see app.utils.dense_encoding) instead of a
+    health_metrics row each; the daily aggregates are stored alongside so
+    daily charts and analyses never decode the arrays.
+    """
+    __tablename__ = "dense_metric_days"
+    
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    metric_type = Column(String(50), primary_key=True)
+    date = Column(Date, primary_key=True)  # same meaning as HealthMetric.date
+    day_start = Column(DateTime(timezone=True), nullable=False)  # instant offsets count from
+    unit = Column(String(20))
+    sample_count = Column(Integer, nullable=False)
+    value_sum = Column(Float, nullable=False)
+    value_sum_sq = Column(Float, nullable=False)
+    min_value = Column(Float, nullable=False)
+    max_value = Column(Float, nullable=False)
+    offsets = Column(LargeBinary, nullable=False)  # delta-encoded int32 seconds since day_start
+    values = Column(LargeBinary, nullable=False)  # float32
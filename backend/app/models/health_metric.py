@@ -14,14 +14,16 @@ class HealthMetric(Base):
     __tablename__ = "health_metrics"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    # TimescaleDB requires every partitioning column (timestamp, and user_id
+    # when hash partitioned) in the primary key
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
     metric_type = Column(String(50), nullable=False)
     value = Column(Float, nullable=False)
     unit = Column(String(20))
     date = Column(Date, nullable=False, index=True)
-    timestamp = Column(DateTime(timezone=True), nullable=False)
+    timestamp = Column(DateTime(timezone=True), primary_key=True)
     source_device = Column(String(100))
-    metadata = Column(JSONB)
+    metadata_ = Column("metadata", JSONB)  # "metadata" is reserved by the declarative API
     
     # Composite primary key for TimescaleDB
     __table_args__ = (
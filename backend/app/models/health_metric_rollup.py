@@ -0,0 +1,32 @@
+"""
+Health metric rollup model (aggregates of expired raw samples)
+"""
+from sqlalchemy import Column, String, Float, Integer, Date, DateTime, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.core.database import Base
+
+
+class HealthMetricRollup(Base):
+    """
+    Hourly or daily aggregate of health_metrics rows past their retention
+
+    Stores mergeable sums rather than averages so late-arriving samples can be
+    added to an existing bucket and buckets can be combined when read.
+    """
+    __tablename__ = "health_metric_rollups"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    metric_type = Column(String(50), primary_key=True)
+    resolution = Column(String(10), primary_key=True)  # "hour" or "day"
+    bucket = Column(DateTime(timezone=True), primary_key=True)  # start of the hour/day (UTC)
+    date = Column(Date, primary_key=True)  # same meaning as HealthMetric.date
+    sample_count = Column(Integer, nullable=False)
+    value_sum = Column(Float, nullable=False)
+    value_sum_sq = Column(Float, nullable=False)
+    min_value = Column(Float, nullable=False)
+    max_value = Column(Float, nullable=False)
+
+    __table_args__ = (
+        Index("idx_health_metric_rollups_user_type_date", "user_id", "metric_type", "date"),
+    )
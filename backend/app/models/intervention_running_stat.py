@@ -0,0 +1,29 @@
+"""
+Intervention running statistics model
+"""
+from sqlalchemy import Column, String, Float, Integer, Date, DateTime, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class InterventionRunningStat(Base):
+    """
+    Welford accumulator over the daily averages of one analysis period
+
+    Kept for active interventions so a refresh only folds in the days after
+    through_date. A row is rebuilt when its period no longer starts at
+    start_date (the intervention was edited).
+    """
+    __tablename__ = "intervention_running_stats"
+
+    intervention_id = Column(UUID(as_uuid=True), ForeignKey("interventions.id", ondelete="CASCADE"), primary_key=True)
+    metric_type = Column(String(50), primary_key=True)
+    period = Column(String(20), primary_key=True)  # "baseline" or "intervention"
+    start_date = Column(Date, nullable=False)
+    through_date = Column(Date, nullable=False)  # last day folded in
+    n = Column(Integer, nullable=False, default=0)
+    mean = Column(Float, nullable=False, default=0.0)
+    m2 = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
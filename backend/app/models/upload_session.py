@@ -0,0 +1,31 @@
+"""
+Upload session model (resumable chunked uploads)
+"""
+from sqlalchemy import Column, String, BigInteger, DateTime, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+import uuid
+
+from app.core.database import Base
+
+
+class UploadSession(Base):
+    """
+    An export being uploaded in chunks
+
+    Chunks are written straight into the storage object at their offset;
+    received_bytes is the contiguous prefix stored so far, which is where
+    an interrupted client resumes.
+    """
+    __tablename__ = "upload_sessions"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    filename = Column(String(255), nullable=False)
+    size_bytes = Column(BigInteger, nullable=False)
+    received_bytes = Column(BigInteger, nullable=False, default=0)
+    storage_key = Column(String(500), nullable=False)
+    status = Column(String(20), nullable=False, default="open", index=True)  # open, completed, expired
+    import_id = Column(UUID(as_uuid=True), ForeignKey("data_imports.id", ondelete="SET NULL"))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
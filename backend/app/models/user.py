@@ -16,5 +16,6 @@ class User(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     email = Column(String(255), unique=True, nullable=False, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    timezone = Column(String(50), default="UTC")
+    timezone = Column(String(50))  # IANA name for local days; None = each record's own offset
     settings = Column(JSON, default={})
+    analyzed_at = Column(DateTime(timezone=True))  # last scheduled recompute of their analyses
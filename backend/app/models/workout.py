@@ -0,0 +1,50 @@
+"""
+Workout and activity summary models
+"""
+from sqlalchemy import Column, String, Float, Integer, Date, DateTime, ForeignKey, Text, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID
+import uuid
+
+from app.core.database import Base
+
+
+class Workout(Base):
+    """
+    One workout from an export's Workout elements
+
+    A GPS route, if the export has one, is stored inline as an encoded
+    polyline (see app.utils.polyline) rather than one row per point.
+    """
+    __tablename__ = "workouts"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    activity_type = Column(String(50), nullable=False)  # e.g. running, cycling
+    start_time = Column(DateTime(timezone=True), nullable=False)
+    end_time = Column(DateTime(timezone=True), nullable=False)
+    date = Column(Date, nullable=False)  # local day of start_time, as HealthMetric.date
+    duration_minutes = Column(Float)
+    distance_km = Column(Float)
+    energy_kcal = Column(Float)
+    source_device = Column(String(100))
+    route_point_count = Column(Integer)
+    route_polyline = Column(Text)
+
+    __table_args__ = (
+        # Re-importing an export updates workouts instead of duplicating them
+        UniqueConstraint("user_id", "start_time", "activity_type", name="uq_workout_user_start_type"),
+    )
+
+
+class ActivitySummary(Base):
+    """One day's activity rings (move, exercise, stand) and their goals"""
+    __tablename__ = "activity_summaries"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    date = Column(Date, primary_key=True)
+    active_energy_kcal = Column(Float)
+    active_energy_goal_kcal = Column(Float)
+    exercise_minutes = Column(Float)
+    exercise_minutes_goal = Column(Float)
+    stand_hours = Column(Float)
+    stand_hours_goal = Column(Float)
@@ -2,8 +2,9 @@
 Analysis result Pydantic schemas
 """
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from uuid import UUID
+from datetime import date, datetime
 
 
 class AnalysisResultResponse(BaseModel):
@@ -21,7 +22,11 @@ class AnalysisResultResponse(BaseModel):
     sample_size_baseline: Optional[int]
     sample_size_intervention: Optional[int]
     generated_insight: Optional[str]
-    created_at: str
+    joint_effect: Optional[float] = None
+    joint_stderr: Optional[float] = None
+    joint_p_value: Optional[float] = None
+    joint_sample_size: Optional[int] = None
+    created_at: datetime
     
     class Config:
         from_attributes = True
@@ -32,3 +37,42 @@ class InterventionAnalysisResponse(BaseModel):
     intervention_id: UUID
     results: list[AnalysisResultResponse]
     summary: dict
+
+
+class ChangePointResponse(BaseModel):
+    """Schema for a detected change point"""
+    id: UUID
+    metric_type: str
+    date: date
+    mean_before: float
+    mean_after: float
+    percent_change: Optional[float]
+    score: float
+    intervention_id: Optional[UUID]
+    days_from_start: Optional[int]
+    detected_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+class LagResult(BaseModel):
+    """Schema for the comparison at one lag"""
+    lag_days: int
+    intervention_avg: float
+    intervention_stddev: float
+    sample_size_intervention: int
+    percent_change: float
+    effect_size: float  # Cohen's d against the baseline
+    p_value: Optional[float]
+    is_significant: bool
+
+
+class MetricLagScanResponse(BaseModel):
+    """Schema for the lag scan of one metric"""
+    metric_type: str
+    baseline_avg: float
+    baseline_stddev: float
+    sample_size_baseline: int
+    best_lag_days: Optional[int]
+    lags: List[LagResult]
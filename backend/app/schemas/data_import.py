@@ -1,8 +1,8 @@
 """
 Data import Pydantic schemas
 """
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Dict, Optional
 from uuid import UUID
 from datetime import datetime
 
@@ -16,6 +16,9 @@ class DataImportResponse(BaseModel):
     records_imported: Optional[int]
     status: str
     error_message: Optional[str]
+    content_sha256: Optional[str] = None
+    stage_timings: Optional[Dict[str, float]] = None
+    profile_path: Optional[str] = None
     started_at: datetime
     completed_at: Optional[datetime]
     
@@ -30,3 +33,23 @@ class DataImportStatusResponse(BaseModel):
     progress: Optional[float] = None
     records_imported: Optional[int] = None
     error_message: Optional[str] = None
+
+
+class UploadSessionCreate(BaseModel):
+    """Schema for starting a resumable upload"""
+    filename: str = Field(..., max_length=255)
+    size_bytes: int = Field(..., gt=0)
+
+
+class UploadSessionResponse(BaseModel):
+    """Schema for a resumable upload; resume by sending bytes from received_bytes on"""
+    id: UUID
+    filename: str
+    size_bytes: int
+    received_bytes: int
+    status: str
+    import_id: Optional[UUID]
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
@@ -3,7 +3,7 @@ Health metric Pydantic schemas
 """
 from pydantic import BaseModel
 from typing import Optional
-from datetime import datetime
+from datetime import date, datetime
 from uuid import UUID
 
 
@@ -13,7 +13,7 @@ class HealthMetricResponse(BaseModel):
     metric_type: str
     value: float
     unit: Optional[str]
-    date: str
+    date: date
     timestamp: datetime
     source_device: Optional[str]
     
@@ -30,3 +30,9 @@ class DailyMetricResponse(BaseModel):
     min_value: Optional[float]
     max_value: Optional[float]
     sample_size: int
+
+
+class DenseSampleResponse(BaseModel):
+    """Schema for one sample of a high-frequency (dense) metric"""
+    timestamp: datetime
+    value: float
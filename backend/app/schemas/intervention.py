@@ -3,7 +3,7 @@ Intervention Pydantic schemas
 """
 from pydantic import BaseModel, Field
 from typing import Optional
-from datetime import date
+from datetime import date, datetime
 from uuid import UUID
 
 
@@ -38,8 +38,8 @@ class InterventionResponse(InterventionBase):
     id: UUID
     user_id: UUID
     status: str
-    created_at: str
-    updated_at: str
+    created_at: datetime
+    updated_at: datetime
     
     class Config:
         from_attributes = True
@@ -0,0 +1,35 @@
+"""
+User Pydantic schemas
+"""
+from pydantic import BaseModel, Field, field_validator
+from typing import Optional
+from datetime import datetime
+from uuid import UUID
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+
+class UserUpdate(BaseModel):
+    """Schema for updating the current user"""
+    timezone: Optional[str] = Field(None, max_length=50)
+    
+    @field_validator("timezone")
+    @classmethod
+    def validate_timezone(cls, value: Optional[str]) -> Optional[str]:
+        if value is None:
+            return value
+        try:
+            ZoneInfo(value)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise ValueError(f"Unknown timezone: {value}")
+        return value
+
+
+class UserResponse(BaseModel):
+    """Schema for user response"""
+    id: UUID
+    email: str
+    timezone: Optional[str]
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
@@ -0,0 +1,43 @@
+"""
+Workout Pydantic schemas
+"""
+from pydantic import BaseModel
+from typing import Optional
+from datetime import date, datetime
+from uuid import UUID
+
+
+class WorkoutResponse(BaseModel):
+    """Schema for a workout, without its route"""
+    id: UUID
+    activity_type: str
+    start_time: datetime
+    end_time: datetime
+    date: date
+    duration_minutes: Optional[float]
+    distance_km: Optional[float]
+    energy_kcal: Optional[float]
+    source_device: Optional[str]
+    route_point_count: Optional[int]
+    
+    class Config:
+        from_attributes = True
+
+
+class WorkoutDetailResponse(WorkoutResponse):
+    """Schema for a workout with its route, an encoded polyline of (lat, lon) at 1e-5 degrees"""
+    route_polyline: Optional[str]
+
+
+class ActivitySummaryResponse(BaseModel):
+    """Schema for one day's activity rings"""
+    date: date
+    active_energy_kcal: Optional[float]
+    active_energy_goal_kcal: Optional[float]
+    exercise_minutes: Optional[float]
+    exercise_minutes_goal: Optional[float]
+    stand_hours: Optional[float]
+    stand_hours_goal: Optional[float]
+    
+    class Config:
+        from_attributes = True
@@ -2,79 +2,193 @@
 Service for statistical analysis of interventions
 """
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import delete, select
 from datetime import date, timedelta
-from typing import List, Optional
-import numpy as np
-from scipy import stats
+from typing import Dict, List, Optional, Tuple
 
+from app.core.metrics import ANALYSIS_DURATION_SECONDS
 from app.models.intervention import Intervention
+from app.models.intervention_running_stat import InterventionRunningStat
 from app.models.analysis_result import AnalysisResult
 from app.services.health_data_service import get_daily_metrics
+from app.utils.running_stats import RunningStats
+
+# Metrics compared between the baseline and intervention periods
+METRIC_TYPES = ["hrv", "resting_hr", "heart_rate", "sleep_duration", "steps", "active_energy"]
+
+# Fewest days with data per period for a meaningful comparison
+MIN_DAYS = 7
+
+# Joint regression columns before the intervention indicators: intercept, trend, weekday 1-6
+JOINT_BASE_COLUMNS = 8
 
 
 async def analyze_intervention(
     intervention_id: str,
     db: AsyncSession,
+    read_db: Optional[AsyncSession] = None,
 ) -> List[AnalysisResult]:
     """
     Analyze an intervention by comparing baseline vs intervention periods
     
+    Daily series are read through read_db (e.g. a replica session) when given;
+    results are always written through db.
+    
     Returns list of analysis results for each metric
     """
+    with ANALYSIS_DURATION_SECONDS.labels("intervention").time():
+        return await _analyze_intervention(intervention_id, db, read_db or db)
+
+
+def analysis_periods(intervention: Intervention, today: Optional[date] = None) -> Dict[str, Tuple[date, date]]:
+    """Inclusive (start, end) of the baseline and intervention periods"""
+    return {
+        "baseline": (
+            intervention.start_date - timedelta(days=intervention.baseline_days),
+            intervention.start_date,
+        ),
+        "intervention": (intervention.start_date, intervention.end_date or today or date.today()),
+    }
+
+
+async def _daily_stats(
+    user_id: str,
+    metric_type: str,
+    start_date: date,
+    end_date: date,
+    read_db: AsyncSession,
+) -> RunningStats:
+    """Running statistics over the daily averages of a date range"""
+    days = await get_daily_metrics(user_id, metric_type, start_date, end_date, read_db)
+    return RunningStats().update(d["avg_value"] for d in days if d["avg_value"] is not None)
+
+
+async def running_period_stats(
+    intervention: Intervention,
+    db: AsyncSession,
+    read_db: Optional[AsyncSession] = None,
+    today: Optional[date] = None,
+) -> Dict[Tuple[str, str], RunningStats]:
+    """
+    Statistics of every (metric, period) of an intervention from stored accumulators
+    
+    Complete days (before today) not yet in an accumulator are read and folded
+    in, so the cost is proportional to the days added since the last refresh;
+    today's partial day is merged in without being stored. Accumulators whose
+    period changed are rebuilt. Rows are added to db but not committed.
+    """
+    read_db = read_db or db
+    today = today or date.today()
+    last_complete = today - timedelta(days=1)
+    user_id = str(intervention.user_id)
+    
+    result = await db.execute(
+        select(InterventionRunningStat).where(InterventionRunningStat.intervention_id == intervention.id)
+    )
+    stored = {(row.metric_type, row.period): row for row in result.scalars()}
+    
+    stats = {}
+    for metric_type in METRIC_TYPES:
+        for period, (start, end) in analysis_periods(intervention, today).items():
+            row = stored.get((metric_type, period))
+            if row is None:
+                row = InterventionRunningStat(intervention_id=intervention.id, metric_type=metric_type, period=period)
+                db.add(row)
+            if row.start_date != start or row.through_date > end:
+                row.start_date = start
+                row.through_date = start - timedelta(days=1)
+                row.n, row.mean, row.m2 = 0, 0.0, 0.0
+            
+            accumulated = RunningStats(row.n, row.mean, row.m2)
+            fold_end = min(end, last_complete)
+            if row.through_date < fold_end:
+                new_days = await _daily_stats(user_id, metric_type, row.through_date + timedelta(days=1), fold_end, read_db)
+                accumulated = accumulated.merge(new_days)
+                row.n, row.mean, row.m2 = accumulated.n, accumulated.mean, accumulated.m2
+                row.through_date = fold_end
+            
+            if end > row.through_date:
+                live = await _daily_stats(user_id, metric_type, row.through_date + timedelta(days=1), end, read_db)
+                accumulated = accumulated.merge(live)
+            stats[(metric_type, period)] = accumulated
+    
+    return stats
+
+
+async def refresh_running_stats(user_id: str, db: AsyncSession, changed_from: Optional[date] = None) -> int:
+    """
+    Bring the accumulators of a user's active interventions up to date
+    
+    Called after an import: accumulators that already cover changed_from (the
+    earliest local day the import wrote to) are dropped first, since a
+    changed day's average can't be taken back out, and rebuilt from raw.
+    Returns the number of interventions refreshed.
+    """
+    active = select(Intervention.id).where(Intervention.user_id == user_id, Intervention.status == "active")
+    if changed_from is not None:
+        await db.execute(
+            delete(InterventionRunningStat).where(
+                InterventionRunningStat.intervention_id.in_(active),
+                InterventionRunningStat.through_date >= changed_from,
+            )
+        )
+        await db.commit()
+    
+    interventions = (await db.execute(
+        select(Intervention).where(Intervention.user_id == user_id, Intervention.status == "active")
+    )).scalars().all()
+    for intervention in interventions:
+        await running_period_stats(intervention, db)
+    await db.commit()
+    return len(interventions)
+
+
+async def _analyze_intervention(
+    intervention_id: str,
+    db: AsyncSession,
+    read_db: AsyncSession,
+) -> List[AnalysisResult]:
+    """Analysis body for analyze_intervention"""
+    # scipy takes ~0.4s to import; load it on first analysis rather than on
+    # every API and worker boot
+    from scipy import stats
+    
     # Get intervention
     intervention = await db.get(Intervention, intervention_id)
     if not intervention:
         raise ValueError("Intervention not found")
     
-    # Calculate date ranges
-    baseline_start = intervention.start_date - timedelta(days=intervention.baseline_days)
-    baseline_end = intervention.start_date
-    
-    intervention_start = intervention.start_date
-    intervention_end = intervention.end_date or date.today()
-    
-    # Metrics to analyze
-    metric_types = ["hrv", "resting_hr", "sleep_duration", "steps", "active_energy"]
+    # Active interventions grow by a day at a time; read them from the
+    # running accumulators instead of re-reading both periods
+    if intervention.status == "active":
+        period_stats = await running_period_stats(intervention, db, read_db)
+    else:
+        await db.execute(
+            delete(InterventionRunningStat).where(InterventionRunningStat.intervention_id == intervention.id)
+        )
+        period_stats = {}
+        for metric_type in METRIC_TYPES:
+            for period, (start, end) in analysis_periods(intervention).items():
+                period_stats[(metric_type, period)] = await _daily_stats(
+                    str(intervention.user_id), metric_type, start, end, read_db
+                )
     
     results = []
     
-    for metric_type in metric_types:
-        # Get baseline data
-        baseline_data = await get_daily_metrics(
-            str(intervention.user_id),
-            metric_type,
-            baseline_start,
-            baseline_end,
-            db,
-        )
-        
-        # Get intervention data
-        intervention_data = await get_daily_metrics(
-            str(intervention.user_id),
-            metric_type,
-            intervention_start,
-            intervention_end,
-            db,
-        )
+    for metric_type in METRIC_TYPES:
+        baseline = period_stats[(metric_type, "baseline")]
+        treated = period_stats[(metric_type, "intervention")]
         
         # Check if we have enough data
-        if len(baseline_data) < 7 or len(intervention_data) < 7:
+        if baseline.n < MIN_DAYS or treated.n < MIN_DAYS:
             continue  # Not enough data for meaningful analysis
         
-        # Extract values
-        baseline_values = [d["avg_value"] for d in baseline_data if d["avg_value"] is not None]
-        intervention_values = [d["avg_value"] for d in intervention_data if d["avg_value"] is not None]
-        
-        if len(baseline_values) < 7 or len(intervention_values) < 7:
-            continue
-        
         # Calculate statistics
-        baseline_avg = np.mean(baseline_values)
-        baseline_stddev = np.std(baseline_values, ddof=1) if len(baseline_values) > 1 else 0.0
+        baseline_avg = baseline.mean
+        baseline_stddev = baseline.stddev
         
-        intervention_avg = np.mean(intervention_values)
-        intervention_stddev = np.std(intervention_values, ddof=1) if len(intervention_values) > 1 else 0.0
+        intervention_avg = treated.mean
+        intervention_stddev = treated.stddev
         
         # Calculate percent change
         if baseline_avg != 0:
@@ -82,9 +196,12 @@ async def analyze_intervention(
         else:
             percent_change = 0.0
         
-        # T-test for significance
-        t_stat, p_value = stats.ttest_ind(baseline_values, intervention_values)
-        is_significant = p_value < 0.05
+        # T-test for significance (pooled variance, as ttest_ind on the daily values)
+        t_stat, p_value = stats.ttest_ind_from_stats(
+            baseline_avg, baseline_stddev, baseline.n,
+            intervention_avg, intervention_stddev, treated.n,
+        )
+        is_significant = bool(p_value < 0.05)
         
         # Generate insight
         insight = generate_insight(
@@ -93,8 +210,8 @@ async def analyze_intervention(
             intervention_avg,
             percent_change,
             is_significant,
-            len(baseline_values),
-            len(intervention_values),
+            baseline.n,
+            treated.n,
         )
         
         # Create or update analysis result
@@ -115,8 +232,8 @@ async def analyze_intervention(
             existing.percent_change = percent_change
             existing.p_value = float(p_value)
             existing.is_significant = is_significant
-            existing.sample_size_baseline = len(baseline_values)
-            existing.sample_size_intervention = len(intervention_values)
+            existing.sample_size_baseline = baseline.n
+            existing.sample_size_intervention = treated.n
             existing.generated_insight = insight
             result = existing
         else:
@@ -131,8 +248,8 @@ async def analyze_intervention(
                 percent_change=percent_change,
                 p_value=float(p_value),
                 is_significant=is_significant,
-                sample_size_baseline=len(baseline_values),
-                sample_size_intervention=len(intervention_values),
+                sample_size_baseline=baseline.n,
+                sample_size_intervention=treated.n,
                 generated_insight=insight,
             )
             db.add(result)
@@ -144,6 +261,289 @@ async def analyze_intervention(
     return results
 
 
+async def lag_scan(
+    intervention_id: str,
+    db: AsyncSession,
+    max_lag: int = 28,
+    read_db: Optional[AsyncSession] = None,
+) -> List[dict]:
+    """
+    Effect size and significance of an intervention at lags of 0..max_lag days
+    
+    At lag L the fixed baseline period is compared with the intervention
+    period from start_date + L on. Each metric's daily series is read once;
+    the statistics of the days between consecutive lags' start days are
+    merged from the end (as RunningStats merges), giving the mean and
+    variance of every lagged period, and all lags are tested in one
+    vectorized call.
+    Lags leaving fewer than MIN_DAYS days are skipped.
+    
+    Returns one entry per metric with enough baseline data
+    """
+    with ANALYSIS_DURATION_SECONDS.labels("lag_scan").time():
+        return await _lag_scan(intervention_id, db, max_lag, read_db or db)
+
+
+async def _lag_scan(
+    intervention_id: str,
+    db: AsyncSession,
+    max_lag: int,
+    read_db: AsyncSession,
+) -> List[dict]:
+    """Scan body for lag_scan"""
+    import numpy as np
+    from scipy import stats
+    
+    intervention = await db.get(Intervention, intervention_id)
+    if not intervention:
+        raise ValueError("Intervention not found")
+    
+    periods = analysis_periods(intervention)
+    baseline_start, baseline_end = periods["baseline"]
+    start, end = periods["intervention"]
+    
+    scans = []
+    for metric_type in METRIC_TYPES:
+        days = await get_daily_metrics(str(intervention.user_id), metric_type, baseline_start, end, read_db)
+        series = [(date.fromisoformat(d["day"]), d["avg_value"]) for d in days if d["avg_value"] is not None]
+        
+        baseline = RunningStats().update(value for day, value in series if day <= baseline_end)
+        if baseline.n < MIN_DAYS:
+            continue
+        
+        treated = [(day, value) for day, value in series if day >= start]
+        offsets = np.array([(day - start).days for day, _ in treated], dtype=int)
+        values = np.array([value for _, value in treated], dtype=float)
+        
+        lags = np.arange(max_lag + 1)
+        first = np.searchsorted(offsets, lags)
+        n = len(values) - first
+        keep = n >= MIN_DAYS
+        lags, first, n = lags[keep], first[keep], n[keep]
+        
+        # Statistics of values[i:] for each lag's first index i, merging the
+        # chunks between those indexes from the end: a sum-of-squares formula
+        # cancels catastrophically for metrics with a large mean
+        suffixes = {}
+        tail = RunningStats()
+        stop = len(values)
+        for position in sorted(set(first.tolist()), reverse=True):
+            chunk = values[position:stop]
+            if len(chunk):
+                chunk_mean = float(chunk.mean())
+                deviations = chunk - chunk_mean
+                tail = tail.merge(RunningStats(len(chunk), chunk_mean, float(deviations @ deviations)))
+            suffixes[position] = tail
+            stop = position
+        
+        means = np.array([suffixes[position].mean for position in first], dtype=float)
+        variances = np.array([suffixes[position].variance for position in first], dtype=float)
+        stddevs = np.sqrt(variances)
+        
+        _, p_values = stats.ttest_ind_from_stats(
+            baseline.mean, baseline.stddev, baseline.n,
+            means, stddevs, n,
+        )
+        pooled = np.sqrt(((baseline.n - 1) * baseline.variance + (n - 1) * variances) / (baseline.n + n - 2))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            effect_sizes = np.where(pooled > 0, (means - baseline.mean) / pooled, 0.0)
+        
+        results = [
+            {
+                "lag_days": int(lag),
+                "intervention_avg": float(mean),
+                "intervention_stddev": float(stddev),
+                "sample_size_intervention": int(size),
+                "percent_change": (
+                    float((mean - baseline.mean) / baseline.mean * 100) if baseline.mean != 0 else 0.0
+                ),
+                "effect_size": float(effect),
+                # NaN when both periods are constant
+                "p_value": float(p_value) if np.isfinite(p_value) else None,
+                "is_significant": bool(p_value < 0.05),
+            }
+            for lag, mean, stddev, size, effect, p_value in zip(lags, means, stddevs, n, effect_sizes, p_values)
+        ]
+        
+        # Strongest significant effect, if any lag reaches significance
+        significant = [r for r in results if r["is_significant"]]
+        best = max(significant, key=lambda r: abs(r["effect_size"])) if significant else None
+        
+        scans.append({
+            "metric_type": metric_type,
+            "baseline_avg": baseline.mean,
+            "baseline_stddev": baseline.stddev,
+            "sample_size_baseline": baseline.n,
+            "best_lag_days": best["lag_days"] if best else None,
+            "lags": results,
+        })
+    
+    return scans
+
+
+async def analyze_user_interventions(
+    user_id: str,
+    db: AsyncSession,
+    read_db: Optional[AsyncSession] = None,
+) -> List[AnalysisResult]:
+    """
+    Estimate the effect of all of a user's interventions jointly, per metric
+    
+    One least-squares regression per metric on the user's daily values, with
+    an intercept, a linear trend, weekday terms and an indicator column per
+    intervention (1 from its start_date to its end_date or today). Overlapping
+    interventions are thereby separated from each other and from slow drifts,
+    and one solve covers all K interventions instead of K analyses.
+    
+    Coefficients, standard errors and p-values are stored in the joint_*
+    columns of each intervention's AnalysisResult. Interventions the data
+    can't identify (too few days on, or on exactly when earlier ones are) are
+    left empty; the others are still estimated.
+    
+    Returns the updated analysis results
+    """
+    with ANALYSIS_DURATION_SECONDS.labels("joint").time():
+        return await _analyze_user_interventions(user_id, db, read_db or db)
+
+
+async def _analyze_user_interventions(
+    user_id: str,
+    db: AsyncSession,
+    read_db: AsyncSession,
+) -> List[AnalysisResult]:
+    """Regression body for analyze_user_interventions"""
+    import numpy as np
+    from scipy import sparse, stats
+    from scipy.linalg import solve_triangular
+    from scipy.sparse.linalg import lsqr
+    
+    interventions = (await db.execute(
+        select(Intervention).where(Intervention.user_id == user_id).order_by(Intervention.start_date)
+    )).scalars().all()
+    if not interventions:
+        return []
+    
+    today = date.today()
+    first_day = min(i.start_date - timedelta(days=i.baseline_days) for i in interventions)
+    last_day = max(i.end_date or today for i in interventions)
+    
+    existing = (await db.execute(
+        select(AnalysisResult).where(AnalysisResult.intervention_id.in_([i.id for i in interventions]))
+    )).scalars().all()
+    results = {(r.intervention_id, r.metric_type): r for r in existing}
+    for result in existing:
+        result.joint_effect = result.joint_stderr = result.joint_p_value = result.joint_sample_size = None
+    
+    updated = []
+    created = []
+    for metric_type in METRIC_TYPES:
+        daily = await get_daily_metrics(user_id, metric_type, first_day, last_day, read_db)
+        daily = [d for d in daily if d["avg_value"] is not None]
+        days = np.array([(date.fromisoformat(d["day"]) - first_day).days for d in daily], dtype=int)
+        y = np.array([d["avg_value"] for d in daily], dtype=float)
+        
+        # Indicator columns; drop interventions with too few days on or off
+        on = [
+            ((i.start_date - first_day).days <= days) & (days <= ((i.end_date or today) - first_day).days)
+            for i in interventions
+        ]
+        modeled = [k for k, mask in enumerate(on) if MIN_DAYS <= mask.sum() <= len(y) - MIN_DAYS]
+        if not modeled:
+            continue
+        
+        # Sparse design built from its nonzeros: intercept, trend (years),
+        # weekday 1-6, then one indicator column per intervention
+        size = len(y)
+        everyday = np.arange(size)
+        weekdays = (first_day.weekday() + days) % 7
+        weekday_rows = np.flatnonzero(weekdays > 0)
+        on_rows = [np.flatnonzero(on[k]) for k in modeled]
+        rows = np.concatenate([everyday, everyday, weekday_rows, *on_rows])
+        columns = np.concatenate([
+            np.zeros(size, dtype=int),
+            np.ones(size, dtype=int),
+            1 + weekdays[weekday_rows],
+            *(np.full(len(r), JOINT_BASE_COLUMNS + position) for position, r in enumerate(on_rows)),
+        ])
+        values = np.concatenate([np.ones(size), days / 365.25, np.ones(len(rows) - 2 * size)])
+        X = sparse.csc_matrix((values, (rows, columns)), shape=(size, JOINT_BASE_COLUMNS + len(modeled)))
+        
+        # Leave out only the columns that repeat earlier ones, e.g. the later of
+        # two interventions started and stopped together
+        kept, R = _independent_columns((X.T @ X).toarray())
+        fitted = [(position, k) for position, k in enumerate(modeled) if JOINT_BASE_COLUMNS + position in kept]
+        if len(fitted) < len(modeled):
+            print(
+                f"Joint model for user {user_id} {metric_type}: "
+                f"{len(modeled) - len(fitted)} collinear intervention(s) left out"
+            )
+        if not fitted:
+            continue
+        X = X[:, kept]
+        
+        n, p = X.shape
+        if n - p < MIN_DAYS:
+            continue
+        
+        coefficients = lsqr(X, y, atol=1e-12, btol=1e-12)[0]
+        residuals = y - X @ coefficients
+        residual_variance = float(residuals @ residuals) / (n - p)
+        # diag((X'X)^-1) = squared row norms of R^-1
+        r_inverse = solve_triangular(R, np.eye(p))
+        stderrs = np.sqrt(np.einsum("ij,ij->i", r_inverse, r_inverse) * residual_variance)
+        
+        for position, k in fitted:
+            intervention = interventions[k]
+            column = kept.index(JOINT_BASE_COLUMNS + position)
+            coefficient = float(coefficients[column])
+            stderr = float(stderrs[column])
+            p_value = float(2 * stats.t.sf(abs(coefficient / stderr), n - p)) if stderr > 0 else None
+            
+            result = results.get((intervention.id, metric_type))
+            if result is None:
+                result = AnalysisResult(intervention_id=intervention.id, metric_type=metric_type)
+                db.add(result)
+                created.append(result)
+            result.joint_effect = coefficient
+            result.joint_stderr = stderr
+            result.joint_p_value = p_value
+            result.joint_sample_size = n
+            updated.append(result)
+    
+    await db.commit()
+    for result in created:
+        await db.refresh(result)  # load created_at
+    
+    return updated
+
+
+def _independent_columns(gram, tolerance: float = 1e-10):
+    """
+    Columns of X that aren't combinations of earlier ones, from its Gram matrix X'X
+    
+    An order-preserving pivoted Cholesky: each column is kept unless its
+    squared residual, projected on the columns kept before it, is below
+    tolerance times its squared norm. Returns the kept indexes and R of
+    X[:, kept] = QR (upper triangular), without forming X densely.
+    """
+    import numpy as np
+    from scipy.linalg import solve_triangular
+    
+    kept = []
+    R = np.zeros((0, 0))
+    for j in range(gram.shape[0]):
+        norm = gram[j, j]
+        if norm <= 0:
+            continue
+        r = solve_triangular(R, gram[kept, j], trans="T") if kept else np.zeros(0)
+        residual = norm - r @ r
+        if residual <= tolerance * norm:
+            continue
+        R = np.block([[R, r[:, None]], [np.zeros((1, len(kept))), np.sqrt(residual)]])
+        kept.append(j)
+    return kept, R
+
+
 def generate_insight(
     metric_type: str,
     baseline: float,
@@ -158,6 +558,7 @@ def generate_insight(
     metric_names = {
         "hrv": "HRV",
         "resting_hr": "resting heart rate",
+        "heart_rate": "average heart rate",
         "sleep_duration": "sleep duration",
         "steps": "daily steps",
         "active_energy": "active energy burned",
@@ -166,6 +567,7 @@ def generate_insight(
     metric_units = {
         "hrv": "ms",
         "resting_hr": "bpm",
+        "heart_rate": "bpm",
         "sleep_duration": "hours",
         "steps": "steps",
         "active_energy": "kcal",
@@ -0,0 +1,117 @@
+"""
+Service for detecting change points in users' daily metric series
+"""
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, select
+from datetime import date
+from typing import List, Optional
+
+from app.core.config import settings
+from app.core.metrics import ANALYSIS_DURATION_SECONDS
+from app.models.change_point import ChangePoint
+from app.models.intervention import Intervention
+from app.models.user import User
+from app.services.dense_metric_service import DENSE_METRIC_TYPES
+from app.services.health_data_service import get_daily_metrics
+from app.utils.change_points import detect_mean_shifts
+from app.utils.health_parser import METRIC_TYPE_MAPPING
+
+# Every metric an import can produce
+CHANGE_POINT_METRIC_TYPES = sorted(set(METRIC_TYPE_MAPPING.values()) | DENSE_METRIC_TYPES)
+
+
+def _nearest_intervention(day: date, interventions: List[Intervention]) -> Optional[Intervention]:
+    """Intervention starting closest to day, if within CHANGE_POINT_MATCH_DAYS"""
+    best = None
+    for intervention in interventions:
+        distance = abs((day - intervention.start_date).days)
+        if distance <= settings.CHANGE_POINT_MATCH_DAYS and (
+            best is None or distance < abs((day - best.start_date).days)
+        ):
+            best = intervention
+    return best
+
+
+async def detect_user_change_points(
+    user_id: str,
+    db: AsyncSession,
+    read_db: Optional[AsyncSession] = None,
+) -> List[ChangePoint]:
+    """
+    Scan all of a user's daily series for shifts in level and store them
+
+    Each series is read once through read_db (e.g. a replica session) and
+    scanned in linear time per level of binary segmentation. Previous change
+    points of the user are replaced.
+
+    Returns the stored change points
+    """
+    read_db = read_db or db
+    with ANALYSIS_DURATION_SECONDS.labels("change_points").time():
+        interventions = (await read_db.execute(
+            select(Intervention).where(Intervention.user_id == user_id)
+        )).scalars().all()
+
+        change_points = []
+        for metric_type in CHANGE_POINT_METRIC_TYPES:
+            days = await get_daily_metrics(user_id, metric_type, date.min, date.today(), read_db)
+            days = [d for d in days if d["avg_value"] is not None]
+            shifts = detect_mean_shifts(
+                [d["avg_value"] for d in days],
+                min_size=settings.CHANGE_POINT_MIN_DAYS,
+                penalty=settings.CHANGE_POINT_PENALTY,
+            )
+
+            for shift in shifts:
+                day = date.fromisoformat(days[shift.index]["day"])
+                intervention = _nearest_intervention(day, interventions)
+                change_points.append(ChangePoint(
+                    user_id=user_id,
+                    metric_type=metric_type,
+                    date=day,
+                    mean_before=shift.mean_before,
+                    mean_after=shift.mean_after,
+                    percent_change=(
+                        (shift.mean_after - shift.mean_before) / shift.mean_before * 100
+                        if shift.mean_before else None
+                    ),
+                    score=shift.score,
+                    intervention_id=intervention.id if intervention else None,
+                    days_from_start=(day - intervention.start_date).days if intervention else None,
+                ))
+
+        await db.execute(delete(ChangePoint).where(ChangePoint.user_id == user_id))
+        db.add_all(change_points)
+        await db.commit()
+
+    return change_points
+
+
+async def detect_all_change_points(db: AsyncSession, batch_size: int = 500) -> dict:
+    """
+    Nightly scan of every user, batch_size user ids at a time
+
+    A user whose scan fails is logged and skipped. Returns the number of users
+    scanned and change points stored.
+    """
+    scanned = 0
+    found = 0
+    last_id = None
+    while True:
+        query = select(User.id).order_by(User.id).limit(batch_size)
+        if last_id is not None:
+            query = query.where(User.id > last_id)
+        user_ids = (await db.execute(query)).scalars().all()
+        if not user_ids:
+            break
+
+        for user_id in user_ids:
+            try:
+                found += len(await detect_user_change_points(str(user_id), db))
+                scanned += 1
+            except Exception as e:
+                print(f"Error detecting change points for user {user_id}: {e}")
+                await db.rollback()
+        last_id = user_ids[-1]
+
+    return {"users": scanned, "change_points": found}
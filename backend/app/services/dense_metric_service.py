@@ -0,0 +1,209 @@
+"""
+Service for high-frequency metrics stored as packed per-day arrays
+"""
+from datetime import date, datetime, timedelta, timezone, tzinfo
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.dense_metric_day import DenseMetricDay
+from app.utils.dense_encoding import merge_samples, pack_samples, unpack_samples
+from app.utils.health_parser import DENSE_METRIC_TYPE_MAPPING, HealthRecord
+from app.utils.local_time import local_day, local_midnight
+
+DENSE_METRIC_TYPES = frozenset(DENSE_METRIC_TYPE_MAPPING.values())
+
+
+def is_dense_metric(metric_type: str) -> bool:
+    """Whether metric_type is stored in dense_metric_days rather than health_metrics"""
+    return metric_type in DENSE_METRIC_TYPES
+
+
+class DenseSampleBuffer:
+    """
+    Dense samples collected during an import, grouped by (metric_type, local day)
+    
+    Samples are kept as (epoch seconds, value) until stored, when they are
+    re-based onto the day row's day_start.
+    """
+    
+    def __init__(self, zone: Optional[tzinfo] = None):
+        self.zone = zone
+        self.days: Dict[Tuple[str, date], List[Tuple[int, float]]] = {}
+        self.day_starts: Dict[Tuple[str, date], datetime] = {}
+        self.units: Dict[Tuple[str, date], Optional[str]] = {}
+        self.sample_count = 0
+    
+    def add(self, metric_type: str, record: HealthRecord) -> bool:
+        """Buffer one record; False if its value isn't numeric"""
+        try:
+            value = float(record.value)
+        except (ValueError, TypeError):
+            return False
+        
+        self.add_sample(metric_type, record.start_date, value, record.unit)
+        return True
+    
+    def add_sample(self, metric_type: str, instant: datetime, value: float, unit: Optional[str] = None):
+        key = (metric_type, local_day(instant, self.zone))
+        samples = self.days.get(key)
+        if samples is None:
+            samples = self.days[key] = []
+            self.day_starts[key] = local_midnight(instant, self.zone)
+            self.units[key] = unit
+        samples.append((int(instant.timestamp()), value))
+        self.sample_count += 1
+    
+    def clear(self):
+        self.days.clear()
+        self.day_starts.clear()
+        self.units.clear()
+        self.sample_count = 0
+
+
+async def store_dense_samples(user_id: str, buffer: DenseSampleBuffer, db: AsyncSession):
+    """
+    Merge buffered samples into dense_metric_days, commit and empty the buffer
+    
+    Days already stored are decoded, merged with the new samples (duplicates
+    dropped) and re-packed, so a day can arrive across several flushes or imports.
+    """
+    if not buffer.days:
+        return
+    
+    result = await db.execute(
+        select(DenseMetricDay).where(
+            DenseMetricDay.user_id == user_id,
+            tuple_(DenseMetricDay.metric_type, DenseMetricDay.date).in_(list(buffer.days)),
+        )
+    )
+    existing = {(row.metric_type, row.date): row for row in result.scalars()}
+    
+    for (metric_type, day), samples in buffer.days.items():
+        row = existing.get((metric_type, day))
+        if row is None:
+            row = DenseMetricDay(
+                user_id=user_id,
+                metric_type=metric_type,
+                date=day,
+                day_start=buffer.day_starts[(metric_type, day)],
+                unit=buffer.units[(metric_type, day)],
+            )
+            db.add(row)
+            stored = []
+        else:
+            stored = unpack_samples(row.offsets, row.values)
+        
+        origin = int(row.day_start.timestamp())
+        merged = merge_samples(stored, [(epoch - origin, value) for epoch, value in samples])
+        offsets, values = pack_samples(merged)
+        merged_values = [value for _, value in merged]
+        
+        row.sample_count = len(merged)
+        row.value_sum = sum(merged_values)
+        row.value_sum_sq = sum(value * value for value in merged_values)
+        row.min_value = min(merged_values)
+        row.max_value = max(merged_values)
+        row.offsets = offsets
+        row.values = values
+    
+    await db.commit()
+    buffer.clear()
+
+
+def _decode_day(row) -> List[Tuple[datetime, float]]:
+    """A stored day's samples as (UTC instant, value)"""
+    day_start = row.day_start.astimezone(timezone.utc)
+    return [
+        (day_start + timedelta(seconds=offset), value)
+        for offset, value in unpack_samples(row.offsets, row.values)
+    ]
+
+
+async def rebucket_dense_days(user_id: str, zone: Optional[tzinfo], db: AsyncSession, window_days: int = 31) -> int:
+    """
+    Re-split a user's dense days by local day in zone
+    
+    Works through each metric window_days at a time: the window's rows are
+    decoded and deleted, then their samples are stored again under their new
+    local day (merging into neighbouring rows where a sample changes window).
+    Returns the number of samples moved.
+    """
+    moved = 0
+    for metric_type in sorted(DENSE_METRIC_TYPES):
+        bounds = (await db.execute(
+            select(func.min(DenseMetricDay.date), func.max(DenseMetricDay.date)).where(
+                DenseMetricDay.user_id == user_id,
+                DenseMetricDay.metric_type == metric_type,
+            )
+        )).one()
+        if bounds[0] is None:
+            continue
+        
+        start, last = bounds
+        while start <= last:
+            end = start + timedelta(days=window_days)
+            # Rows stored by the previous window may be deleted below
+            db.expunge_all()
+            result = await db.execute(
+                delete(DenseMetricDay).where(
+                    DenseMetricDay.user_id == user_id,
+                    DenseMetricDay.metric_type == metric_type,
+                    DenseMetricDay.date >= start,
+                    DenseMetricDay.date < end,
+                ).returning(
+                    DenseMetricDay.day_start,
+                    DenseMetricDay.unit,
+                    DenseMetricDay.offsets,
+                    DenseMetricDay.values,
+                )
+            )
+            buffer = DenseSampleBuffer(zone)
+            for row in result.all():
+                for instant, value in _decode_day(row):
+                    buffer.add_sample(metric_type, instant, value, row.unit)
+            moved += buffer.sample_count
+            # Commits the delete together with the re-stored samples
+            await store_dense_samples(user_id, buffer, db)
+            await db.commit()
+            start = end
+    return moved
+
+
+async def get_dense_samples(
+    user_id: str,
+    metric_type: str,
+    start: datetime,
+    end: datetime,
+    db: AsyncSession,
+) -> List[dict]:
+    """
+    Decode a dense metric's individual samples with start <= timestamp < end
+    
+    Naive bounds are taken as UTC; timestamps are returned in UTC.
+    """
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    
+    # Local days can sit a day either side of the UTC date
+    result = await db.execute(
+        select(DenseMetricDay.day_start, DenseMetricDay.offsets, DenseMetricDay.values).where(
+            DenseMetricDay.user_id == user_id,
+            DenseMetricDay.metric_type == metric_type,
+            DenseMetricDay.date >= start.date() - timedelta(days=1),
+            DenseMetricDay.date <= end.date() + timedelta(days=1),
+        ).order_by(DenseMetricDay.date)
+    )
+    
+    samples = [
+        {"timestamp": instant, "value": value}
+        for row in result.all()
+        for instant, value in _decode_day(row)
+        if start <= instant < end
+    ]
+    # Days of different UTC offsets (travel) can overlap
+    samples.sort(key=lambda sample: sample["timestamp"])
+    return samples
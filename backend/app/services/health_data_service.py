@@ -2,35 +2,161 @@
 Service for processing and storing health data
 """
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from datetime import datetime, date
-from typing import List, Optional
-import os
+from sqlalchemy import select, update, func, text, Date, literal_column
+from datetime import datetime, date, timedelta, tzinfo
+from collections import namedtuple
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+import asyncio
+import csv
+import io
+import json
+import math
+import tempfile
+from time import perf_counter
 
+from app.core.cache import daily_series_cache
+from app.core.config import settings
+from app.core.database import engine, pin_to_primary
+from app.core.storage import get_storage
+from app.core.metrics import (
+    IMPORTS_TOTAL,
+    IMPORT_BATCH_COMMIT_SECONDS,
+    IMPORT_DURATION_SECONDS,
+    IMPORT_RECORDS_PER_SECOND,
+    IMPORT_RECORDS_TOTAL,
+    IMPORT_STAGE_SECONDS,
+    StageTimer,
+)
 from app.models.health_metric import HealthMetric
+from app.models.health_metric_rollup import HealthMetricRollup
+from app.models.dense_metric_day import DenseMetricDay
 from app.models.data_import import DataImport
+from app.models.user import User
+from app.models.workout import Workout
+from app.schemas.health_metric import HealthMetricResponse
 from app.utils.health_parser import (
+    ActivitySummaryRecord,
+    HealthRecord,
+    WorkoutRecord,
     parse_apple_health_xml,
+    parse_workout_routes,
     extract_zip_file,
+    map_dense_metric_type,
     map_metric_type,
     calculate_sleep_duration,
 )
+from app.utils.downsampling import choose_resolution, lttb
+from app.utils.series_encoding import pack_daily_series, unpack_daily_series
+from app.utils.local_time import local_day, resolve_timezone
+from app.utils.profiling import SamplingProfiler, profile_name
+from app.services.retention_service import rebucket_hourly_rollups, retention_cutoffs
+from app.services.dense_metric_service import (
+    DenseSampleBuffer,
+    is_dense_metric,
+    rebucket_dense_days,
+    store_dense_samples,
+)
+from app.services.workout_service import store_activity_summaries, store_workouts
+
+# date_trunc() units for calendar bucketing of metric timelines
+BUCKET_UNITS = {
+    "weekly": "week",
+    "monthly": "month",
+}
+
+# Buffered dense samples (heart rate etc.) are written once this many pile up
+DENSE_FLUSH_SAMPLES = 50_000
+
+# First pg_advisory_lock key of per-user import locks; the second is
+# hashtext(user_id)
+IMPORT_LOCK_NAMESPACE = 4_401_047
+
+# One aggregated bucket, shaped like the rows of the daily/bucketed queries
+_Aggregate = namedtuple("_Aggregate", "day avg_value stddev_value min_value max_value sample_size")
 
 
 async def process_health_export(
-    file_path: str,
+    storage_key: str,
     user_id: str,
     import_id: str,
     db: AsyncSession,
 ) -> int:
     """
-    Process Apple Health export file and store metrics in database
+    Process an uploaded Apple Health export and store metrics in database
+    
+    The export is read through the storage backend (app.core.storage) and
+    deleted from it once processed, whether or not the import succeeded.
+    ZIPs are extracted into a private temporary directory.
+    
+    Imports of one user run one at a time (see user_import_lock); an import
+    that was already completed by the time it gets the lock, e.g. a
+    redelivered task, isn't processed again.
+    
+    Time is tracked per stage (parse, transform, insert), stored on the import
+    record and exported as Prometheus metrics together with throughput and
+    batch commit latency. Imports flagged with DataImport.profile also run
+    under the sampling profiler.
     
     Returns number of records imported
     """
+    storage = get_storage()
+    try:
+        async with user_import_lock(user_id):
+            import_record = await db.get(DataImport, import_id)
+            if import_record:
+                await db.refresh(import_record)
+                if import_record.status == "completed":
+                    return import_record.records_imported or 0
+            
+            async with storage.local_path(storage_key) as file_path:
+                with tempfile.TemporaryDirectory(prefix="health-import-") as workdir:
+                    return await _process_export_file(file_path, workdir, user_id, import_id, db)
+    finally:
+        await storage.delete(storage_key)
+
+
+@asynccontextmanager
+async def user_import_lock(user_id: str):
+    """
+    Hold the user's import lock, waiting while another of their imports runs
+    
+    A Postgres advisory lock on its own connection, so it serializes imports
+    across API processes and Celery workers and is released if the holder dies.
+    """
+    key = {"namespace": IMPORT_LOCK_NAMESPACE, "user_id": str(user_id)}
+    async with engine.connect() as lock_conn:
+        await lock_conn.execute(text("SELECT pg_advisory_lock(:namespace, hashtext(:user_id))"), key)
+        try:
+            yield
+        finally:
+            await lock_conn.execute(text("SELECT pg_advisory_unlock(:namespace, hashtext(:user_id))"), key)
+
+
+async def _process_export_file(
+    file_path: str,
+    workdir: str,
+    user_id: str,
+    import_id: str,
+    db: AsyncSession,
+) -> int:
+    """
+    Import body for process_health_export; scratch files go to workdir
+    
+    Workout routes of a ZIP are parsed by a thread pool while export.xml is
+    extracted and parsed, and matched to the workouts at the end.
+    """
+    started = perf_counter()
+    timer = StageTimer()
+    routes_future = None
+    
     # Extract ZIP if needed
     if file_path.endswith(".zip"):
-        xml_path = extract_zip_file(file_path)
+        routes_future = asyncio.get_running_loop().run_in_executor(
+            None, parse_workout_routes, file_path, settings.ROUTE_IMPORT_WORKERS
+        )
+        with timer.stage("extract"):
+            xml_path = extract_zip_file(file_path, workdir)
         if not xml_path:
             raise ValueError("Failed to extract ZIP file")
     else:
@@ -39,86 +165,292 @@ async def process_health_export(
     records_imported = 0
     batch = []
     batch_size = 1000
+    workouts = []
+    activity_summaries = []
+    profiler = None
+    earliest_day = None  # first local day written, for refreshing running stats
     
     try:
+        # Local days are bucketed in the user's timezone, if they set one
+        user = await db.get(User, user_id)
+        zone = resolve_timezone(user.timezone) if user else None
+        dense = DenseSampleBuffer(zone)
+        
         # Update import status
         import_record = await db.get(DataImport, import_id)
         if import_record:
             import_record.status = "processing"
             await db.commit()
+            
+            if import_record.profile:
+                profiler = SamplingProfiler()
+                profiler.start()
         
         # Parse XML and insert in batches
-        for record in parse_apple_health_xml(xml_path):
-            metric_type = map_metric_type(record.record_type)
-            
-            if not metric_type:
-                continue  # Skip unmapped metrics
+        records = parse_apple_health_xml(xml_path, workouts=True)
+        # Summed inline: a timer.stage() per record costs a noticeable share of the loop
+        parse_seconds = transform_seconds = 0.0
+        try:
+            while True:
+                start = perf_counter()
+                record = next(records, None)
+                parsed = perf_counter()
+                parse_seconds += parsed - start
+                if record is None:
+                    break
             
-            # Handle sleep duration specially
-            if metric_type == "sleep_duration":
-                value = calculate_sleep_duration(record.start_date, record.end_date)
-                unit = "hours"
-            else:
-                try:
-                    value = float(record.value) if record.value else None
-                except (ValueError, TypeError):
+                if isinstance(record, WorkoutRecord):
+                    workouts.append(record)
                     continue
-                
-                if value is None:
+                if isinstance(record, ActivitySummaryRecord):
+                    activity_summaries.append(record)
                     continue
-                
-                unit = record.unit
+                if record.correlation:
+                    continue  # Copies of top-level Records
+
+                dense_type = map_dense_metric_type(record.record_type)
+                if dense_type:
+                    dense.add(dense_type, record)
+                    health_metric = None
+                else:
+                    health_metric = record_to_health_metric(record, user_id, zone)
+                transform_seconds += perf_counter() - parsed
             
-            # Create health metric
-            health_metric = HealthMetric(
-                user_id=user_id,
-                metric_type=metric_type,
-                value=value,
-                unit=unit,
-                date=record.start_date.date(),
-                timestamp=record.start_date,
-                source_device=record.source,
-            )
+                if dense.sample_count >= DENSE_FLUSH_SAMPLES:
+                    records_imported += dense.sample_count
+                    earliest_day = _earliest_day(earliest_day, (day for _, day in dense.days))
+                    with timer.stage("insert"):
+                        await store_dense_samples(user_id, dense, db)
             
-            batch.append(health_metric)
+                if health_metric is None:
+                    continue
+            
+                batch.append(health_metric)
             
-            # Insert batch when full
-            if len(batch) >= batch_size:
-                db.add_all(batch)
-                await db.commit()
-                records_imported += len(batch)
-                batch = []
+                # Insert batch when full
+                if len(batch) >= batch_size:
+                    earliest_day = _earliest_day(earliest_day, (metric.date for metric in batch))
+                    with timer.stage("insert"):
+                        await _insert_batch(batch, db)
+                    records_imported += len(batch)
+                    batch = []
+        finally:
+            timer.add("parse", parse_seconds)
+            timer.add("transform", transform_seconds)
         
         # Insert remaining records
         if batch:
-            db.add_all(batch)
-            await db.commit()
+            earliest_day = _earliest_day(earliest_day, (metric.date for metric in batch))
+            with timer.stage("insert"):
+                await _insert_batch(batch, db)
             records_imported += len(batch)
+        if dense.sample_count:
+            records_imported += dense.sample_count
+            earliest_day = _earliest_day(earliest_day, (day for _, day in dense.days))
+            with timer.stage("insert"):
+                await store_dense_samples(user_id, dense, db)
+        
+        # Time spent waiting for routes still being parsed
+        routes = {}
+        if routes_future is not None:
+            with timer.stage("routes"):
+                routes = await routes_future
+        with timer.stage("insert"):
+            records_imported += await store_workouts(user_id, workouts, routes, zone, db)
+            records_imported += await store_activity_summaries(user_id, activity_summaries, db)
         
         # Update import record
         if import_record:
             import_record.status = "completed"
             import_record.records_imported = records_imported
             import_record.completed_at = datetime.utcnow()
+            import_record.stage_timings = _stage_timings(timer)
+            if profiler:
+                profiler.stop()
+                import_record.profile_path = profiler.save(profile_name("import", str(import_id)))
             await db.commit()
         
-        # Clean up extracted file
-        if file_path.endswith(".zip") and xml_path and os.path.exists(xml_path):
-            os.remove(xml_path)
+        # Let the user read their fresh data before the replica catches up
+        await pin_to_primary(user_id)
+        await daily_series_cache.invalidate_user(str(user_id))
+        
+        if earliest_day is not None:
+            with timer.stage("running_stats"):
+                await _refresh_running_stats(user_id, db, earliest_day)
+        
+        _record_import_metrics("completed", records_imported, perf_counter() - started, timer)
         
         return records_imported
         
     except Exception as e:
+        if routes_future is not None:
+            routes_future.cancel()
         # Update import record with error
         import_record = await db.get(DataImport, import_id)
         if import_record:
             import_record.status = "failed"
             import_record.error_message = str(e)
             import_record.completed_at = datetime.utcnow()
+            import_record.stage_timings = _stage_timings(timer)
+            if profiler:
+                profiler.stop()
+                import_record.profile_path = profiler.save(profile_name("import", str(import_id)))
             await db.commit()
+        # Batches committed before the failure are kept
+        await pin_to_primary(user_id)
+        await daily_series_cache.invalidate_user(str(user_id))
+        _record_import_metrics("failed", records_imported, perf_counter() - started, timer)
         raise
 
 
+async def rebucket_local_days(user_id: str, db: AsyncSession, window_days: int = 90) -> dict:
+    """
+    Recompute a user's local days after they change timezone
+    
+    Raw samples and hourly rollups get their date recomputed from their
+    instant in SQL, window_days at a time; dense days are decoded and re-split.
+    Workouts move to their start's new local day. Daily rollups and activity
+    summaries are already per day and keep their dates. Does
+    nothing if the user has no (valid) timezone, since raw samples don't keep
+    their original UTC offset.
+    """
+    user = await db.get(User, user_id)
+    zone = resolve_timezone(user.timezone) if user else None
+    if zone is None:
+        return {"samples": 0, "hourly_rollups": 0, "dense_samples": 0, "workouts": 0}
+    
+    local_date = func.cast(func.timezone(user.timezone, HealthMetric.timestamp), Date)
+    bounds = (await db.execute(
+        select(func.min(HealthMetric.timestamp), func.max(HealthMetric.timestamp))
+        .where(HealthMetric.user_id == user_id)
+    )).one()
+    
+    samples = 0
+    if bounds[0] is not None:
+        start, last = bounds
+        while start <= last:
+            end = start + timedelta(days=window_days)
+            result = await db.execute(
+                update(HealthMetric)
+                .where(
+                    HealthMetric.user_id == user_id,
+                    HealthMetric.timestamp >= start,
+                    HealthMetric.timestamp < end,
+                    HealthMetric.date != local_date,
+                )
+                .values(date=local_date)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            samples += result.rowcount
+            start = end
+    
+    hourly = await rebucket_hourly_rollups(user_id, user.timezone, db)
+    dense_samples = await rebucket_dense_days(user_id, zone, db)
+    
+    workout_date = func.cast(func.timezone(user.timezone, Workout.start_time), Date)
+    workouts = (await db.execute(
+        update(Workout)
+        .where(Workout.user_id == user_id, Workout.date != workout_date)
+        .values(date=workout_date)
+        .execution_options(synchronize_session=False)
+    )).rowcount
+    await db.commit()
+    
+    # Let the user see their re-bucketed days before the replica catches up
+    await pin_to_primary(user_id)
+    await daily_series_cache.invalidate_user(str(user_id))
+    await _refresh_running_stats(user_id, db, date.min)
+    
+    return {"samples": samples, "hourly_rollups": hourly, "dense_samples": dense_samples, "workouts": workouts}
+
+
+def _earliest_day(current: Optional[date], days) -> Optional[date]:
+    earliest = min(days, default=None)
+    if current is None or (earliest is not None and earliest < current):
+        return earliest
+    return current
+
+
+async def _refresh_running_stats(user_id: str, db: AsyncSession, changed_from: date):
+    """Update the running statistics of the user's active interventions"""
+    # analysis_service reads through this module, so import it on use
+    from app.services.analysis_service import refresh_running_stats
+    
+    try:
+        await refresh_running_stats(user_id, db, changed_from)
+    except Exception as e:
+        # Dropped accumulators are rebuilt by the next analysis; don't fail the import
+        print(f"Error refreshing running stats for user {user_id}: {e}")
+        await db.rollback()
+
+
+def record_to_health_metric(
+    record: HealthRecord,
+    user_id: str,
+    zone: Optional[tzinfo] = None,
+) -> Optional[HealthMetric]:
+    """
+    Convert a parsed record to a HealthMetric, or None if it isn't stored
+    
+    timestamp is the record's true instant; date is its local day in zone,
+    or in the record's own UTC offset when the user has no timezone set.
+    """
+    metric_type = map_metric_type(record.record_type)
+    
+    if not metric_type:
+        return None  # Skip unmapped metrics
+    
+    # Handle sleep duration specially
+    if metric_type == "sleep_duration":
+        value = calculate_sleep_duration(record.start_date, record.end_date)
+        unit = "hours"
+    else:
+        try:
+            value = float(record.value) if record.value else None
+        except (ValueError, TypeError):
+            return None
+        
+        if value is None:
+            return None
+        
+        unit = record.unit
+    
+    return HealthMetric(
+        user_id=user_id,
+        metric_type=metric_type,
+        value=value,
+        unit=unit,
+        date=local_day(record.start_date, zone),
+        timestamp=record.start_date,
+        source_device=record.source,
+    )
+
+
+async def _insert_batch(batch: List[HealthMetric], db: AsyncSession):
+    """Insert and commit one batch of metrics, recording commit latency"""
+    start = perf_counter()
+    db.add_all(batch)
+    await db.commit()
+    IMPORT_BATCH_COMMIT_SECONDS.observe(perf_counter() - start)
+
+
+def _stage_timings(timer: StageTimer) -> dict:
+    """Per-stage seconds for storing on the import record"""
+    return {stage: round(seconds, 3) for stage, seconds in timer.totals.items()}
+
+
+def _record_import_metrics(status: str, records: int, elapsed: float, timer: StageTimer):
+    """Export the outcome of one import to Prometheus"""
+    IMPORTS_TOTAL.labels(status).inc()
+    IMPORT_RECORDS_TOTAL.inc(records)
+    IMPORT_DURATION_SECONDS.observe(elapsed)
+    if elapsed > 0:
+        IMPORT_RECORDS_PER_SECOND.set(records / elapsed)
+    for stage, seconds in timer.totals.items():
+        IMPORT_STAGE_SECONDS.labels(stage).observe(seconds)
+
+
 async def get_daily_metrics(
     user_id: str,
     metric_type: str,
@@ -129,8 +461,43 @@ async def get_daily_metrics(
     """
     Get daily aggregated metrics for a user and date range
     
-    Uses TimescaleDB continuous aggregates if available, otherwise calculates on the fly
+    Served from the daily series cache (app.core.cache) when enabled; a
+    user's entries are invalidated when their data changes (imports,
+    re-bucketing).
+    """
+    if not settings.METRICS_CACHE_ENABLED:
+        return await _query_daily_metrics(user_id, metric_type, start_date, end_date, db)
+    
+    async def load() -> bytes:
+        return pack_daily_series(await _query_daily_metrics(user_id, metric_type, start_date, end_date, db))
+    
+    packed = await daily_series_cache.get_or_load(
+        str(user_id), f"{metric_type}:{start_date.isoformat()}:{end_date.isoformat()}", load
+    )
+    return unpack_daily_series(packed, metric_type)
+
+
+async def _query_daily_metrics(
+    user_id: str,
+    metric_type: str,
+    start_date: date,
+    end_date: date,
+    db: AsyncSession,
+) -> List[dict]:
+    """
+    Daily aggregated metrics straight from the database
+    
+    Uses TimescaleDB continuous aggregates if available, otherwise calculates on the fly.
+    Ranges reaching back past RAW_RETENTION_DAYS also read the rolled-up tiers.
+    Dense metrics (heart rate etc.) come from the per-day aggregates stored
+    next to their sample arrays.
     """
+    if is_dense_metric(metric_type):
+        aggregates = await _summed_aggregates(
+            DenseMetricDay, user_id, metric_type, start_date, end_date, DenseMetricDay.date, db
+        )
+        return _format_aggregates(_merge_rollups([], aggregates), metric_type)
+    
     query = select(
         func.date(HealthMetric.date).label("day"),
         func.avg(HealthMetric.value).label("avg_value"),
@@ -152,6 +519,74 @@ async def get_daily_metrics(
     result = await db.execute(query)
     rows = result.all()
     
+    if _reads_rollups(start_date):
+        rollups = await _summed_aggregates(
+            HealthMetricRollup, user_id, metric_type, start_date, end_date, HealthMetricRollup.date, db
+        )
+        rows = _merge_rollups(rows, rollups)
+    
+    return _format_aggregates(rows, metric_type)
+
+
+async def get_bucketed_metrics(
+    user_id: str,
+    metric_type: str,
+    start_date: date,
+    end_date: date,
+    resolution: str,
+    db: AsyncSession,
+) -> List[dict]:
+    """
+    Get metrics aggregated into weekly or monthly buckets
+
+    Buckets are computed in SQL with date_trunc, so only one row per bucket
+    leaves the database. Each bucket's "day" is its first calendar day.
+    """
+    # Inline the unit so SELECT and GROUP BY render the identical expression
+    unit = literal_column(f"'{BUCKET_UNITS[resolution]}'")
+    
+    if is_dense_metric(metric_type):
+        dense_bucket = func.cast(func.date_trunc(unit, DenseMetricDay.date), Date)
+        aggregates = await _summed_aggregates(
+            DenseMetricDay, user_id, metric_type, start_date, end_date, dense_bucket, db
+        )
+        return _format_aggregates(_merge_rollups([], aggregates), metric_type)
+
+    bucket = func.cast(func.date_trunc(unit, HealthMetric.date), Date)
+
+    query = select(
+        bucket.label("day"),
+        func.avg(HealthMetric.value).label("avg_value"),
+        func.stddev(HealthMetric.value).label("stddev_value"),
+        func.min(HealthMetric.value).label("min_value"),
+        func.max(HealthMetric.value).label("max_value"),
+        func.count(HealthMetric.id).label("sample_size"),
+    ).where(
+        HealthMetric.user_id == user_id,
+        HealthMetric.metric_type == metric_type,
+        HealthMetric.date >= start_date,
+        HealthMetric.date <= end_date,
+    ).group_by(
+        bucket
+    ).order_by(
+        bucket
+    )
+
+    result = await db.execute(query)
+    rows = result.all()
+
+    if _reads_rollups(start_date):
+        rollup_bucket = func.cast(func.date_trunc(unit, HealthMetricRollup.date), Date)
+        rollups = await _summed_aggregates(
+            HealthMetricRollup, user_id, metric_type, start_date, end_date, rollup_bucket, db
+        )
+        rows = _merge_rollups(rows, rollups)
+
+    return _format_aggregates(rows, metric_type)
+
+
+def _format_aggregates(rows, metric_type: str) -> List[dict]:
+    """Aggregate rows as DailyMetricResponse-shaped dicts"""
     return [
         {
             "day": row.day.isoformat(),
@@ -164,3 +599,187 @@ async def get_daily_metrics(
         }
         for row in rows
     ]
+
+
+def _reads_rollups(start_date: date) -> bool:
+    """Whether a range can reach samples already moved into health_metric_rollups"""
+    cutoff = retention_cutoffs()["raw"]
+    # date is the sample's local day, up to a day past its UTC date
+    return cutoff is not None and start_date <= cutoff.date() + timedelta(days=1)
+
+
+async def _summed_aggregates(
+    model,
+    user_id: str,
+    metric_type: str,
+    start_date: date,
+    end_date: date,
+    key,
+    db: AsyncSession,
+) -> Dict[date, tuple]:
+    """
+    (count, sum, sum of squares, min, max) per key from a table of summed buckets
+
+    model is HealthMetricRollup or DenseMetricDay, which share those columns.
+    """
+    query = select(
+        key.label("key"),
+        func.sum(model.sample_count),
+        func.sum(model.value_sum),
+        func.sum(model.value_sum_sq),
+        func.min(model.min_value),
+        func.max(model.max_value),
+    ).where(
+        model.user_id == user_id,
+        model.metric_type == metric_type,
+        model.date >= start_date,
+        model.date <= end_date,
+    ).group_by(key)
+
+    result = await db.execute(query)
+    return {row[0]: tuple(row[1:]) for row in result.all()}
+
+
+def _merge_rollups(rows, rollups: Dict[date, tuple]) -> List[_Aggregate]:
+    """
+    Combine raw aggregate rows with summed buckets (rollups, dense days) per key
+
+    Means and variances are merged with Chan's parallel formula, so a bucket
+    split across tiers reports the same statistics as if it were all raw.
+    """
+    merged = {row.day: row for row in rows}
+    for day, (count, total, total_sq, low, high) in rollups.items():
+        mean = total / count
+        m2 = max(total_sq - total * mean, 0.0)
+        row = merged.get(day)
+        if row is not None:
+            raw_count = row.sample_size
+            raw_mean = float(row.avg_value)
+            raw_m2 = float(row.stddev_value or 0.0) ** 2 * (raw_count - 1)
+            delta = mean - raw_mean
+            combined = raw_count + count
+            m2 = raw_m2 + m2 + delta * delta * raw_count * count / combined
+            mean = raw_mean + delta * count / combined
+            count = combined
+            low = min(low, row.min_value)
+            high = max(high, row.max_value)
+        stddev = math.sqrt(m2 / (count - 1)) if count > 1 else None
+        merged[day] = _Aggregate(day, mean, stddev, low, high, count)
+    return [merged[day] for day in sorted(merged)]
+
+
+async def get_timeline_metrics(
+    user_id: str,
+    metric_type: str,
+    start_date: date,
+    end_date: date,
+    db: AsyncSession,
+    resolution: str = "auto",
+    max_points: Optional[int] = None,
+) -> List[dict]:
+    """
+    Get a chart-ready metric timeline with a bounded number of points
+
+    resolution is one of "auto", "daily", "weekly", "monthly" or "lttb".
+    "auto" picks the finest calendar bucket that fits max_points; "lttb"
+    applies Largest-Triangle-Three-Buckets to the daily series. Whatever the
+    resolution, the result never has more than max_points points.
+    """
+    if resolution == "auto":
+        resolution = choose_resolution(start_date, end_date, max_points) if max_points else "daily"
+
+    if resolution in BUCKET_UNITS:
+        metrics = await get_bucketed_metrics(
+            user_id, metric_type, start_date, end_date, resolution, db
+        )
+    else:
+        metrics = await get_daily_metrics(user_id, metric_type, start_date, end_date, db)
+
+    if max_points and len(metrics) > max_points:
+        metrics = lttb(metrics, max_points)
+
+    return metrics
+
+
+# Columns exported for raw samples, in HealthMetricResponse field order
+EXPORT_FIELDS = list(HealthMetricResponse.model_fields)
+
+
+async def stream_raw_metrics(
+    user_id: str,
+    metric_type: str,
+    start: datetime,
+    end: datetime,
+    db: AsyncSession,
+    batch_size: int = 5000,
+) -> AsyncIterator[list]:
+    """
+    Stream raw health metric rows in batches using a server-side cursor
+
+    Selects plain columns (no ORM identity map) and fetches batch_size rows at a
+    time, so memory stays constant regardless of how many rows match.
+    """
+    query = select(
+        *(getattr(HealthMetric, field) for field in EXPORT_FIELDS)
+    ).where(
+        HealthMetric.user_id == user_id,
+        HealthMetric.metric_type == metric_type,
+        HealthMetric.timestamp >= start,
+        HealthMetric.timestamp < end,
+    ).order_by(
+        HealthMetric.timestamp
+    ).execution_options(yield_per=batch_size)
+
+    result = await db.stream(query)
+    async for partition in result.partitions():
+        yield partition
+
+
+async def export_raw_metrics(
+    user_id: str,
+    metric_type: str,
+    start: datetime,
+    end: datetime,
+    export_format: str = "ndjson",
+    batch_size: int = 5000,
+) -> AsyncIterator[bytes]:
+    """
+    Encode raw health metrics as NDJSON or CSV, one chunk per fetched batch
+
+    Opens its own read session because the response body is produced after
+    the request's dependencies have been torn down.
+    """
+    from app.core.database import read_session_factory
+
+    session_factory = await read_session_factory(user_id)
+    async with session_factory() as db:
+        if export_format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_FIELDS)
+            yield buffer.getvalue().encode()
+
+        async for rows in stream_raw_metrics(user_id, metric_type, start, end, db, batch_size):
+            if export_format == "csv":
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerows(
+                    [_export_value(value) for value in row] for row in rows
+                )
+                yield buffer.getvalue().encode()
+            else:
+                yield "".join(
+                    json.dumps(
+                        {field: _export_value(value) for field, value in zip(EXPORT_FIELDS, row)}
+                    ) + "\n"
+                    for row in rows
+                ).encode()
+
+
+def _export_value(value):
+    """Convert a column value to a JSON/CSV friendly scalar"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if value is not None and not isinstance(value, (str, int, float)):
+        return str(value)
+    return value
@@ -0,0 +1,126 @@
+"""
+Service for scheduled, change-driven recomputation of analyses
+"""
+import asyncio
+from datetime import datetime, timezone
+from time import monotonic
+from typing import List
+
+from sqlalchemy import and_, exists, or_, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, engine
+from app.models.data_import import DataImport
+from app.models.intervention import Intervention
+from app.models.user import User
+from app.services.analysis_service import analyze_intervention, analyze_user_interventions
+
+# pg_advisory_lock key held while a recompute run is in progress
+RECOMPUTE_LOCK_KEY = 4_401_044
+
+
+def _changed_since_analysis():
+    """Users with a completed import or an edited intervention since their last recompute"""
+    never = User.analyzed_at.is_(None)
+    new_import = exists().where(
+        DataImport.user_id == User.id,
+        DataImport.status == "completed",
+        or_(never, DataImport.completed_at > User.analyzed_at),
+    )
+    edited_intervention = exists().where(
+        Intervention.user_id == User.id,
+        or_(never, Intervention.updated_at > User.analyzed_at),
+    )
+    has_active = exists().where(Intervention.user_id == User.id, Intervention.status == "active")
+    return and_(has_active, or_(new_import, edited_intervention))
+
+
+async def users_needing_recompute(db: AsyncSession, limit: int) -> List[str]:
+    """Up to limit changed users, longest-unanalyzed first"""
+    result = await db.execute(
+        select(User.id)
+        .where(_changed_since_analysis())
+        .order_by(User.analyzed_at.asc().nulls_first())
+        .limit(limit)
+    )
+    return [str(user_id) for user_id in result.scalars()]
+
+
+async def recompute_user_analyses(user_id: str, db: AsyncSession) -> int:
+    """
+    Recompute all active interventions of a user, then their joint model
+    
+    analyzed_at is set to the time the recompute started, so changes made
+    while it runs are picked up by the next run. Returns the number of
+    interventions analyzed.
+    """
+    started = datetime.now(timezone.utc)
+    intervention_ids = (await db.execute(
+        select(Intervention.id).where(Intervention.user_id == user_id, Intervention.status == "active")
+    )).scalars().all()
+    
+    for intervention_id in intervention_ids:
+        await analyze_intervention(str(intervention_id), db)
+    await analyze_user_interventions(user_id, db)
+    
+    user = await db.get(User, user_id)
+    user.analyzed_at = started
+    await db.commit()
+    return len(intervention_ids)
+
+
+async def recompute_changed_analyses() -> dict:
+    """
+    One rate-limited scheduled run over users whose data changed
+    
+    Users are handled one at a time with ANALYSIS_RECOMPUTE_PAUSE_SECONDS
+    between them, on a single session bound to one connection that also holds
+    the advisory lock preventing overlapping runs, so a run adds at most one
+    connection's worth of load. A run stops after ANALYSIS_RECOMPUTE_MAX_USERS
+    users or ANALYSIS_RECOMPUTE_MAX_SECONDS; the rest wait for the next run.
+    
+    A user whose recompute fails gets analyzed_at bumped anyway, so they go
+    behind everyone else instead of being retried first on every run; their
+    next import or intervention edit queues them again.
+    """
+    async with engine.connect() as conn:
+        locked = (await conn.execute(
+            text("SELECT pg_try_advisory_lock(:key)"), {"key": RECOMPUTE_LOCK_KEY}
+        )).scalar()
+        # The lock is held by the connection, not the transaction
+        await conn.commit()
+        if not locked:
+            return {"skipped": "another recompute is running"}
+        
+        try:
+            async with AsyncSessionLocal(bind=conn) as db:
+                deadline = monotonic() + settings.ANALYSIS_RECOMPUTE_MAX_SECONDS
+                user_ids = await users_needing_recompute(db, settings.ANALYSIS_RECOMPUTE_MAX_USERS)
+                users = 0
+                failed = 0
+                interventions = 0
+                for user_id in user_ids:
+                    if monotonic() > deadline:
+                        break
+                    started = datetime.now(timezone.utc)
+                    try:
+                        interventions += await recompute_user_analyses(user_id, db)
+                        users += 1
+                    except Exception as e:
+                        print(f"Error recomputing analyses for user {user_id}: {e}")
+                        await db.rollback()
+                        await db.execute(update(User).where(User.id == user_id).values(analyzed_at=started))
+                        await db.commit()
+                        failed += 1
+                    await asyncio.sleep(settings.ANALYSIS_RECOMPUTE_PAUSE_SECONDS)
+                
+                return {
+                    "users": users,
+                    "failed": failed,
+                    "interventions": interventions,
+                    "pending": len(user_ids) - users - failed,
+                }
+        finally:
+            await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": RECOMPUTE_LOCK_KEY})
+            await conn.commit()
@@ -0,0 +1,182 @@
+"""
+Service for tiered retention of health metrics
+
+Raw samples older than RAW_RETENTION_DAYS are rolled into hourly buckets in
+health_metric_rollups and deleted; hourly buckets older than
+HOURLY_RETENTION_DAYS are merged into daily ones. Each move is a single
+DELETE ... RETURNING feeding an additive upsert, so samples are counted
+exactly once even when historic imports land in already rolled-up ranges.
+
+Expired samples usually sit in compressed chunks; deleting from those needs
+TimescaleDB 2.11 or newer.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import Date, DateTime, cast, delete, func, literal, literal_column, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.health_metric import HealthMetric
+from app.models.health_metric_rollup import HealthMetricRollup
+
+ROLLUP_KEY = ["user_id", "metric_type", "resolution", "bucket", "date"]
+ROLLUP_VALUES = ["sample_count", "value_sum", "value_sum_sq", "min_value", "max_value"]
+
+
+def retention_cutoffs(now: Optional[datetime] = None) -> dict:
+    """Instants before which raw samples / hourly buckets are rolled up (None = keep)"""
+    now = now or datetime.now(timezone.utc)
+    raw_days = settings.RAW_RETENTION_DAYS
+    hourly_days = settings.HOURLY_RETENTION_DAYS
+    return {
+        "raw": now - timedelta(days=raw_days) if raw_days > 0 else None,
+        # Hourly buckets can't expire before the raw samples they come from
+        "hourly": now - timedelta(days=max(hourly_days, raw_days)) if raw_days > 0 and hourly_days > 0 else None,
+    }
+
+
+def _upsert_rollups(rows):
+    """INSERT ... SELECT into health_metric_rollups, adding onto existing buckets"""
+    stmt = insert(HealthMetricRollup).from_select(ROLLUP_KEY + ROLLUP_VALUES, rows)
+    existing = HealthMetricRollup.__table__.c
+    return stmt.on_conflict_do_update(
+        index_elements=ROLLUP_KEY,
+        set_={
+            "sample_count": existing.sample_count + stmt.excluded.sample_count,
+            "value_sum": existing.value_sum + stmt.excluded.value_sum,
+            "value_sum_sq": existing.value_sum_sq + stmt.excluded.value_sum_sq,
+            "min_value": func.least(existing.min_value, stmt.excluded.min_value),
+            "max_value": func.greatest(existing.max_value, stmt.excluded.max_value),
+        },
+    )
+
+
+def _raw_to_hourly(start: datetime, end: datetime):
+    moved = (
+        delete(HealthMetric)
+        .where(HealthMetric.timestamp >= start, HealthMetric.timestamp < end)
+        .returning(
+            HealthMetric.user_id,
+            HealthMetric.metric_type,
+            HealthMetric.date,
+            HealthMetric.timestamp,
+            HealthMetric.value,
+        )
+        .cte("moved")
+    )
+    bucket = func.date_trunc(literal_column("'hour'"), moved.c.timestamp, literal_column("'UTC'"))
+    rows = select(
+        moved.c.user_id,
+        moved.c.metric_type,
+        literal("hour"),
+        bucket,
+        moved.c.date,
+        func.count(),
+        func.sum(moved.c.value),
+        func.sum(moved.c.value * moved.c.value),
+        func.min(moved.c.value),
+        func.max(moved.c.value),
+    ).group_by(moved.c.user_id, moved.c.metric_type, bucket, moved.c.date)
+    return _upsert_rollups(rows)
+
+
+def _hourly_to_daily(start: datetime, end: datetime):
+    moved = (
+        delete(HealthMetricRollup)
+        .where(
+            HealthMetricRollup.resolution == "hour",
+            HealthMetricRollup.bucket >= start,
+            HealthMetricRollup.bucket < end,
+        )
+        .returning(*[HealthMetricRollup.__table__.c[name] for name in ROLLUP_KEY + ROLLUP_VALUES])
+        .cte("moved")
+    )
+    # Daily buckets are keyed by the sample's date; bucket is its UTC midnight
+    bucket = func.timezone(literal_column("'UTC'"), cast(moved.c.date, DateTime))
+    rows = select(
+        moved.c.user_id,
+        moved.c.metric_type,
+        literal("day"),
+        bucket,
+        moved.c.date,
+        func.sum(moved.c.sample_count),
+        func.sum(moved.c.value_sum),
+        func.sum(moved.c.value_sum_sq),
+        func.min(moved.c.min_value),
+        func.max(moved.c.max_value),
+    ).group_by(moved.c.user_id, moved.c.metric_type, moved.c.date)
+    return _upsert_rollups(rows)
+
+
+async def _move_in_windows(oldest, cutoff: datetime, build, db: AsyncSession, window: timedelta) -> int:
+    """Run build(start, end) over [oldest, cutoff) one window (and commit) at a time"""
+    if oldest is None or oldest >= cutoff:
+        return 0
+    buckets = 0
+    start = oldest
+    while start < cutoff:
+        end = min(start + window, cutoff)
+        result = await db.execute(build(start, end))
+        await db.commit()
+        buckets += result.rowcount
+        start = end
+    return buckets
+
+
+async def apply_retention(db: AsyncSession, now: Optional[datetime] = None, window_days: int = 7) -> dict:
+    """
+    Roll expired raw samples into hourly buckets and old hourly buckets into daily ones
+
+    Works through the expired range window_days at a time so each
+    transaction stays small. Returns the number of buckets written per tier.
+    """
+    cutoffs = retention_cutoffs(now)
+    window = timedelta(days=window_days)
+    written = {"hourly": 0, "daily": 0}
+
+    if cutoffs["raw"] is not None:
+        oldest = (await db.execute(select(func.min(HealthMetric.timestamp)))).scalar()
+        written["hourly"] = await _move_in_windows(oldest, cutoffs["raw"], _raw_to_hourly, db, window)
+
+    if cutoffs["hourly"] is not None:
+        oldest = (await db.execute(
+            select(func.min(HealthMetricRollup.bucket)).where(HealthMetricRollup.resolution == "hour")
+        )).scalar()
+        written["daily"] = await _move_in_windows(oldest, cutoffs["hourly"], _hourly_to_daily, db, window)
+
+    return written
+
+
+async def rebucket_hourly_rollups(user_id: str, timezone_name: str, db: AsyncSession) -> int:
+    """
+    Recompute the local date of a user's hourly buckets in timezone_name
+
+    Each hour is dated by its start, and buckets are moved (and merged where
+    two now share a key) like any other rollup, so the sums stay exact.
+    Returns the number of buckets written.
+    """
+    moved = (
+        delete(HealthMetricRollup)
+        .where(HealthMetricRollup.user_id == user_id, HealthMetricRollup.resolution == "hour")
+        .returning(*[HealthMetricRollup.__table__.c[name] for name in ROLLUP_KEY + ROLLUP_VALUES])
+        .cte("moved")
+    )
+    local_date = cast(func.timezone(timezone_name, moved.c.bucket), Date)
+    rows = select(
+        moved.c.user_id,
+        moved.c.metric_type,
+        moved.c.resolution,
+        moved.c.bucket,
+        local_date,
+        func.sum(moved.c.sample_count),
+        func.sum(moved.c.value_sum),
+        func.sum(moved.c.value_sum_sq),
+        func.min(moved.c.min_value),
+        func.max(moved.c.max_value),
+    ).group_by(moved.c.user_id, moved.c.metric_type, moved.c.resolution, moved.c.bucket, local_date)
+
+    result = await db.execute(_upsert_rollups(rows))
+    await db.commit()
+    return result.rowcount
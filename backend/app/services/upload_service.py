@@ -0,0 +1,260 @@
+"""
+Service for storing uploaded exports (single and resumable chunked uploads)
+"""
+import asyncio
+import hashlib
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.storage import get_storage
+from app.models.data_import import DataImport
+from app.models.upload_session import UploadSession
+
+EXPORT_EXTENSIONS = (".xml", ".zip")
+
+# First pg_advisory_xact_lock key of per-user duplicate checks; the second is
+# hashtext(user_id)
+UPLOAD_LOCK_NAMESPACE = 4_401_046
+
+
+class UploadOffsetError(ValueError):
+    """A chunk starts past the bytes received so far"""
+
+    def __init__(self, received_bytes: int):
+        super().__init__(f"Chunk must start at or before byte {received_bytes}")
+        self.received_bytes = received_bytes
+
+
+def export_extension(filename: str) -> str:
+    """".xml" or ".zip"; raises ValueError for other files"""
+    extension = os.path.splitext(filename.lower())[1]
+    if extension not in EXPORT_EXTENSIONS:
+        raise ValueError("File must be .xml or .zip")
+    return extension
+
+
+def check_upload_size(size_bytes: int):
+    if size_bytes > settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024:
+        raise ValueError(f"File size exceeds maximum of {settings.MAX_UPLOAD_SIZE_MB}MB")
+
+
+async def _create_import(
+    user_id: str,
+    filename: str,
+    size_bytes: int,
+    content_sha256: str,
+    profile: bool,
+    db: AsyncSession,
+) -> DataImport:
+    import_record = DataImport(
+        user_id=user_id,
+        filename=filename,
+        file_size_mb=size_bytes / (1024 * 1024),
+        content_sha256=content_sha256,
+        status="pending",
+        profile=profile,
+    )
+    db.add(import_record)
+    await db.flush()
+    import_record.storage_key = f"imports/{import_record.id}{export_extension(filename)}"
+    return import_record
+
+
+async def _find_duplicate(user_id: str, content_sha256: str, db: AsyncSession) -> Optional[DataImport]:
+    """
+    The user's import of the same content, if a re-upload should reuse it
+
+    Completed imports count, and so do pending or processing ones started
+    within IMPORT_STALE_HOURS. Older pending or processing imports are taken
+    to be stuck (their worker died or the task was lost) and are marked
+    failed, so the content is imported again.
+
+    Takes the user's upload lock for the rest of the transaction, so two
+    uploads of one file (a double click) can't both miss each other.
+    """
+    await db.execute(
+        text("SELECT pg_advisory_xact_lock(:namespace, hashtext(:user_id))"),
+        {"namespace": UPLOAD_LOCK_NAMESPACE, "user_id": str(user_id)},
+    )
+    imports = (await db.execute(
+        select(DataImport)
+        .where(
+            DataImport.user_id == user_id,
+            DataImport.content_sha256 == content_sha256,
+            DataImport.status != "failed",
+        )
+        .order_by(DataImport.started_at.desc())
+    )).scalars().all()
+
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=settings.IMPORT_STALE_HOURS)
+    duplicate = None
+    for import_record in imports:
+        if import_record.status == "completed" or import_record.started_at >= cutoff:
+            duplicate = duplicate or import_record
+        else:
+            import_record.status = "failed"
+            import_record.error_message = f"Not finished after {settings.IMPORT_STALE_HOURS} hours; uploaded again"
+    return duplicate
+
+
+async def store_upload(
+    user_id: str,
+    filename: str,
+    content: bytes,
+    db: AsyncSession,
+    profile: bool = False,
+) -> Tuple[DataImport, bool]:
+    """
+    Store a whole uploaded export and create its pending import
+
+    If the user already uploaded the same content (and that import completed
+    or is still under way), nothing is stored and the existing import is
+    returned instead.
+    Returns the import and whether it was created.
+    """
+    check_upload_size(len(content))
+    content_sha256 = await asyncio.to_thread(lambda: hashlib.sha256(content).hexdigest())
+
+    existing = await _find_duplicate(user_id, content_sha256, db)
+    if existing:
+        await db.commit()
+        return existing, False
+
+    import_record = await _create_import(user_id, filename, len(content), content_sha256, profile, db)
+    await get_storage().save(import_record.storage_key, content)
+    await db.commit()
+    await db.refresh(import_record)
+    return import_record, True
+
+
+async def create_upload_session(user_id: str, filename: str, size_bytes: int, db: AsyncSession) -> UploadSession:
+    """Start a resumable upload of size_bytes"""
+    check_upload_size(size_bytes)
+    upload_id = uuid.uuid4()
+    upload = UploadSession(
+        id=upload_id,
+        user_id=user_id,
+        filename=filename,
+        size_bytes=size_bytes,
+        received_bytes=0,
+        storage_key=f"uploads/{upload_id}{export_extension(filename)}",
+    )
+    await get_storage().create(upload.storage_key)
+    db.add(upload)
+    await db.commit()
+    await db.refresh(upload)
+    return upload
+
+
+async def write_upload_chunk(upload_id, start: int, data: bytes, db: AsyncSession) -> UploadSession:
+    """
+    Write one chunk at byte offset start
+
+    A chunk may overlap bytes already received (a retried request), but not
+    leave a gap: starting past received_bytes raises UploadOffsetError. The
+    session row is locked while writing, so concurrent chunks of one upload
+    are applied one at a time.
+    """
+    upload = (await db.execute(
+        select(UploadSession).where(UploadSession.id == upload_id).with_for_update()
+    )).scalar_one()
+    if upload.status != "open":
+        raise ValueError(f"Upload is {upload.status}")
+    if start > upload.received_bytes:
+        raise UploadOffsetError(upload.received_bytes)
+    if start + len(data) > upload.size_bytes:
+        raise ValueError(f"Chunk extends past the declared size of {upload.size_bytes} bytes")
+
+    await get_storage().write_at(upload.storage_key, start, data)
+    upload.received_bytes = max(upload.received_bytes, start + len(data))
+    await db.commit()
+    await db.refresh(upload)
+    return upload
+
+
+async def _content_sha256(key: str) -> str:
+    """SHA-256 of a stored object, hashed in worker threads (hashlib releases the GIL)"""
+    digest = hashlib.sha256()
+    async for chunk in get_storage().read_chunks(key):
+        await asyncio.to_thread(digest.update, chunk)
+    return digest.hexdigest()
+
+
+async def _lock_upload(upload_id, db: AsyncSession) -> Tuple[UploadSession, Optional[DataImport]]:
+    """Lock an upload for completion; returns it and its import if it was already completed"""
+    upload = (await db.execute(
+        select(UploadSession)
+        .where(UploadSession.id == upload_id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )).scalar_one()
+    if upload.status == "completed" and upload.import_id:
+        import_record = await db.get(DataImport, upload.import_id)
+        if import_record:
+            return upload, import_record
+    if upload.status != "open":
+        raise ValueError(f"Upload is {upload.status}")
+    if upload.received_bytes < upload.size_bytes:
+        raise UploadOffsetError(upload.received_bytes)
+    return upload, None
+
+
+async def complete_upload(upload_id, db: AsyncSession, profile: bool = False) -> Tuple[DataImport, bool]:
+    """
+    Turn a fully received upload into a pending import
+
+    The stored content is hashed first, outside any transaction and off the
+    event loop (an upload can be hundreds of MB); a duplicate of one of the
+    user's imports is dropped in favour of that import, as in store_upload.
+    Completing an upload twice, or twice at once, returns its import again.
+    Returns the import and whether it was created.
+    """
+    upload, import_record = await _lock_upload(upload_id, db)
+    await db.commit()
+    if import_record:
+        return import_record, False
+
+    content_sha256 = await _content_sha256(upload.storage_key)
+
+    upload, import_record = await _lock_upload(upload_id, db)
+    if import_record:
+        await db.commit()
+        return import_record, False
+
+    storage = get_storage()
+    import_record = await _find_duplicate(upload.user_id, content_sha256, db)
+    created = import_record is None
+    if created:
+        import_record = await _create_import(
+            upload.user_id, upload.filename, upload.size_bytes, content_sha256, profile, db
+        )
+        await storage.move(upload.storage_key, import_record.storage_key)
+        upload.storage_key = import_record.storage_key
+    else:
+        await storage.delete(upload.storage_key)
+    upload.status = "completed"
+    upload.import_id = import_record.id
+    await db.commit()
+    await db.refresh(import_record)
+    return import_record, created
+
+
+async def expire_upload_sessions(db: AsyncSession, now: Optional[datetime] = None) -> int:
+    """Drop open uploads idle for UPLOAD_SESSION_TTL_HOURS and their partial objects"""
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS)
+    stale = (await db.execute(
+        select(UploadSession).where(UploadSession.status == "open", UploadSession.updated_at < cutoff)
+    )).scalars().all()
+
+    storage = get_storage()
+    for upload in stale:
+        await storage.delete(upload.storage_key)
+        upload.status = "expired"
+    await db.commit()
+    return len(stale)
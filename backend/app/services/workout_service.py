@@ -0,0 +1,147 @@
+"""
+Service for storing and reading workouts and activity summaries
+"""
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import defer
+from datetime import date, timedelta, tzinfo
+from typing import Dict, List, Optional
+
+from app.models.workout import ActivitySummary, Workout
+from app.utils.health_parser import ActivitySummaryRecord, WorkoutRecord, WorkoutRoute
+from app.utils.local_time import local_day
+
+# Rows per upsert statement
+UPSERT_BATCH_SIZE = 500
+
+# Routes without a FileReference are matched to a workout running at their
+# first point, with this much slack either side
+ROUTE_MATCH_SLACK = timedelta(minutes=2)
+
+
+def match_routes(workouts: List[WorkoutRecord], routes: Dict[str, WorkoutRoute]) -> List[Optional[WorkoutRoute]]:
+    """
+    Route of each workout, in order
+
+    Workouts name their route file in the export (WorkoutRoute/FileReference);
+    for exports that don't, a route is matched by its start time instead.
+    Each route is used at most once.
+    """
+    matched = [routes.get(workout.route_file) if workout.route_file else None for workout in workouts]
+    claimed = {route.file for route in matched if route is not None}
+
+    unclaimed = [route for route in routes.values() if route.file not in claimed and route.started_at]
+    for route in sorted(unclaimed, key=lambda route: route.started_at):
+        for i, workout in enumerate(workouts):
+            if matched[i] is None and (
+                workout.start_date - ROUTE_MATCH_SLACK <= route.started_at <= workout.end_date + ROUTE_MATCH_SLACK
+            ):
+                matched[i] = route
+                break
+    return matched
+
+
+async def store_workouts(
+    user_id: str,
+    workouts: List[WorkoutRecord],
+    routes: Dict[str, WorkoutRoute],
+    zone: Optional[tzinfo],
+    db: AsyncSession,
+) -> int:
+    """
+    Upsert parsed workouts with their routes and commit
+
+    A workout already stored (same start and activity type) is updated; its
+    route is kept if the new export has none. Returns the number of workouts.
+    """
+    rows = {}
+    for workout, route in zip(workouts, match_routes(workouts, routes)):
+        # Keyed like uq_workout_user_start_type: one statement can't update a row twice
+        rows[(workout.start_date, workout.activity_type)] = {
+            "user_id": user_id,
+            "activity_type": workout.activity_type,
+            "start_time": workout.start_date,
+            "end_time": workout.end_date,
+            "date": local_day(workout.start_date, zone),
+            "duration_minutes": workout.duration_minutes,
+            "distance_km": workout.distance_km,
+            "energy_kcal": workout.energy_kcal,
+            "source_device": workout.source[:100] if workout.source else None,
+            "route_point_count": route.point_count if route else None,
+            "route_polyline": route.polyline if route else None,
+        }
+
+    values = list(rows.values())
+    existing = Workout.__table__.c
+    for start in range(0, len(values), UPSERT_BATCH_SIZE):
+        stmt = insert(Workout).values(values[start:start + UPSERT_BATCH_SIZE])
+        await db.execute(stmt.on_conflict_do_update(
+            constraint="uq_workout_user_start_type",
+            set_={
+                "end_time": stmt.excluded.end_time,
+                "date": stmt.excluded.date,
+                "duration_minutes": stmt.excluded.duration_minutes,
+                "distance_km": stmt.excluded.distance_km,
+                "energy_kcal": stmt.excluded.energy_kcal,
+                "source_device": stmt.excluded.source_device,
+                "route_point_count": func.coalesce(stmt.excluded.route_point_count, existing.route_point_count),
+                "route_polyline": func.coalesce(stmt.excluded.route_polyline, existing.route_polyline),
+            },
+        ))
+    await db.commit()
+    return len(values)
+
+
+async def store_activity_summaries(user_id: str, summaries: List[ActivitySummaryRecord], db: AsyncSession) -> int:
+    """Upsert parsed activity summaries (one per day) and commit; returns how many"""
+    rows = {summary.date: {"user_id": user_id, **summary._asdict()} for summary in summaries}
+    values = list(rows.values())
+    for start in range(0, len(values), UPSERT_BATCH_SIZE):
+        stmt = insert(ActivitySummary).values(values[start:start + UPSERT_BATCH_SIZE])
+        await db.execute(stmt.on_conflict_do_update(
+            index_elements=["user_id", "date"],
+            set_={
+                column: stmt.excluded[column]
+                for column in ActivitySummaryRecord._fields if column != "date"
+            },
+        ))
+    await db.commit()
+    return len(values)
+
+
+async def get_workouts(
+    user_id: str,
+    start_date: date,
+    end_date: date,
+    db: AsyncSession,
+    activity_type: Optional[str] = None,
+) -> List[Workout]:
+    """A user's workouts on local days start_date..end_date, without their routes"""
+    query = (
+        select(Workout)
+        .options(defer(Workout.route_polyline))
+        .where(Workout.user_id == user_id, Workout.date >= start_date, Workout.date <= end_date)
+        .order_by(Workout.start_time)
+    )
+    if activity_type:
+        query = query.where(Workout.activity_type == activity_type)
+    return (await db.execute(query)).scalars().all()
+
+
+async def get_activity_summaries(
+    user_id: str,
+    start_date: date,
+    end_date: date,
+    db: AsyncSession,
+) -> List[ActivitySummary]:
+    """A user's activity summaries for start_date..end_date"""
+    return (await db.execute(
+        select(ActivitySummary)
+        .where(
+            ActivitySummary.user_id == user_id,
+            ActivitySummary.date >= start_date,
+            ActivitySummary.date <= end_date,
+        )
+        .order_by(ActivitySummary.date)
+    )).scalars().all()
@@ -9,24 +9,30 @@ sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 from celery_app import celery_app
 from app.services.health_data_service import process_health_export
-from app.core.database import AsyncSessionLocal
+from app.core.database import AsyncSessionLocal, dispose_engines
+from app.core.redis import close_redis
 import asyncio
 
 
 @celery_app.task(bind=True, name="process_health_export")
-def process_health_export_task(self, file_path: str, user_id: str, import_id: str):
+def process_health_export_task(self, storage_key: str, user_id: str, import_id: str):
     """
-    Celery task to process health export file
+    Celery task to process an uploaded export, given its storage key
     
     Note: This is a synchronous wrapper around async code
     """
     async def run():
-        async with AsyncSessionLocal() as db:
-            try:
-                records = await process_health_export(file_path, user_id, import_id, db)
-                return {"status": "completed", "records_imported": records}
-            except Exception as e:
-                return {"status": "failed", "error": str(e)}
+        try:
+            async with AsyncSessionLocal() as db:
+                try:
+                    records = await process_health_export(storage_key, user_id, import_id, db)
+                    return {"status": "completed", "records_imported": records}
+                except Exception as e:
+                    return {"status": "failed", "error": str(e)}
+        finally:
+            # Connections are bound to this task's event loop
+            await dispose_engines()
+            await close_redis()
     
     # Run async function in sync context
     result = asyncio.run(run())
@@ -0,0 +1,89 @@
+"""
+Celery tasks for periodic database maintenance
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from celery_app import celery_app
+from app.services.retention_service import apply_retention
+from app.services.change_point_service import detect_all_change_points
+from app.services.recompute_service import recompute_changed_analyses
+from app.services.upload_service import expire_upload_sessions
+from app.core.database import AsyncSessionLocal, dispose_engines
+from app.core.redis import close_redis
+import asyncio
+
+
+@celery_app.task(name="apply_retention")
+def apply_retention_task():
+    """
+    Roll expired raw samples and hourly buckets into coarser tiers
+    
+    Scheduled nightly by Celery beat; a no-op while RAW_RETENTION_DAYS is 0.
+    """
+    async def run():
+        try:
+            async with AsyncSessionLocal() as db:
+                return await apply_retention(db)
+        finally:
+            await dispose_engines()
+            await close_redis()
+    
+    return asyncio.run(run())
+
+
+@celery_app.task(name="detect_change_points")
+def detect_change_points_task():
+    """
+    Scan every user's daily series for change points
+    
+    Scheduled nightly by Celery beat, after the retention rollups.
+    """
+    async def run():
+        try:
+            async with AsyncSessionLocal() as db:
+                return await detect_all_change_points(db)
+        finally:
+            await dispose_engines()
+            await close_redis()
+    
+    return asyncio.run(run())
+
+
+@celery_app.task(name="recompute_changed_analyses")
+def recompute_changed_analyses_task():
+    """
+    Recompute analyses of users with new imports or edited interventions
+    
+    Scheduled every 15 minutes during ANALYSIS_RECOMPUTE_HOURS; each run is
+    capped in users and time.
+    """
+    async def run():
+        try:
+            return await recompute_changed_analyses()
+        finally:
+            await dispose_engines()
+            await close_redis()
+    
+    return asyncio.run(run())
+
+
+@celery_app.task(name="expire_upload_sessions")
+def expire_upload_sessions_task():
+    """
+    Delete resumable uploads abandoned for UPLOAD_SESSION_TTL_HOURS
+    
+    Scheduled hourly by Celery beat.
+    """
+    async def run():
+        try:
+            async with AsyncSessionLocal() as db:
+                return await expire_upload_sessions(db)
+        finally:
+            await dispose_engines()
+            await close_redis()
+    
+    return asyncio.run(run())
@@ -0,0 +1,43 @@
+"""
+Celery signal handlers exporting task metrics to Prometheus
+"""
+import os
+from time import perf_counter
+
+from celery.signals import task_prerun, task_postrun, worker_init, worker_process_shutdown
+from prometheus_client import multiprocess, start_http_server
+
+from app.core.config import settings
+from app.core.metrics import CELERY_TASK_DURATION_SECONDS, metrics_registry
+
+_task_started = {}
+
+
+@task_prerun.connect
+def on_task_prerun(task_id=None, **kwargs):
+    _task_started[task_id] = perf_counter()
+
+
+@task_postrun.connect
+def on_task_postrun(task_id=None, task=None, state=None, **kwargs):
+    started = _task_started.pop(task_id, None)
+    if started is not None and task is not None:
+        CELERY_TASK_DURATION_SECONDS.labels(task.name, state or "UNKNOWN").observe(
+            perf_counter() - started
+        )
+
+
+@worker_init.connect
+def on_worker_init(**kwargs):
+    """Serve metrics from the worker's main process (aggregates pool children)"""
+    try:
+        start_http_server(settings.CELERY_METRICS_PORT, registry=metrics_registry())
+    except OSError as e:
+        print(f"Could not start Celery metrics server: {e}")
+
+
+@worker_process_shutdown.connect
+def on_worker_process_shutdown(pid=None, **kwargs):
+    """Drop live gauges of a pool child that exited (multiprocess mode only)"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid or os.getpid())
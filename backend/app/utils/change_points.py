@@ -0,0 +1,93 @@
+"""
+Change-point detection on daily series (binary segmentation with prefix sums)
+"""
+import math
+from typing import List, NamedTuple, Sequence
+
+
+class ChangePoint(NamedTuple):
+    """A shift in the mean of a series, starting at index"""
+    index: int
+    mean_before: float
+    mean_after: float
+    score: float  # drop in squared error from the split, in units of noise variance
+
+
+def noise_variance(values) -> float:
+    """
+    Robust estimate of the noise variance of a series with level shifts
+
+    Uses the median absolute difference between neighbours, which a handful of
+    shifts barely moves, unlike the variance of the whole series. In quantized
+    series (integer scores, rounded readings) most neighbours are equal and
+    that median is 0, so it falls back to half the mean squared difference
+    between neighbours, where each shift adds only one term.
+    """
+    import numpy as np
+
+    if len(values) < 3:
+        return 0.0
+    differences = np.diff(values)
+    sigma = float(np.median(np.abs(differences))) / (0.6745 * math.sqrt(2))
+    if sigma > 0:
+        return sigma * sigma
+    return float(np.mean(differences * differences)) / 2
+
+
+def detect_mean_shifts(
+    values: Sequence[float],
+    min_size: int = 7,
+    penalty: float = 3.0,
+    max_changes: int = 10,
+) -> List[ChangePoint]:
+    """
+    Shifts in the mean of values, found by binary segmentation
+
+    Prefix sums give the squared-error gain of every split of a segment in one
+    vectorized pass, so each level of the recursion is O(n). A split is kept
+    if its gain exceeds penalty * log(n) noise variances, and segments are at
+    least min_size points long. Returns at most max_changes points, ordered by
+    index.
+    """
+    # numpy takes ~0.1s to import; load it on first use like the analysis service
+    import numpy as np
+
+    x = np.asarray(values, dtype=float)
+    n = len(x)
+    variance = noise_variance(x)
+    if n < 2 * min_size or variance <= 0:
+        return []
+
+    sums = np.concatenate(([0.0], np.cumsum(x)))
+    threshold = penalty * math.log(n) * variance
+    found = []
+    segments = [(0, n)]
+
+    while segments and len(found) < max_changes:
+        next_segments = []
+        for start, end in segments:
+            if end - start < 2 * min_size:
+                continue
+            splits = np.arange(start + min_size, end - min_size + 1)
+            left = splits - start
+            right = end - splits
+            total = sums[end] - sums[start]
+            left_sums = sums[splits] - sums[start]
+            # Gain of splitting [start, end) at each point: n1*n2/n * (mean1 - mean2)^2
+            gains = (left_sums / left - (total - left_sums) / right) ** 2 * left * right / (end - start)
+            best = int(np.argmax(gains))
+            if gains[best] <= threshold:
+                continue
+            split = int(splits[best])
+            found.append(ChangePoint(
+                split,
+                float(left_sums[best] / left[best]),
+                float((total - left_sums[best]) / right[best]),
+                float(gains[best] / variance),
+            ))
+            next_segments += [(start, split), (split, end)]
+        segments = next_segments
+
+    # Strongest first if over the limit, then back in series order
+    found = sorted(found, key=lambda point: point.score, reverse=True)[:max_changes]
+    return sorted(found, key=lambda point: point.index)
@@ -0,0 +1,66 @@
+"""
+Packed per-day sample arrays for high-frequency metrics
+
+A day of samples is two little-endian arrays:
+  offsets  int32 seconds since the row's day_start, delta-encoded (the first
+           entry is the offset itself, every later one the gap to the previous)
+  values   float32
+
+8 bytes per sample before Postgres' TOAST compression, which squeezes the
+small, repetitive offset deltas much further.
+"""
+import sys
+from array import array
+from itertools import accumulate
+from typing import Iterable, List, Tuple
+
+_BIG_ENDIAN = sys.byteorder == "big"
+
+
+def to_le_bytes(arr: array) -> bytes:
+    """Raw little-endian bytes of an array, whatever the host byte order"""
+    if _BIG_ENDIAN:
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def from_le_bytes(typecode: str, data: bytes) -> array:
+    """Array of typecode from little-endian bytes"""
+    arr = array(typecode)
+    arr.frombytes(data)
+    if _BIG_ENDIAN:
+        arr.byteswap()
+    return arr
+
+
+def pack_samples(samples: Iterable[Tuple[int, float]]) -> Tuple[bytes, bytes]:
+    """Encode (offset seconds, value) pairs, which must be sorted by offset"""
+    offsets = array("i")
+    values = array("f")
+    previous = 0
+    for offset, value in samples:
+        offsets.append(offset - previous)
+        values.append(value)
+        previous = offset
+    return to_le_bytes(offsets), to_le_bytes(values)
+
+
+def unpack_samples(offsets: bytes, values: bytes) -> List[Tuple[int, float]]:
+    """Decode a day back into sorted (offset seconds, value) pairs"""
+    return list(zip(accumulate(from_le_bytes("i", offsets)), from_le_bytes("f", values)))
+
+
+def merge_samples(
+    existing: List[Tuple[int, float]],
+    new: List[Tuple[int, float]],
+) -> List[Tuple[int, float]]:
+    """
+    Union of two sample sets, sorted by offset
+
+    Identical (offset, value) pairs are kept once, so re-importing the same
+    export leaves a day unchanged. New values are rounded to float32 first so
+    they compare equal to stored ones.
+    """
+    rounded = array("f", (value for _, value in new))
+    return sorted(set(existing).union(zip((offset for offset, _ in new), rounded)))
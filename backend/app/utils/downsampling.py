@@ -0,0 +1,86 @@
+"""
+Time-series downsampling helpers for chart payloads
+"""
+from datetime import date, datetime
+from typing import List, Optional, Sequence
+
+
+def choose_resolution(start_date: date, end_date: date, max_points: int) -> str:
+    """
+    Pick the finest calendar bucket that keeps a date range within max_points
+
+    Returns "daily", "weekly" or "monthly". Monthly is returned even if the
+    range is still too long; callers can apply LTTB on top of it.
+    """
+    days = (end_date - start_date).days + 1
+    if days <= max_points:
+        return "daily"
+    if (days + 6) // 7 <= max_points:
+        return "weekly"
+    return "monthly"
+
+
+def lttb(
+    points: Sequence[dict],
+    threshold: int,
+    x_key: str = "day",
+    y_key: str = "avg_value",
+) -> List[dict]:
+    """
+    Largest-Triangle-Three-Buckets downsampling
+
+    Keeps the first and last point and, for every bucket in between, the point
+    forming the largest triangle with the previously selected point and the
+    average of the next bucket. Points without a y value are skipped. Runs in
+    O(n) and returns the selected points unchanged (same dicts, same order).
+    """
+    data = [p for p in points if p.get(y_key) is not None]
+    if threshold >= len(data) or threshold < 3:
+        return list(data)
+
+    xs = [_x_value(p[x_key]) for p in data]
+    ys = [float(p[y_key]) for p in data]
+
+    sampled = [data[0]]
+    every = (len(data) - 2) / (threshold - 2)
+    a = 0
+
+    for i in range(threshold - 2):
+        # Average point of the next bucket
+        avg_start = int((i + 1) * every) + 1
+        avg_end = min(int((i + 2) * every) + 1, len(data))
+        avg_len = avg_end - avg_start
+        avg_x = sum(xs[avg_start:avg_end]) / avg_len
+        avg_y = sum(ys[avg_start:avg_end]) / avg_len
+
+        # Point in the current bucket with the largest triangle area
+        range_start = int(i * every) + 1
+        range_end = int((i + 1) * every) + 1
+        ax, ay = xs[a], ys[a]
+
+        max_area = -1.0
+        next_a: Optional[int] = None
+        for j in range(range_start, range_end):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > max_area:
+                max_area = area
+                next_a = j
+
+        sampled.append(data[next_a])
+        a = next_a
+
+    sampled.append(data[-1])
+    return sampled
+
+
+def _x_value(value) -> float:
+    """Convert an x value (ISO date/datetime string, date, datetime or number) to a float"""
+    if isinstance(value, str):
+        if len(value) > 10:
+            return datetime.fromisoformat(value).timestamp()
+        return float(date.fromisoformat(value).toordinal())
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, date):
+        return float(value.toordinal())
+    return float(value)
@@ -1,12 +1,16 @@
 """
 Apple Health XML parser using lxml
 """
-import lxml.etree as ET
-from typing import Iterator, Dict, Optional
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, Dict, List, NamedTuple, Optional, Union
+from datetime import date, datetime, timedelta, timezone
+import posixpath
+import re
 import zipfile
 import io
 
+from app.utils.polyline import encode_polyline
+
 
 class HealthRecord:
     """Represents a single health record from Apple Health export"""
@@ -19,6 +23,7 @@ class HealthRecord:
         start_date: datetime,
         end_date: Optional[datetime],
         source: Optional[str],
+        correlation: Optional[str] = None,
     ):
         self.record_type = record_type
         self.value = value
@@ -26,6 +31,9 @@ class HealthRecord:
         self.start_date = start_date
         self.end_date = end_date
         self.source = source
+        # Correlation type (e.g. HKCorrelationTypeIdentifierBloodPressure) for
+        # records nested in a Correlation element
+        self.correlation = correlation
     
     def to_dict(self) -> Dict:
         """Convert to dictionary"""
@@ -36,75 +44,282 @@ class HealthRecord:
             "start_date": self.start_date,
             "end_date": self.end_date,
             "source": self.source,
+            "correlation": self.correlation,
         }
 
 
+class WorkoutRecord(NamedTuple):
+    """A Workout element, with units normalized"""
+    activity_type: str  # e.g. "running" for HKWorkoutActivityTypeRunning
+    start_date: datetime
+    end_date: datetime
+    duration_minutes: Optional[float]
+    distance_km: Optional[float]
+    energy_kcal: Optional[float]
+    source: Optional[str]
+    route_file: Optional[str]  # basename of the route's GPX member, if any
+
+
+class ActivitySummaryRecord(NamedTuple):
+    """An ActivitySummary element (one day's activity rings)"""
+    date: date
+    active_energy_kcal: Optional[float]
+    active_energy_goal_kcal: Optional[float]
+    exercise_minutes: Optional[float]
+    exercise_minutes_goal: Optional[float]
+    stand_hours: Optional[float]
+    stand_hours_goal: Optional[float]
+
+
+class WorkoutRoute(NamedTuple):
+    """A workout-routes/*.gpx member, as an encoded polyline"""
+    file: str  # member basename
+    started_at: Optional[datetime]
+    point_count: int
+    polyline: str  # app.utils.polyline encoding of (lat, lon)
+
+
+# Unit conversions to the units stored for workouts
+_MINUTES = {"min": 1.0, "s": 1 / 60, "sec": 1 / 60, "hr": 60.0, "h": 60.0}
+_KILOMETRES = {"km": 1.0, "m": 0.001, "mi": 1.609344, "yd": 0.0009144, "ft": 0.0003048}
+_KILOCALORIES = {"kcal": 1.0, "Cal": 1.0, "cal": 0.001, "kJ": 1 / 4.184, "J": 1 / 4184}
+
+_DISTANCE_STATISTICS = (
+    "HKQuantityTypeIdentifierDistanceWalkingRunning",
+    "HKQuantityTypeIdentifierDistanceCycling",
+    "HKQuantityTypeIdentifierDistanceSwimming",
+    "HKQuantityTypeIdentifierDistanceWheelchair",
+    "HKQuantityTypeIdentifierDistanceDownhillSnowSports",
+)
+
+
+# Parsed UTC offsets ("-0800" -> tzinfo); exports use only a handful
+_OFFSETS: Dict[str, timezone] = {}
+
+
+def _offset(text: str) -> timezone:
+    tz = _OFFSETS.get(text)
+    if tz is None:
+        sign = -1 if text[0] == "-" else 1
+        tz = _OFFSETS[text] = timezone(sign * timedelta(hours=int(text[1:3]), minutes=int(text[3:5])))
+    return tz
+
+
 def parse_iso_datetime(date_str: str) -> datetime:
-    """Parse ISO datetime string from Apple Health export"""
+    """
+    Parse ISO datetime string from Apple Health export
+    
+    Keeps the UTC offset, so the result is the true instant. Strings without
+    an offset are taken as UTC.
+    """
     # Apple Health format: "2025-01-01 23:30:00 -0800"
-    # Remove timezone offset for parsing (we'll handle timezone separately)
+    if len(date_str) == 25 and date_str[19] == " ":
+        try:
+            return datetime(
+                int(date_str[0:4]), int(date_str[5:7]), int(date_str[8:10]),
+                int(date_str[11:13]), int(date_str[14:16]), int(date_str[17:19]),
+                tzinfo=_offset(date_str[20:]),
+            )
+        except ValueError:
+            pass
     try:
-        # Try parsing with timezone
-        if " " in date_str and len(date_str.split()) >= 3:
-            date_part = " ".join(date_str.split()[:-1])
-            return datetime.strptime(date_part, "%Y-%m-%d %H:%M:%S")
-        else:
-            return datetime.fromisoformat(date_str.replace(" ", "T"))
+        parsed = datetime.fromisoformat(date_str.replace(" ", "T", 1).replace(" ", ""))
     except Exception:
         # Fallback
-        return datetime.strptime(date_str.split(" ")[0], "%Y-%m-%d")
+        parsed = datetime.strptime(date_str.split(" ")[0], "%Y-%m-%d")
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+# Elements that can appear directly under HealthData (export.xml's DTD).
+# All are matched so each is cleared once handled, even the ones that are
+# skipped; Records are also matched inside Correlations.
+TOP_LEVEL_TAGS = (
+    "ExportDate",
+    "Me",
+    "Record",
+    "Correlation",
+    "Workout",
+    "ActivitySummary",
+    "ClinicalRecord",
+    "Audiogram",
+    "VisionPrescription",
+)
 
 
-def parse_apple_health_xml(file_path: str) -> Iterator[HealthRecord]:
+def parse_apple_health_xml(
+    file_path: str,
+    workouts: bool = False,
+) -> Iterator[Union[HealthRecord, WorkoutRecord, ActivitySummaryRecord]]:
     """
-    Stream parse large Apple Health XML files efficiently
+    Stream parse large Apple Health XML files in bounded memory
     
-    Uses iterparse to avoid loading entire file into memory
+    Uses iterparse, and every top-level element is cleared and detached
+    from the root once handled, so at most one is in memory whatever the
+    file size. Records nested in a Correlation (blood pressure, food) are
+    yielded once, with correlation set, when the Correlation ends; Apple
+    exports them as top-level Records too. With workouts, Workout and
+    ActivitySummary elements are yielded as well (as WorkoutRecord /
+    ActivitySummaryRecord), in the same pass.
     """
-    context = ET.iterparse(file_path, events=("end",), tag="Record", huge_tree=True)
+    # Imported here so API processes that never parse don't load lxml
+    import lxml.etree as ET
+
+    context = ET.iterparse(file_path, events=("end",), tag=TOP_LEVEL_TAGS, huge_tree=True)
     
     for event, elem in context:
+        root = elem.getparent()
+        if root.getparent() is not None:
+            continue  # A Correlation's Record: handled with its Correlation
+        
         try:
-            record_type = elem.get("type", "")
-            value = elem.get("value")
-            unit = elem.get("unit")
-            start_date_str = elem.get("startDate")
-            end_date_str = elem.get("endDate")
-            source = elem.get("sourceName")
-            
-            if not start_date_str:
+            if elem.tag == "Correlation":
+                yield from _parse_correlation(elem)
                 continue
             
-            start_date = parse_iso_datetime(start_date_str)
-            end_date = parse_iso_datetime(end_date_str) if end_date_str else start_date
-            
-            record = HealthRecord(
-                record_type=record_type,
-                value=value,
-                unit=unit,
-                start_date=start_date,
-                end_date=end_date,
-                source=source,
-            )
-            
-            yield record
+            record = None
+            if elem.tag == "Record":
+                record = _parse_record(elem)
+            elif workouts and elem.tag == "Workout":
+                record = _parse_workout(elem)
+            elif workouts and elem.tag == "ActivitySummary":
+                record = _parse_activity_summary(elem)
+            if record is not None:
+                yield record
             
         except Exception as e:
             # Log error but continue parsing
-            print(f"Error parsing record: {e}")
+            print(f"Error parsing {elem.tag}: {e}")
             continue
         finally:
-            # Clear element to save memory
+            # Clear element and drop everything before it from the root
             elem.clear()
             while elem.getprevious() is not None:
-                del elem.getparent()[0]
+                del root[0]
+
+
+def _parse_record(elem) -> Optional[HealthRecord]:
+    start_date_str = elem.get("startDate")
+    end_date_str = elem.get("endDate")
+    
+    if not start_date_str:
+        return None
+    
+    start_date = parse_iso_datetime(start_date_str)
+    end_date = parse_iso_datetime(end_date_str) if end_date_str else start_date
+    
+    return HealthRecord(
+        record_type=elem.get("type", ""),
+        value=elem.get("value"),
+        unit=elem.get("unit"),
+        start_date=start_date,
+        end_date=end_date,
+        source=elem.get("sourceName"),
+    )
+
+
+def _parse_correlation(elem) -> List[HealthRecord]:
+    correlation = elem.get("type")
+    records = []
+    for child in elem.iterchildren("Record"):
+        try:
+            record = _parse_record(child)
+        except Exception as e:
+            print(f"Error parsing Record in {correlation}: {e}")
+            continue
+        if record is not None:
+            record.correlation = correlation
+            records.append(record)
+    return records
+
+
+def _converted(value: Optional[str], unit: Optional[str], factors: Dict[str, float]) -> Optional[float]:
+    """value in the unit of factors, None if missing or in an unknown unit"""
+    if value is None or unit not in factors:
+        return None
+    return float(value) * factors[unit]
+
+
+def _snake_case(name: str) -> str:
+    return re.sub(r"(?<=[a-z0-9])(?=[A-Z])", "_", name).lower()
+
+
+def _parse_workout(elem) -> Optional[WorkoutRecord]:
+    """
+    Workout attributes and children
+    
+    Older exports give totals as totalDistance/totalEnergyBurned attributes,
+    newer ones as WorkoutStatistics children; either is accepted.
+    """
+    start_date_str = elem.get("startDate")
+    if not start_date_str:
+        return None
+    start_date = parse_iso_datetime(start_date_str)
+    end_date_str = elem.get("endDate")
+    end_date = parse_iso_datetime(end_date_str) if end_date_str else start_date
+    
+    distance_km = _converted(elem.get("totalDistance"), elem.get("totalDistanceUnit"), _KILOMETRES)
+    energy_kcal = _converted(elem.get("totalEnergyBurned"), elem.get("totalEnergyBurnedUnit"), _KILOCALORIES)
+    route_file = None
+    for child in elem:
+        if child.tag == "WorkoutStatistics":
+            statistic = child.get("type")
+            if statistic in _DISTANCE_STATISTICS and distance_km is None:
+                distance_km = _converted(child.get("sum"), child.get("unit"), _KILOMETRES)
+            elif statistic == "HKQuantityTypeIdentifierActiveEnergyBurned" and energy_kcal is None:
+                energy_kcal = _converted(child.get("sum"), child.get("unit"), _KILOCALORIES)
+        elif child.tag == "WorkoutRoute":
+            reference = child.find("FileReference")
+            if reference is not None and reference.get("path"):
+                route_file = posixpath.basename(reference.get("path"))
+    
+    duration_minutes = _converted(elem.get("duration"), elem.get("durationUnit", "min"), _MINUTES)
+    if duration_minutes is None:
+        duration_minutes = (end_date - start_date).total_seconds() / 60
+    
+    activity_type = elem.get("workoutActivityType", "")
+    return WorkoutRecord(
+        activity_type=_snake_case(activity_type.replace("HKWorkoutActivityType", "", 1)) or "other",
+        start_date=start_date,
+        end_date=end_date,
+        duration_minutes=duration_minutes,
+        distance_km=distance_km,
+        energy_kcal=energy_kcal,
+        source=elem.get("sourceName"),
+        route_file=route_file,
+    )
+
+
+def _float_attribute(elem, name: str) -> Optional[float]:
+    value = elem.get(name)
+    return float(value) if value is not None else None
+
+
+def _parse_activity_summary(elem) -> Optional[ActivitySummaryRecord]:
+    day = elem.get("dateComponents")
+    if not day:
+        return None
+    # Energy is in activeEnergyBurnedUnit (kcal unless configured otherwise)
+    factor = _KILOCALORIES.get(elem.get("activeEnergyBurnedUnit", "kcal"), 1.0)
+    energy = _float_attribute(elem, "activeEnergyBurned")
+    energy_goal = _float_attribute(elem, "activeEnergyBurnedGoal")
+    return ActivitySummaryRecord(
+        date=date.fromisoformat(day),
+        active_energy_kcal=energy * factor if energy is not None else None,
+        active_energy_goal_kcal=energy_goal * factor if energy_goal is not None else None,
+        exercise_minutes=_float_attribute(elem, "appleExerciseTime"),
+        exercise_minutes_goal=_float_attribute(elem, "appleExerciseTimeGoal"),
+        stand_hours=_float_attribute(elem, "appleStandHours"),
+        stand_hours_goal=_float_attribute(elem, "appleStandHoursGoal"),
+    )
 
 
-def extract_zip_file(zip_path: str) -> Optional[str]:
+def extract_zip_file(zip_path: str, dest_dir: str = "/tmp") -> Optional[str]:
     """
     Extract Apple Health export ZIP file and return path to export.xml
     
-    Apple Health exports are ZIP files containing export.xml
+    Apple Health exports are ZIP files containing export.xml (next to
+    export_cda.xml and workout-routes/). Pass a private dest_dir when imports
+    can run concurrently, since every export uses the same member name.
     """
     try:
         with zipfile.ZipFile(zip_path, "r") as zip_ref:
@@ -114,16 +329,67 @@ def extract_zip_file(zip_path: str) -> Optional[str]:
             if not xml_files:
                 raise ValueError("No export.xml found in ZIP file")
             
-            # Extract to temporary location
-            xml_file = xml_files[0]
-            zip_ref.extract(xml_file, "/tmp")
+            # Prefer export.xml itself over e.g. export_cda.xml
+            xml_files.sort(key=lambda f: posixpath.basename(f).lower() != "export.xml")
             
-            return f"/tmp/{xml_file}"
+            # Extract to dest_dir
+            return zip_ref.extract(xml_files[0], dest_dir)
     except Exception as e:
         print(f"Error extracting ZIP: {e}")
         return None
 
 
+def parse_gpx_route(source, file: str) -> WorkoutRoute:
+    """Read a GPX file (path or file object) into an encoded route"""
+    import lxml.etree as ET
+    
+    points = []
+    started_at = None
+    for _, point in ET.iterparse(source, events=("end",), tag="{*}trkpt"):
+        points.append((float(point.get("lat")), float(point.get("lon"))))
+        if started_at is None:
+            time = point.findtext("{*}time")
+            if time:
+                started_at = datetime.fromisoformat(time.replace("Z", "+00:00"))
+        point.clear()
+    return WorkoutRoute(file, started_at, len(points), encode_polyline(points))
+
+
+def _read_routes(zip_path: str, members: List[str]) -> List[WorkoutRoute]:
+    """Parse some route members; each worker reads through its own ZipFile"""
+    routes = []
+    with zipfile.ZipFile(zip_path, "r") as zip_ref:
+        for member in members:
+            try:
+                with zip_ref.open(member) as f:
+                    routes.append(parse_gpx_route(f, posixpath.basename(member)))
+            except Exception as e:
+                print(f"Error parsing route {member}: {e}")
+    return routes
+
+
+def parse_workout_routes(zip_path: str, max_workers: int = 4) -> Dict[str, WorkoutRoute]:
+    """
+    All workout-routes/*.gpx of an export ZIP, by member basename
+    
+    Members are streamed straight from the archive (not extracted) and parsed
+    by a pool of max_workers threads, which overlap since decompression and
+    lxml parsing release the GIL.
+    """
+    with zipfile.ZipFile(zip_path, "r") as zip_ref:
+        members = [
+            f for f in zip_ref.namelist()
+            if f.lower().endswith(".gpx") and "workout-routes/" in f.lower()
+        ]
+    if not members:
+        return {}
+    
+    workers = max(1, min(max_workers, len(members)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        parts = pool.map(_read_routes, [zip_path] * workers, [members[i::workers] for i in range(workers)])
+        return {route.file: route for part in parts for route in part}
+
+
 # Metric type mapping from Apple Health to our internal types
 METRIC_TYPE_MAPPING = {
     "HKCategoryTypeIdentifierSleepAnalysis": "sleep_duration",
@@ -137,11 +403,25 @@ METRIC_TYPE_MAPPING = {
 }
 
 
+# High-frequency types (many samples per day), stored as packed per-day arrays
+# in dense_metric_days rather than one health_metrics row per sample
+DENSE_METRIC_TYPE_MAPPING = {
+    "HKQuantityTypeIdentifierHeartRate": "heart_rate",
+    "HKQuantityTypeIdentifierRespiratoryRate": "respiratory_rate",
+    "HKQuantityTypeIdentifierBasalEnergyBurned": "basal_energy",
+}
+
+
 def map_metric_type(apple_health_type: str) -> Optional[str]:
     """Map Apple Health metric type to our internal metric type"""
     return METRIC_TYPE_MAPPING.get(apple_health_type)
 
 
+def map_dense_metric_type(apple_health_type: str) -> Optional[str]:
+    """Map a high-frequency Apple Health type to our internal metric type"""
+    return DENSE_METRIC_TYPE_MAPPING.get(apple_health_type)
+
+
 def calculate_sleep_duration(start: datetime, end: datetime) -> float:
     """Calculate sleep duration in hours"""
     if not end:
@@ -0,0 +1,33 @@
+"""
+User-local calendar days for health samples
+"""
+from datetime import date, datetime, time, tzinfo
+from typing import Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+
+def resolve_timezone(name: Optional[str]) -> Optional[tzinfo]:
+    """ZoneInfo for an IANA name; None if unset or unknown (use each record's own offset)"""
+    if not name:
+        return None
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError) as e:
+        print(f"Error resolving timezone {name!r}: {e}")
+        return None
+
+
+def local_datetime(instant: datetime, zone: Optional[tzinfo]) -> datetime:
+    """instant as wall-clock time in zone, or in its own UTC offset if zone is None"""
+    return instant.astimezone(zone) if zone is not None else instant
+
+
+def local_day(instant: datetime, zone: Optional[tzinfo]) -> date:
+    """Calendar day of instant in zone (or its own UTC offset)"""
+    return local_datetime(instant, zone).date()
+
+
+def local_midnight(instant: datetime, zone: Optional[tzinfo]) -> datetime:
+    """Start of instant's local day, as an aware datetime"""
+    local = local_datetime(instant, zone)
+    return datetime.combine(local.date(), time(), tzinfo=local.tzinfo)
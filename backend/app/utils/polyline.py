@@ -0,0 +1,55 @@
+"""
+Encoded polylines for workout routes
+
+Google's polyline algorithm: coordinates are rounded to 10^-precision degrees
+and each point is stored as the zigzag-encoded difference to the previous
+one, in 5-bit groups written as printable ASCII. Neighbouring GPS fixes
+differ by a few metres, so most deltas take one or two characters, about
+3-4 bytes per point against ~200 for a GPX trkpt. Map libraries decode the
+format directly.
+"""
+from typing import Iterable, List, Tuple
+
+
+def _encode_value(delta: int, out: List[str]):
+    value = ~(delta << 1) if delta < 0 else delta << 1
+    while value >= 0x20:
+        out.append(chr((0x20 | (value & 0x1F)) + 63))
+        value >>= 5
+    out.append(chr(value + 63))
+
+
+def encode_polyline(points: Iterable[Tuple[float, float]], precision: int = 5) -> str:
+    """Encode (lat, lon) pairs"""
+    factor = 10 ** precision
+    out: List[str] = []
+    previous_lat = previous_lon = 0
+    for lat, lon in points:
+        lat_e = round(lat * factor)
+        lon_e = round(lon * factor)
+        _encode_value(lat_e - previous_lat, out)
+        _encode_value(lon_e - previous_lon, out)
+        previous_lat, previous_lon = lat_e, lon_e
+    return "".join(out)
+
+
+def decode_polyline(encoded: str, precision: int = 5) -> List[Tuple[float, float]]:
+    """Decode back into (lat, lon) pairs"""
+    factor = 10 ** precision
+    points = []
+    coordinates = [0, 0]
+    index = 0
+    while index < len(encoded):
+        for axis in (0, 1):
+            shift = 0
+            value = 0
+            while True:
+                byte = ord(encoded[index]) - 63
+                index += 1
+                value |= (byte & 0x1F) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            coordinates[axis] += ~(value >> 1) if value & 1 else value >> 1
+        points.append((coordinates[0] / factor, coordinates[1] / factor))
+    return points
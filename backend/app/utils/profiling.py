@@ -0,0 +1,124 @@
+"""
+Opt-in sampling profiler producing flamegraph-compatible output
+
+Stacks are written in the "folded" format (one "frame;frame;frame count"
+line per unique stack), readable by flamegraph.pl, speedscope and inferno.
+"""
+import hmac
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+from starlette.datastructures import Headers
+
+from app.core.config import settings
+
+PROFILE_HEADER = "X-Profile-Token"
+
+
+def profiling_requested(headers) -> bool:
+    """True if profiling is enabled and the request carries the privileged token"""
+    if not settings.PROFILING_ENABLED or not settings.PROFILING_TOKEN:
+        return False
+    token = headers.get(PROFILE_HEADER)
+    if token is None:
+        return False
+    return hmac.compare_digest(token.encode(), settings.PROFILING_TOKEN.encode())
+
+
+class SamplingProfiler:
+    """
+    Sample one thread's Python stack at a fixed interval from a background thread
+
+    Targets the thread that starts it (the event loop thread for async code),
+    so concurrent work on the same loop shows up in the samples too.
+    """
+
+    def __init__(self, interval_ms: Optional[float] = None):
+        self.interval = (interval_ms or settings.PROFILING_INTERVAL_MS) / 1000.0
+        self.samples: Counter = Counter()
+        self._thread_id: Optional[int] = None
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread_id = threading.get_ident()
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+            self._sampler = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is not None:
+                self.samples[_fold(frame)] += 1
+
+    def save(self, name: str) -> str:
+        """Write folded stacks to PROFILING_OUTPUT_DIR and return the file path"""
+        os.makedirs(settings.PROFILING_OUTPUT_DIR, exist_ok=True)
+        path = os.path.join(settings.PROFILING_OUTPUT_DIR, f"{name}.folded")
+        with open(path, "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+
+def _fold(frame) -> str:
+    """Render a stack root-first as semicolon-separated frames"""
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(frames))
+
+
+def profile_name(prefix: str, label: str = "") -> str:
+    """Unique, filesystem-safe profile name"""
+    safe_label = "".join(c if c.isalnum() or c in "-_" else "_" for c in label).strip("_")
+    parts = [prefix, time.strftime("%Y%m%dT%H%M%S"), str(time.monotonic_ns() % 1_000_000)]
+    if safe_label:
+        parts.insert(1, safe_label)
+    return "-".join(parts)
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling requests that carry the privileged profile header"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not profiling_requested(Headers(scope=scope)):
+            await self.app(scope, receive, send)
+            return
+
+        name = profile_name("request", scope["path"])
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-output", f"{name}.folded".encode())
+                ]
+            await send(message)
+
+        profiler = SamplingProfiler()
+        with profiler:
+            await self.app(scope, receive, send_wrapper)
+        profiler.save(name)
@@ -0,0 +1,54 @@
+"""
+Mergeable running statistics (Welford / Chan et al.)
+"""
+import math
+from typing import Iterable
+
+
+class RunningStats:
+    """
+    Count, mean and sum of squared deviations (M2) of a stream of values
+
+    Values are folded in one at a time with Welford's update and two
+    accumulators combine with Chan's parallel formula, so a series can be
+    extended without revisiting what was already counted. n, mean and M2 are
+    all a two-sample t-test needs.
+    """
+    __slots__ = ("n", "mean", "m2")
+
+    def __init__(self, n: int = 0, mean: float = 0.0, m2: float = 0.0):
+        self.n = n
+        self.mean = mean
+        self.m2 = m2
+
+    def add(self, value: float):
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+
+    def update(self, values: Iterable[float]) -> "RunningStats":
+        for value in values:
+            self.add(value)
+        return self
+
+    def merge(self, other: "RunningStats") -> "RunningStats":
+        """Statistics of both streams together (neither accumulator is changed)"""
+        if not other.n:
+            return RunningStats(self.n, self.mean, self.m2)
+        if not self.n:
+            return RunningStats(other.n, other.mean, other.m2)
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        mean = self.mean + delta * other.n / n
+        m2 = self.m2 + other.m2 + delta * delta * self.n * other.n / n
+        return RunningStats(n, mean, m2)
+
+    @property
+    def variance(self) -> float:
+        """Sample variance (ddof=1); 0.0 below two values"""
+        return self.m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    @property
+    def stddev(self) -> float:
+        return math.sqrt(self.variance)
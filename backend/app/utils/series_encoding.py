@@ -0,0 +1,62 @@
+"""
+Packed encoding of daily aggregate series (get_daily_metrics results)
+
+A series of n days is a 4-byte little-endian count followed by
+  days         int32    proleptic ordinals (date.toordinal())
+  sample_size  int32
+  avg, stddev, min, max   float64 each, NaN for None
+
+40 bytes per day, against ~150 as JSON, and values round-trip exactly.
+"""
+import math
+import struct
+from array import array
+from datetime import date
+from typing import List
+
+from app.utils.dense_encoding import from_le_bytes, to_le_bytes
+
+_COUNT = struct.Struct("<I")
+_FLOAT_FIELDS = ("avg_value", "stddev_value", "min_value", "max_value")
+
+
+def _float_or_nan(value) -> float:
+    return math.nan if value is None else value
+
+
+def pack_daily_series(days: List[dict]) -> bytes:
+    """Encode get_daily_metrics-shaped dicts (metric_type is restored by the caller)"""
+    parts = [
+        _COUNT.pack(len(days)),
+        to_le_bytes(array("i", (date.fromisoformat(d["day"]).toordinal() for d in days))),
+        to_le_bytes(array("i", (d["sample_size"] for d in days))),
+    ]
+    parts += [to_le_bytes(array("d", (_float_or_nan(d[field]) for d in days))) for field in _FLOAT_FIELDS]
+    return b"".join(parts)
+
+
+def unpack_daily_series(data: bytes, metric_type: str) -> List[dict]:
+    """Decode a packed series back into get_daily_metrics-shaped dicts"""
+    (n,) = _COUNT.unpack_from(data)
+    offset = _COUNT.size
+    ordinals = from_le_bytes("i", data[offset:offset + 4 * n])
+    offset += 4 * n
+    sizes = from_le_bytes("i", data[offset:offset + 4 * n])
+    offset += 4 * n
+    columns = []
+    for _ in _FLOAT_FIELDS:
+        columns.append([None if math.isnan(v) else v for v in from_le_bytes("d", data[offset:offset + 8 * n])])
+        offset += 8 * n
+
+    return [
+        {
+            "day": date.fromordinal(ordinal).isoformat(),
+            "metric_type": metric_type,
+            "avg_value": avg,
+            "stddev_value": stddev,
+            "min_value": low,
+            "max_value": high,
+            "sample_size": size,
+        }
+        for ordinal, size, avg, stddev, low, high in zip(ordinals, sizes, *columns)
+    ]
@@ -0,0 +1,369 @@
+"""
+End-to-end benchmarks for the import and analysis paths
+
+Benchmarks (each runs in a fresh subprocess so peak RSS is per benchmark):
+  parse    parse_apple_health_xml over the fixture's export.xml
+  ingest   process_health_export of the fixture ZIP into Postgres
+  daily    get_daily_metrics over random date ranges
+  analyze  analyze_intervention on a synthetic intervention
+
+ingest/daily/analyze need DATABASE_URL pointing at a local, disposable
+Postgres (TimescaleDB optional); they write under a dedicated benchmark user.
+Fixtures come from benchmarks.generate_export and are cached in
+benchmarks/.fixtures.
+
+Run from the backend directory:
+    python -m benchmarks.bench_pipeline --size-mb 50
+    python -m benchmarks.bench_pipeline --size-mb 50 --save-baseline
+    python -m benchmarks.bench_pipeline --size-mb 50 --benchmarks parse --tolerance 0.1
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import zipfile
+from datetime import timedelta
+from time import perf_counter
+from typing import Dict, List
+from uuid import UUID
+
+from benchmarks.generate_export import generate
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(BENCH_DIR, ".fixtures")
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+BENCH_USER_ID = UUID("00000000-0000-0000-0000-0000000be4c5")
+
+
+def percentiles(samples: List[float], prefix: str = "") -> Dict[str, float]:
+    """p50/p95/p99 of samples (seconds), reported in milliseconds"""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))] * 1000
+
+    return {f"{prefix}p50_ms": pick(0.50), f"{prefix}p95_ms": pick(0.95), f"{prefix}p99_ms": pick(0.99)}
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / 1024 / 1024 if sys.platform == "darwin" else maxrss / 1024
+
+
+def fixture_paths(size_mb: float, seed: int) -> Dict[str, str]:
+    """Generate (once) and return the fixture ZIP and its extracted export.xml"""
+    name = f"export-{size_mb:g}mb-seed{seed}"
+    zip_path = os.path.join(FIXTURE_DIR, f"{name}.zip")
+    xml_path = os.path.join(FIXTURE_DIR, f"{name}.xml")
+    if not os.path.exists(zip_path):
+        print(f"Generating {zip_path} ...", flush=True)
+        generate(zip_path, size_mb, seed, as_zip=True)
+    if not os.path.exists(xml_path):
+        with zipfile.ZipFile(zip_path) as archive, open(xml_path, "wb") as out:
+            with archive.open("apple_health_export/export.xml") as src:
+                while chunk := src.read(1 << 20):
+                    out.write(chunk)
+    return {"zip": zip_path, "xml": xml_path}
+
+
+# Benchmarks
+
+def bench_parse(fixtures: Dict[str, str], options: dict) -> dict:
+    from app.utils.health_parser import parse_apple_health_xml
+
+    chunk_times = []
+    records = 0
+    start = chunk_start = perf_counter()
+    for _ in parse_apple_health_xml(fixtures["xml"]):
+        records += 1
+        if records % 10_000 == 0:
+            now = perf_counter()
+            chunk_times.append(now - chunk_start)
+            chunk_start = now
+    elapsed = perf_counter() - start
+    size_mb = os.path.getsize(fixtures["xml"]) / 1024 / 1024
+
+    return {
+        "records": records,
+        "records_per_sec": records / elapsed,
+        "mb_per_sec": size_mb / elapsed,
+        **percentiles(chunk_times, "per_10k_records_"),
+    }
+
+
+async def _ensure_bench_user(db):
+    from app.models.user import User
+
+    if not await db.get(User, BENCH_USER_ID):
+        db.add(User(id=BENCH_USER_ID, email="benchmark@example.invalid"))
+        await db.commit()
+
+
+async def _prepare_database():
+    from app.core.database import engine, Base
+    # Import every model so create_all sees them
+    from app.models import analysis_result, data_import, health_metric, intervention, user  # noqa
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
+def bench_ingest(fixtures: Dict[str, str], options: dict) -> dict:
+    import shutil
+    import tempfile
+
+    from sqlalchemy import delete
+
+    from app.core.config import settings
+    from app.core.database import AsyncSessionLocal
+    from app.models.data_import import DataImport
+    from app.models.dense_metric_day import DenseMetricDay
+    from app.models.health_metric import HealthMetric
+    from app.services import health_data_service
+
+    commit_times = []
+    insert_batch = health_data_service._insert_batch
+
+    async def timed_insert_batch(batch, db):
+        start = perf_counter()
+        await insert_batch(batch, db)
+        commit_times.append(perf_counter() - start)
+
+    health_data_service._insert_batch = timed_insert_batch
+
+    async def run():
+        await _prepare_database()
+        async with AsyncSessionLocal() as db:
+            await _ensure_bench_user(db)
+            await db.execute(delete(HealthMetric).where(HealthMetric.user_id == BENCH_USER_ID))
+            await db.execute(delete(DenseMetricDay).where(DenseMetricDay.user_id == BENCH_USER_ID))
+            import_record = DataImport(user_id=BENCH_USER_ID, filename="benchmark.zip", status="pending")
+            db.add(import_record)
+            await db.commit()
+
+            # process_health_export deletes its input, so store a copy in a
+            # throwaway local storage root
+            workdir = tempfile.mkdtemp()
+            settings.STORAGE_PROVIDER = "local"
+            settings.STORAGE_LOCAL_PATH = workdir
+            shutil.copy(fixtures["zip"], os.path.join(workdir, "export.zip"))
+            start = perf_counter()
+            try:
+                records = await health_data_service.process_health_export(
+                    "export.zip", str(BENCH_USER_ID), str(import_record.id), db
+                )
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+            elapsed = perf_counter() - start
+
+            await db.refresh(import_record)
+            stages = {f"stage_{k}_sec": v for k, v in (import_record.stage_timings or {}).items()}
+            return records, elapsed, stages
+
+    records, elapsed, stages = asyncio.run(run())
+    return {
+        "records": records,
+        "records_per_sec": records / elapsed,
+        "elapsed_sec": elapsed,
+        **stages,
+        **percentiles(commit_times, "batch_commit_"),
+    }
+
+
+async def _bench_date_span(db):
+    from sqlalchemy import func, select
+
+    from app.models.health_metric import HealthMetric
+
+    result = await db.execute(
+        select(func.min(HealthMetric.date), func.max(HealthMetric.date))
+        .where(HealthMetric.user_id == BENCH_USER_ID)
+    )
+    first, last = result.one()
+    if first is None:
+        raise RuntimeError("No benchmark data in the database; run the ingest benchmark first")
+    return first, last
+
+
+def bench_daily(fixtures: Dict[str, str], options: dict) -> dict:
+    from app.core.config import settings
+    from app.core.database import AsyncSessionLocal
+    from app.services.health_data_service import get_daily_metrics
+
+    rng = random.Random(options["seed"])
+    metric_types = ["hrv", "resting_hr", "heart_rate", "sleep_duration", "steps", "active_energy"]
+    # Time the database path, not whether Redis happens to be running
+    settings.METRICS_CACHE_ENABLED = False
+
+    async def run():
+        await _prepare_database()
+        timings = []
+        async with AsyncSessionLocal() as db:
+            first, last = await _bench_date_span(db)
+            span = (last - first).days
+            for _ in range(options["iterations"]):
+                length = rng.randint(min(30, span), max(30, min(365, span)))
+                start = first + timedelta(days=rng.randint(0, max(0, span - length)))
+                t = perf_counter()
+                await get_daily_metrics(
+                    str(BENCH_USER_ID), rng.choice(metric_types), start, start + timedelta(days=length), db
+                )
+                timings.append(perf_counter() - t)
+        return timings
+
+    timings = asyncio.run(run())
+    return {"queries_per_sec": len(timings) / sum(timings), **percentiles(timings)}
+
+
+def bench_analyze(fixtures: Dict[str, str], options: dict) -> dict:
+    from sqlalchemy import delete
+
+    from app.core.config import settings
+    from app.core.database import AsyncSessionLocal
+    from app.models.intervention import Intervention
+    from app.services.analysis_service import analyze_intervention
+
+    settings.METRICS_CACHE_ENABLED = False
+
+    async def run():
+        await _prepare_database()
+        timings = []
+        async with AsyncSessionLocal() as db:
+            first, last = await _bench_date_span(db)
+            await db.execute(delete(Intervention).where(Intervention.user_id == BENCH_USER_ID))
+            intervention = Intervention(
+                user_id=BENCH_USER_ID,
+                name="Benchmark intervention",
+                category="supplement",
+                start_date=first + (last - first) / 2,
+                end_date=last,
+                baseline_days=min(30, max(7, (last - first).days // 2)),
+            )
+            db.add(intervention)
+            await db.commit()
+
+            for _ in range(options["iterations"]):
+                t = perf_counter()
+                await analyze_intervention(str(intervention.id), db)
+                timings.append(perf_counter() - t)
+        return timings
+
+    timings = asyncio.run(run())
+    return {"analyses_per_sec": len(timings) / sum(timings), **percentiles(timings)}
+
+
+BENCHMARKS = {
+    "parse": bench_parse,
+    "ingest": bench_ingest,
+    "daily": bench_daily,
+    "analyze": bench_analyze,
+}
+
+
+def _child(name: str, fixtures: Dict[str, str], options: dict, queue):
+    try:
+        result = BENCHMARKS[name](fixtures, options)
+        result["peak_rss_mb"] = peak_rss_mb()
+        queue.put(("ok", result))
+    except Exception as e:
+        queue.put(("error", f"{type(e).__name__}: {e}"))
+
+
+def run_isolated(name: str, fixtures: Dict[str, str], options: dict) -> dict:
+    """Run one benchmark in a fresh interpreter and return its measurements"""
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    process = ctx.Process(target=_child, args=(name, fixtures, options, queue))
+    process.start()
+    status, payload = queue.get()
+    process.join()
+    if status != "ok":
+        raise RuntimeError(f"{name} benchmark failed: {payload}")
+    return payload
+
+
+# Baseline comparison
+
+def higher_is_better(metric: str) -> bool:
+    return metric.endswith("_per_sec")
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Print deltas against the baseline and return the regressed metrics"""
+    regressions = []
+    for bench, metrics in results.items():
+        for metric, value in metrics.items():
+            base = baseline.get(bench, {}).get(metric)
+            if not isinstance(value, (int, float)) or not base or metric == "records":
+                continue
+            change = (value - base) / base
+            worse = -change if higher_is_better(metric) else change
+            flag = ""
+            if worse > tolerance:
+                flag = "  REGRESSION"
+                regressions.append(f"{bench}.{metric}")
+            print(f"  {bench}.{metric:<32} {base:>12.2f} -> {value:>12.2f} ({change:+.1%}){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=float, default=25, help="fixture export.xml size")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--benchmarks", default=",".join(BENCHMARKS), help="comma-separated subset")
+    parser.add_argument("--iterations", type=int, default=50, help="repetitions for daily/analyze")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="write results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative regression")
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    names = [n.strip() for n in args.benchmarks.split(",") if n.strip()]
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    fixtures = fixture_paths(args.size_mb, args.seed)
+    options = {"seed": args.seed, "iterations": args.iterations}
+
+    results = {}
+    for name in names:
+        print(f"Running {name} ...", flush=True)
+        results[name] = run_isolated(name, fixtures, options)
+        for metric, value in results[name].items():
+            print(f"  {metric:<34} {value:>12.2f}" if isinstance(value, float) else f"  {metric:<34} {value:>12}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Saved baseline to {args.baseline}")
+        return
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"Compared to {args.baseline} (tolerance {args.tolerance:.0%}):")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
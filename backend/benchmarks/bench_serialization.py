@@ -0,0 +1,177 @@
+"""
+Response serialization benchmark for the large list endpoints
+
+Compares, per endpoint payload shape:
+  - standard: response_model validation + JSON-mode dump + json.dumps
+    (what FastAPI does for a returned ORM object/dict)
+  - orjson:   to_dicts() projection + FastJSONResponse
+  - msgpack:  to_dicts() projection + MsgPackResponse
+
+Run from the backend directory:
+    python -m benchmarks.bench_serialization --rows 5000
+"""
+import argparse
+import json
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, List
+
+from pydantic import TypeAdapter
+
+from app.core.responses import FastJSONResponse, MsgPackResponse, to_dicts
+from app.models.analysis_result import AnalysisResult
+from app.models.data_import import DataImport
+from app.models.intervention import Intervention
+from app.schemas.analysis import AnalysisResultResponse
+from app.schemas.data_import import DataImportResponse
+from app.schemas.health_metric import DailyMetricResponse
+from app.schemas.intervention import InterventionResponse
+
+USER_ID = uuid.UUID("00000000-0000-0000-0000-000000000000")
+NOW = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def make_metrics(n: int) -> List[dict]:
+    return [
+        {
+            "day": (date(2020, 1, 1) + timedelta(days=i)).isoformat(),
+            "metric_type": "hrv",
+            "avg_value": 50.0 + i % 17,
+            "stddev_value": 4.2,
+            "min_value": 31.0,
+            "max_value": 88.0,
+            "sample_size": 24,
+        }
+        for i in range(n)
+    ]
+
+
+def make_imports(n: int) -> List[DataImport]:
+    return [
+        DataImport(
+            id=uuid.uuid4(),
+            user_id=USER_ID,
+            filename="export.zip",
+            file_size_mb=123.4,
+            records_imported=1_000_000,
+            status="completed",
+            error_message=None,
+            started_at=NOW,
+            completed_at=NOW,
+        )
+        for _ in range(n)
+    ]
+
+
+def make_interventions(n: int) -> List[Intervention]:
+    return [
+        Intervention(
+            id=uuid.uuid4(),
+            user_id=USER_ID,
+            name=f"Magnesium {i}",
+            category="supplement",
+            dosage="400mg",
+            start_date=date(2024, 1, 1),
+            end_date=None,
+            baseline_days=14,
+            status="active",
+            notes="Taken before bed",
+            created_at=NOW,
+            updated_at=NOW,
+        )
+        for i in range(n)
+    ]
+
+
+def make_results(n: int) -> List[AnalysisResult]:
+    return [
+        AnalysisResult(
+            id=uuid.uuid4(),
+            intervention_id=USER_ID,
+            metric_type="hrv",
+            baseline_avg=48.1,
+            baseline_stddev=5.3,
+            intervention_avg=53.7,
+            intervention_stddev=4.9,
+            percent_change=11.6,
+            p_value=0.012,
+            is_significant=True,
+            sample_size_baseline=14,
+            sample_size_intervention=30,
+            generated_insight="Your HRV increased by 11.6% (statistically significant, p<0.05).",
+            created_at=NOW,
+        )
+        for _ in range(n)
+    ]
+
+
+ENDPOINTS = {
+    "get_metrics": (DailyMetricResponse, make_metrics),
+    "list_imports": (DataImportResponse, make_imports),
+    "list_interventions": (InterventionResponse, make_interventions),
+    "get_analysis_results": (AnalysisResultResponse, make_results),
+}
+
+
+def standard_path(schema) -> Callable:
+    adapter = TypeAdapter(List[schema])
+
+    def run(objects) -> bytes:
+        validated = adapter.validate_python(objects, from_attributes=True)
+        content = adapter.dump_python(validated, mode="json")
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+    return run
+
+
+def orjson_path(schema) -> Callable:
+    def run(objects) -> bytes:
+        return FastJSONResponse(to_dicts(objects, schema)).body
+
+    return run
+
+
+def msgpack_path(schema) -> Callable:
+    def run(objects) -> bytes:
+        return MsgPackResponse(to_dicts(objects, schema)).body
+
+    return run
+
+
+def measure(fn: Callable, objects, min_seconds: float) -> tuple:
+    """Return (calls/sec, payload bytes) for fn over at least min_seconds"""
+    payload = fn(objects)
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        fn(objects)
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return calls / elapsed, len(payload)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000, help="rows per response")
+    parser.add_argument("--seconds", type=float, default=1.0, help="minimum time per measurement")
+    args = parser.parse_args()
+
+    paths = {"standard": standard_path, "orjson": orjson_path, "msgpack": msgpack_path}
+
+    print(f"{'endpoint':<22}{'path':<10}{'resp/s':>10}{'rows/s':>12}{'MB/s':>9}{'bytes':>11}{'speedup':>9}")
+    for endpoint, (schema, factory) in ENDPOINTS.items():
+        objects = factory(args.rows)
+        baseline = None
+        for name, make_path in paths.items():
+            rate, size = measure(make_path(schema), objects, args.seconds)
+            baseline = baseline or rate
+            print(
+                f"{endpoint:<22}{name:<10}{rate:>10.1f}{rate * args.rows:>12.0f}"
+                f"{rate * size / 1e6:>9.1f}{size:>11}{rate / baseline:>8.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
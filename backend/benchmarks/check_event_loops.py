@@ -0,0 +1,139 @@
+"""
+Database and Redis use across sequential event loops, as in a Celery worker
+
+Each Celery task runs its own event loop (asyncio.run), so connections left
+over from an earlier task must not be reused. Runs --runs loops one after
+another, each querying the database, pinning a user to the primary and
+invalidating their cached series like process_health_export, then
+disposing of the engines like the Celery tasks. Pinning and invalidating
+swallow (and print) Redis errors, so the check fails (exit 1) when a loop
+raises or prints an error, or when its commands don't reach Redis. Half the
+loops close their Redis client at the end (as the Celery tasks do) and half
+don't.
+
+A minimal in-process Redis stand-in answers the commands, so no Redis server
+is needed. The database is the usual DATABASE_URL; run from the backend
+directory:
+    python -m benchmarks.check_event_loops
+    python -m benchmarks.check_event_loops --runs 6
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import sys
+import threading
+from collections import Counter
+from typing import Dict, List
+
+USER_ID = "00000000-0000-0000-0000-000000000000"
+
+
+class FakeRedis:
+    """Answers SET, GET, INCR(BY) and EXISTS over RESP in a background thread"""
+
+    def __init__(self):
+        self.commands: Counter = Counter()
+        self.store: Dict[bytes, bytes] = {}
+        self.loop = asyncio.new_event_loop()
+        self.ready = threading.Event()
+        self.port = 0
+        threading.Thread(target=self._serve, daemon=True).start()
+        self.ready.wait()
+
+    def _serve(self):
+        asyncio.set_event_loop(self.loop)
+        server = self.loop.run_until_complete(asyncio.start_server(self._client, "127.0.0.1", 0))
+        self.port = server.sockets[0].getsockname()[1]
+        self.ready.set()
+        self.loop.run_forever()
+
+    async def _client(self, reader, writer):
+        while True:
+            header = await reader.readline()
+            if not header:
+                break
+            args: List[bytes] = []
+            for _ in range(int(header[1:])):
+                size = int((await reader.readline())[1:])
+                args.append((await reader.readexactly(size + 2))[:-2])
+            writer.write(self._reply(args))
+            await writer.drain()
+        writer.close()
+
+    def _reply(self, args: List[bytes]) -> bytes:
+        command = args[0].upper().decode()
+        self.commands[command] += 1
+        if command == "SET":
+            self.store[args[1]] = args[2]
+        elif command == "GET":
+            value = self.store.get(args[1])
+            return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+        elif command in ("INCR", "INCRBY"):
+            step = int(args[2]) if len(args) > 2 else 1
+            self.store[args[1]] = b"%d" % (int(self.store.get(args[1], b"0")) + step)
+            return b":%s\r\n" % self.store[args[1]]
+        elif command == "EXISTS":
+            return b":%d\r\n" % sum(key in self.store for key in args[1:])
+        return b"+OK\r\n"
+
+
+async def task(close: bool):
+    """A Celery task's connection use: a query, then what an import does with Redis once stored"""
+    from sqlalchemy import text
+
+    from app.core import database
+    from app.core.cache import daily_series_cache
+    from app.core.redis import close_redis
+
+    try:
+        async with database.AsyncSessionLocal() as db:
+            await db.execute(text("SELECT 1"))
+        await database.pin_to_primary(USER_ID)
+        await daily_series_cache.invalidate_user(USER_ID)
+    finally:
+        await database.dispose_engines()
+        if close:
+            await close_redis()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=4, help="sequential event loops")
+    args = parser.parse_args()
+
+    from app.core import database
+    from app.core.cache import daily_series_cache
+    from app.core.config import settings
+
+    redis = FakeRedis()
+    settings.REDIS_URL = f"redis://127.0.0.1:{redis.port}/0"
+    # pin_to_primary is a no-op without a replica
+    database.replica_engine = database.replica_engine or database.engine
+
+    failures = []
+    for run in range(args.runs):
+        output = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(output):
+                asyncio.run(task(close=run % 2 == 1))
+        except Exception as e:
+            failures.append(f"event loop {run + 1}: {type(e).__name__}: {e}")
+        for line in output.getvalue().splitlines():
+            failures.append(f"event loop {run + 1}: {line}")
+
+    version = int(redis.store.get(f"cache:{daily_series_cache.namespace}:version:{USER_ID}".encode(), b"0"))
+    print(f"{args.runs} event loops: {redis.commands['SET']} pins, {version} cache invalidations")
+    if redis.commands["SET"] != args.runs:
+        failures.append(f"{redis.commands['SET']} of {args.runs} pins reached Redis")
+    if version != args.runs:
+        failures.append(f"{version} of {args.runs} cache invalidations reached Redis")
+    if failures:
+        print(f"{len(failures)} event loop check(s) failed:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
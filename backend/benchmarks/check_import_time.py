@@ -0,0 +1,124 @@
+"""
+Cold-start import-time budget for the API and Celery worker entry points
+
+Imports each entry point in a fresh interpreter under `python -X importtime`
+and fails (exit 1) when:
+  - the median cumulative import time exceeds its budget, or
+  - a heavy dependency that must stay lazy (numpy, scipy, lxml) is imported
+    at boot.
+
+Settings are validated at import, so run with the usual environment
+(DATABASE_URL etc., or a .env file) from the backend directory:
+    python -m benchmarks.check_import_time
+    python -m benchmarks.check_import_time --budget app.main=1200 --runs 7
+    python -m benchmarks.check_import_time --top 15
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Milliseconds, median of --runs cold imports
+DEFAULT_BUDGETS = {
+    "app.main": 1500.0,
+    "celery_app": 1000.0,
+}
+
+# Loaded on first use by analysis_service / health_parser
+LAZY_MODULES = ("numpy", "scipy", "lxml")
+
+
+def import_time(module: str) -> Tuple[float, List[Tuple[str, float, float]]]:
+    """
+    Import module in a fresh interpreter
+
+    Returns the cumulative import time in ms and every imported module as
+    (name, self_ms, cumulative_ms).
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        tail = "\n".join(proc.stderr.strip().splitlines()[-5:])
+        raise RuntimeError(f"import {module} failed:\n{tail}")
+
+    modules = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000))
+
+    total = next((cumulative for name, _, cumulative in modules if name == module), 0.0)
+    return total, modules
+
+
+def lazy_violations(modules: List[Tuple[str, float, float]]) -> List[str]:
+    names = {name for name, _, _ in modules}
+    return sorted(lazy for lazy in LAZY_MODULES if lazy in names)
+
+
+def parse_budgets(values: List[str]) -> Dict[str, float]:
+    budgets = dict(DEFAULT_BUDGETS)
+    for value in values:
+        module, _, ms = value.partition("=")
+        if not ms:
+            raise argparse.ArgumentTypeError(f"expected MODULE=MS, got {value!r}")
+        budgets[module.strip()] = float(ms)
+    return budgets
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget", action="append", default=[], metavar="MODULE=MS",
+                        help="override or add a budget (repeatable)")
+    parser.add_argument("--runs", type=int, default=5, help="cold imports per module; the median is checked")
+    parser.add_argument("--top", type=int, default=0, help="also list the N slowest imports of the last run")
+    args = parser.parse_args()
+
+    try:
+        budgets = parse_budgets(args.budget)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+
+    failures = []
+    for module, budget in budgets.items():
+        # Warm the bytecode cache so the first run doesn't pay for compilation
+        import_time(module)
+        samples = []
+        for _ in range(args.runs):
+            total, modules = import_time(module)
+            samples.append(total)
+        median = statistics.median(samples)
+
+        status = "ok" if median <= budget else "OVER BUDGET"
+        print(f"{module:<12} median {median:8.1f}ms  budget {budget:8.1f}ms  "
+              f"(min {min(samples):.1f}, max {max(samples):.1f})  {status}")
+        if median > budget:
+            failures.append(f"{module} import took {median:.1f}ms > {budget:.1f}ms")
+
+        eager = lazy_violations(modules)
+        if eager:
+            print(f"  eagerly imports {', '.join(eager)}")
+            failures.append(f"{module} imports {', '.join(eager)} at boot")
+
+        if args.top:
+            for name, self_ms, cumulative_ms in sorted(modules, key=lambda m: m[1], reverse=True)[:args.top]:
+                print(f"  {self_ms:8.1f}ms self {cumulative_ms:9.1f}ms cumulative  {name}")
+
+    if failures:
+        print(f"{len(failures)} import-time check(s) failed:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
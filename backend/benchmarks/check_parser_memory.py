@@ -0,0 +1,115 @@
+"""
+Peak-memory ceiling for parse_apple_health_xml
+
+Parses exports of several sizes, each in a fresh interpreter, and fails
+(exit 1) when:
+  - any parse's peak RSS exceeds --ceiling-mb, or
+  - peak RSS varies by more than --max-growth-mb between the exports, i.e.
+    memory depends on the file's size or content.
+
+Besides the benchmark fixtures (benchmarks.generate_export, cached in
+benchmarks/.fixtures), a "nested" export made only of Correlation, Workout
+and ActivitySummary elements is parsed. These have nested children, so
+they're the elements a parser most easily leaves attached to the root.
+
+Run from the backend directory:
+    python -m benchmarks.check_parser_memory
+    python -m benchmarks.check_parser_memory --sizes 5,50,200 --ceiling-mb 48
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from datetime import date
+from typing import Dict, List
+
+from benchmarks.bench_pipeline import FIXTURE_DIR, fixture_paths, peak_rss_mb
+from benchmarks.generate_export import ExportWriter
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def nested_fixture(days: int, seed: int) -> str:
+    """Generate (once) an export of only Correlation, Workout and ActivitySummary elements"""
+    path = os.path.join(FIXTURE_DIR, f"nested-{days}d-seed{seed}.xml")
+    if not os.path.exists(path):
+        print(f"Generating {path} ...", flush=True)
+        os.makedirs(FIXTURE_DIR, exist_ok=True)
+        writer = ExportWriter(date(1990, 1, 1), days, seed)
+        writer.sections = lambda: [writer.correlations, writer.workouts, writer.activity_summaries]
+        with open(path, "w", encoding="utf-8", buffering=1 << 20) as f:
+            writer.write_xml(f)
+    return path
+
+
+def measure(path: str) -> Dict[str, float]:
+    """Parse path in a fresh interpreter; returns records and peak_rss_mb"""
+    proc = subprocess.run(
+        [sys.executable, "-m", "benchmarks.check_parser_memory", "--child", path],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        tail = "\n".join(proc.stderr.strip().splitlines()[-5:])
+        raise RuntimeError(f"parsing {path} failed:\n{tail}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def child(path: str):
+    from app.utils.health_parser import parse_apple_health_xml
+
+    records = sum(1 for _ in parse_apple_health_xml(path, workouts=True))
+    print(json.dumps({"records": records, "peak_rss_mb": peak_rss_mb()}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="5,50", help="comma-separated fixture export.xml sizes (MB)")
+    parser.add_argument("--nested-days", type=int, default=100000, help="days in the nested export (0 to skip)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--ceiling-mb", type=float, default=64, help="allowed peak RSS of any parse")
+    parser.add_argument("--max-growth-mb", type=float, default=8, help="allowed peak RSS spread between exports")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child)
+        return
+
+    paths: List[str] = [fixture_paths(float(size), args.seed)["xml"] for size in args.sizes.split(",") if size.strip()]
+    if args.nested_days:
+        paths.append(nested_fixture(args.nested_days, args.seed))
+
+    # Warm the bytecode cache so the first parse doesn't pay for compilation
+    measure(paths[0])
+
+    failures = []
+    results = []  # (XML MB, peak RSS MB)
+    for path in paths:
+        result = measure(path)
+        size_mb = os.path.getsize(path) / 1024 / 1024
+        results.append((size_mb, result["peak_rss_mb"]))
+        status = "ok" if result["peak_rss_mb"] <= args.ceiling_mb else "OVER CEILING"
+        print(f"{os.path.basename(path):<32} {size_mb:8.1f}MB  {result['records']:>9} records  "
+              f"peak RSS {result['peak_rss_mb']:6.1f}MB  {status}")
+        if result["peak_rss_mb"] > args.ceiling_mb:
+            failures.append(f"{os.path.basename(path)} peaked at {result['peak_rss_mb']:.1f}MB > {args.ceiling_mb:.1f}MB")
+
+    peaks = [peak for _, peak in results]
+    growth = max(peaks) - min(peaks)
+    print(f"peak RSS spread over {min(size for size, _ in results):.1f}-{max(size for size, _ in results):.1f}MB "
+          f"of XML: {growth:.1f}MB")
+    if growth > args.max_growth_mb:
+        failures.append(f"peak RSS varied {growth:.1f}MB between exports > {args.max_growth_mb:.1f}MB")
+
+    if failures:
+        print(f"{len(failures)} parser memory check(s) failed:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
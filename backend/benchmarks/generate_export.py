@@ -0,0 +1,449 @@
+"""
+Deterministic synthetic Apple Health export generator
+
+Writes an export.xml (or an export.zip laid out like the iPhone's
+"Export All Health Data" archive) with a realistic mix of record types,
+sources and devices, UTC offsets that follow DST and travel, nightly sleep
+segments, workouts with GPX routes, activity summaries and blood pressure
+correlations. Output is streamed, so multi-GB files need constant memory,
+and the same seed and size always produce byte-identical files.
+
+Run from the backend directory:
+    python -m benchmarks.generate_export --size-mb 100 --zip -o /tmp/export.zip
+"""
+import argparse
+import io
+import math
+import os
+import random
+import zipfile
+from datetime import date, datetime, timedelta
+from typing import Callable, Iterator, List, Optional, TextIO, Tuple
+from xml.sax.saxutils import quoteattr
+
+EXPORT_DIR = "apple_health_export"
+ZIP_TIMESTAMP = (2025, 1, 1, 0, 0, 0)
+
+WATCH = (
+    "Alex’s Apple Watch",
+    "10.1",
+    "<<HKDevice: 0x2837a1e40>, name:Apple Watch, manufacturer:Apple Inc., "
+    "model:Watch, hardware:Watch6,2, software:10.1, creation date:2024-01-01 08:00:00 +0000>",
+)
+PHONE = (
+    "Alex’s iPhone",
+    "17.1",
+    "<<HKDevice: 0x2837a2b80>, name:iPhone, manufacturer:Apple Inc., "
+    "model:iPhone, hardware:iPhone14,2, software:17.1>",
+)
+RING = ("Oura", "4.9.1", None)
+SCALE = ("Withings & Co \"Body+\"", "6.2", None)
+
+DOCTYPE = """<!DOCTYPE HealthData [
+<!-- HealthKit Export Version: 13 -->
+<!ELEMENT HealthData (ExportDate,Me,(Record|Correlation|Workout|ActivitySummary|ClinicalRecord|Audiogram|VisionPrescription)*)>
+<!ATTLIST HealthData
+  locale CDATA #REQUIRED
+>
+<!ELEMENT ExportDate EMPTY>
+<!ATTLIST ExportDate
+  value CDATA #REQUIRED
+>
+<!ELEMENT Record ((MetadataEntry|HeartRateVariabilityMetadataList)*)>
+<!ATTLIST Record
+  type          CDATA #REQUIRED
+  unit          CDATA #IMPLIED
+  value         CDATA #IMPLIED
+  sourceName    CDATA #REQUIRED
+  sourceVersion CDATA #IMPLIED
+  device        CDATA #IMPLIED
+  creationDate  CDATA #IMPLIED
+  startDate     CDATA #REQUIRED
+  endDate       CDATA #REQUIRED
+>
+<!ELEMENT Correlation ((MetadataEntry|Record)*)>
+<!ELEMENT Workout ((MetadataEntry|WorkoutEvent|WorkoutStatistics|WorkoutRoute)*)>
+<!ELEMENT ActivitySummary EMPTY>
+]>
+"""
+
+
+class Timeline:
+    """Per-day UTC offsets: US Pacific with DST, plus a deterministic trip abroad"""
+
+    def __init__(self, start: date, days: int, rng: random.Random):
+        self.offsets = {}
+        trip_start = rng.randrange(30, max(31, days - 14)) if days > 60 else None
+        for i in range(days):
+            day = start + timedelta(days=i)
+            offset = -7 if _us_dst(day) else -8
+            if trip_start is not None and trip_start <= i < trip_start + 10:
+                offset = 1
+            self.offsets[day] = offset
+
+    def offset(self, day: date) -> int:
+        return self.offsets.get(day, -8)
+
+
+def _us_dst(day: date) -> bool:
+    """US DST: second Sunday of March to first Sunday of November"""
+    march = date(day.year, 3, 8)
+    november = date(day.year, 11, 1)
+    dst_start = march + timedelta(days=(6 - march.weekday()) % 7)
+    dst_end = november + timedelta(days=(6 - november.weekday()) % 7)
+    return dst_start <= day < dst_end
+
+
+def fmt(day: date, seconds: float, offset_hours: int) -> str:
+    """Apple Health timestamp: local wall clock plus a +HHMM offset"""
+    moment = datetime(day.year, day.month, day.day) + timedelta(seconds=int(seconds))
+    sign = "-" if offset_hours < 0 else "+"
+    return f"{moment:%Y-%m-%d %H:%M:%S} {sign}{abs(offset_hours):02d}00"
+
+
+def record(
+    record_type: str,
+    source: Tuple[str, str, Optional[str]],
+    start: str,
+    end: str,
+    value=None,
+    unit: Optional[str] = None,
+    children: str = "",
+) -> str:
+    name, version, device = source
+    attrs = [("type", record_type), ("sourceName", name), ("sourceVersion", version)]
+    if unit is not None:
+        attrs.append(("unit", unit))
+    if device is not None:
+        attrs.append(("device", device))
+    attrs += [("creationDate", end), ("startDate", start), ("endDate", end)]
+    if value is not None:
+        attrs.append(("value", str(value)))
+    rendered = " ".join(f"{k}={quoteattr(v)}" for k, v in attrs)
+    if children:
+        return f" <Record {rendered}>\n{children} </Record>\n"
+    return f" <Record {rendered}/>\n"
+
+
+def metadata(key: str, value) -> str:
+    return f"  <MetadataEntry key={quoteattr(key)} value={quoteattr(str(value))}/>\n"
+
+
+class ExportWriter:
+    """Streams one synthetic export, type by type, day by day"""
+
+    def __init__(self, start: date, days: int, seed: int):
+        self.start = start
+        self.days = days
+        self.seed = seed
+        self.timeline = Timeline(start, days, random.Random(seed))
+        self.routes: List[Tuple[str, date, float, int]] = []
+
+    def day_rng(self, salt: str, index: int) -> random.Random:
+        return random.Random(f"{self.seed}:{salt}:{index}")
+
+    def each_day(self) -> Iterator[Tuple[int, date, int]]:
+        for i in range(self.days):
+            day = self.start + timedelta(days=i)
+            yield i, day, self.timeline.offset(day)
+
+    # Record generators, one per type, in the order Apple writes them
+
+    def heart_rate(self, out: TextIO):
+        for i, day, tz in self.each_day():
+            rng = self.day_rng("hr", i)
+            t = rng.uniform(0, 300)
+            while t < 86400:
+                bpm = round(62 + 12 * math.sin(t / 86400 * 2 * math.pi - 2) + rng.gauss(0, 4))
+                children = ""
+                if rng.random() < 0.08:
+                    children = metadata("HKMetadataKeyHeartRateMotionContext", rng.choice([0, 1, 2]))
+                stamp = fmt(day, t, tz)
+                out.write(record("HKQuantityTypeIdentifierHeartRate", WATCH, stamp, stamp,
+                                 bpm, "count/min", children))
+                t += rng.uniform(120, 420)
+
+    def steps(self, out: TextIO):
+        for i, day, tz in self.each_day():
+            rng = self.day_rng("steps", i)
+            t = 7 * 3600 + rng.uniform(0, 1800)
+            while t < 22 * 3600:
+                source = WATCH if rng.random() < 0.6 else PHONE
+                length = rng.uniform(60, 600)
+                out.write(record("HKQuantityTypeIdentifierStepCount", source, fmt(day, t, tz),
+                                 fmt(day, t + length, tz), rng.randint(10, 900), "count"))
+                t += length + rng.uniform(60, 900)
+
+    def active_energy(self, out: TextIO):
+        for i, day, tz in self.each_day():
+            rng = self.day_rng("energy", i)
+            t = 6 * 3600
+            while t < 23 * 3600:
+                length = rng.uniform(60, 300)
+                out.write(record("HKQuantityTypeIdentifierActiveEnergyBurned", WATCH, fmt(day, t, tz),
+                                 fmt(day, t + length, tz), round(rng.uniform(0.2, 12.0), 3), "kcal"))
+                t += length + rng.uniform(0, 240)
+
+    def exercise_time(self, out: TextIO):
+        for i, day, tz in self.each_day():
+            rng = self.day_rng("exercise", i)
+            for _ in range(rng.randint(5, 45)):
+                t = rng.uniform(6 * 3600, 21 * 3600)
+                out.write(record("HKQuantityTypeIdentifierAppleExerciseTime", WATCH, fmt(day, t, tz),
+                                 fmt(day, t + 60, tz), 1, "min"))
+
+    def hrv(self, out: TextIO):
+        for i, day, tz in self.each_day():
+            rng = self.day_rng("hrv", i)
+            for _ in range(rng.randint(3, 8)):
+                t = rng.uniform(0, 86000)
+                beats = "".join(
+                    f"   <InstantaneousBeatsPerMinute bpm=\"{rng.randint(55, 75)}\" "
+                    f"time=\"{fmt(day, t + k, tz)[11:19]}.{rng.randint(0, 999):03d}\"/>\n"
+                    for k in range(rng.randint(40, 70))
+                )
+                children = f"  <HeartRateVariabilityMetadataList>\n{beats}  </HeartRateVariabilityMetadataList>\n"
+                out.write(record("HKQuantityTypeIdentifierHeartRateVariabilitySDNN", WATCH,
+                                 fmt(day, t, tz), fmt(day, t + 60, tz),
+                                 round(max(8.0, rng.gauss(48, 12)), 4), "ms", children))
+
+    def resting_hr(self, out: TextIO):
+        for i, day, tz in self.each_day():
+            rng = self.day_rng("rhr", i)
+            out.write(record("HKQuantityTypeIdentifierRestingHeartRate", WATCH, fmt(day, 0, tz),
+                             fmt(day, 86399, tz), round(rng.gauss(58, 3)), "count/min"))
+
+    def blood_oxygen(self, out: TextIO):
+        for i, day, tz in self.each_day():
+            rng = self.day_rng("spo2", i)
+            for _ in range(rng.randint(4, 16)):
+                t = rng.uniform(0, 86000)
+                stamp = fmt(day, t, tz)
+                out.write(record("HKQuantityTypeIdentifierOxygenSaturation", WATCH, stamp, stamp,
+                                 round(rng.uniform(0.93, 1.0), 2), "%"))
+
+    def body_temperature(self, out: TextIO):
+        for i, day, tz in self.each_day():
+            rng = self.day_rng("temp", i)
+            if rng.random() < 0.5:
+                out.write(record("HKQuantityTypeIdentifierBodyTemperature", RING, fmt(day, 3 * 3600, tz),
+                                 fmt(day, 7 * 3600, tz), round(rng.gauss(36.4, 0.3), 2), "degC"))
+
+    def body_mass(self, out: TextIO):
+        for i, day, tz in self.each_day():
+            rng = self.day_rng("mass", i)
+            if rng.random() < 0.3:
+                stamp = fmt(day, 7 * 3600 + rng.uniform(0, 1800), tz)
+                out.write(record("HKQuantityTypeIdentifierBodyMass", SCALE, stamp, stamp,
+                                 round(rng.gauss(72, 0.6), 1), "kg"))
+
+    def blood_pressure_records(self, out: TextIO):
+        """Top-level copies of the blood pressure samples (also nested in correlations)"""
+        for i, day, tz, systolic, diastolic, stamp in self.blood_pressure_days():
+            out.write(record("HKQuantityTypeIdentifierBloodPressureSystolic", SCALE, stamp, stamp, systolic, "mmHg"))
+            out.write(record("HKQuantityTypeIdentifierBloodPressureDiastolic", SCALE, stamp, stamp, diastolic, "mmHg"))
+
+    def sleep(self, out: TextIO):
+        stages = [
+            "HKCategoryValueSleepAnalysisAsleepCore",
+            "HKCategoryValueSleepAnalysisAsleepDeep",
+            "HKCategoryValueSleepAnalysisAsleepCore",
+            "HKCategoryValueSleepAnalysisAsleepREM",
+            "HKCategoryValueSleepAnalysisAwake",
+        ]
+        for i, day, tz in self.each_day():
+            rng = self.day_rng("sleep", i)
+            bedtime = 22.5 * 3600 + rng.uniform(-3600, 5400)
+            wake = bedtime + rng.uniform(6, 8.5) * 3600
+            out.write(record("HKCategoryTypeIdentifierSleepAnalysis", PHONE, fmt(day, bedtime, tz),
+                             fmt(day, wake, tz), "HKCategoryValueSleepAnalysisInBed"))
+            t = bedtime + rng.uniform(300, 1500)
+            while t < wake:
+                length = min(rng.uniform(600, 3600), wake - t)
+                out.write(record("HKCategoryTypeIdentifierSleepAnalysis", WATCH, fmt(day, t, tz),
+                                 fmt(day, t + length, tz), rng.choice(stages),
+                                 children=metadata("HKTimeZone", "America/Los_Angeles")))
+                t += length
+
+    def blood_pressure_days(self):
+        for i, day, tz in self.each_day():
+            rng = self.day_rng("bp", i)
+            if rng.random() < 0.15:
+                stamp = fmt(day, 8 * 3600 + rng.uniform(0, 3600), tz)
+                yield i, day, tz, round(rng.gauss(118, 8)), round(rng.gauss(76, 6)), stamp
+
+    def correlations(self, out: TextIO):
+        for i, day, tz, systolic, diastolic, stamp in self.blood_pressure_days():
+            name, version, _ = SCALE
+            out.write(
+                f" <Correlation type=\"HKCorrelationTypeIdentifierBloodPressure\" sourceName={quoteattr(name)} "
+                f"sourceVersion=\"{version}\" creationDate=\"{stamp}\" startDate=\"{stamp}\" endDate=\"{stamp}\">\n"
+                + metadata("HKWasUserEntered", 0)
+                + "  " + record("HKQuantityTypeIdentifierBloodPressureSystolic", SCALE, stamp, stamp, systolic, "mmHg").lstrip()
+                + "  " + record("HKQuantityTypeIdentifierBloodPressureDiastolic", SCALE, stamp, stamp, diastolic, "mmHg").lstrip()
+                + " </Correlation>\n"
+            )
+
+    def workouts(self, out: TextIO):
+        for i, day, tz in self.each_day():
+            rng = self.day_rng("workout", i)
+            if rng.random() > 0.35:
+                continue
+            start = rng.uniform(6 * 3600, 19 * 3600)
+            minutes = rng.uniform(20, 75)
+            end = start + minutes * 60
+            kind = rng.choice(["Running", "Walking", "Cycling", "TraditionalStrengthTraining"])
+            distance = round(minutes * rng.uniform(0.12, 0.35), 4) if kind != "TraditionalStrengthTraining" else None
+            energy = round(minutes * rng.uniform(6, 12), 3)
+            s, e = fmt(day, start, tz), fmt(day, end, tz)
+            name, version, device = WATCH
+            attrs = (
+                f"workoutActivityType=\"HKWorkoutActivityType{kind}\" duration=\"{minutes:.6f}\" durationUnit=\"min\" "
+                f"sourceName={quoteattr(name)} sourceVersion=\"{version}\" device={quoteattr(device)} "
+                f"creationDate=\"{e}\" startDate=\"{s}\" endDate=\"{e}\""
+            )
+            body = metadata("HKIndoorWorkout", 0 if distance else 1)
+            body += f"  <WorkoutEvent type=\"HKWorkoutEventTypeSegment\" date=\"{s}\" duration=\"{minutes:.4f}\" durationUnit=\"min\"/>\n"
+            body += (f"  <WorkoutStatistics type=\"HKQuantityTypeIdentifierActiveEnergyBurned\" startDate=\"{s}\" "
+                     f"endDate=\"{e}\" sum=\"{energy}\" unit=\"kcal\"/>\n")
+            if distance:
+                stat = "DistanceCycling" if kind == "Cycling" else "DistanceWalkingRunning"
+                body += (f"  <WorkoutStatistics type=\"HKQuantityTypeIdentifier{stat}\" startDate=\"{s}\" "
+                         f"endDate=\"{e}\" sum=\"{distance}\" unit=\"km\"/>\n")
+                path = f"/workout-routes/route_{datetime(day.year, day.month, day.day) + timedelta(seconds=int(start)):%Y-%m-%d_%I.%M%p}.gpx"
+                body += (f"  <WorkoutRoute sourceName={quoteattr(name)} sourceVersion=\"{version}\" "
+                         f"creationDate=\"{e}\" startDate=\"{s}\" endDate=\"{e}\">\n"
+                         f"   <FileReference path=\"{path}\"/>\n  </WorkoutRoute>\n")
+                self.routes.append((path, day, start, int(minutes * 60)))
+            out.write(f" <Workout {attrs}>\n{body} </Workout>\n")
+
+    def activity_summaries(self, out: TextIO):
+        for i, day, tz in self.each_day():
+            rng = self.day_rng("summary", i)
+            out.write(
+                f" <ActivitySummary dateComponents=\"{day.isoformat()}\" "
+                f"activeEnergyBurned=\"{rng.uniform(200, 900):.3f}\" activeEnergyBurnedGoal=\"500\" "
+                f"activeEnergyBurnedUnit=\"kcal\" appleMoveTime=\"0\" appleMoveTimeGoal=\"0\" "
+                f"appleExerciseTime=\"{rng.randint(5, 80)}\" appleExerciseTimeGoal=\"30\" "
+                f"appleStandHours=\"{rng.randint(6, 16)}\" appleStandHoursGoal=\"12\"/>\n"
+            )
+
+    def sections(self) -> List[Callable[[TextIO], None]]:
+        return [
+            self.active_energy,
+            self.exercise_time,
+            self.blood_pressure_records,
+            self.body_mass,
+            self.body_temperature,
+            self.heart_rate,
+            self.hrv,
+            self.blood_oxygen,
+            self.resting_hr,
+            self.steps,
+            self.sleep,
+            self.correlations,
+            self.workouts,
+            self.activity_summaries,
+        ]
+
+    def write_xml(self, out: TextIO):
+        out.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        out.write(DOCTYPE)
+        out.write('<HealthData locale="en_US">\n')
+        out.write(f' <ExportDate value="{fmt(self.start + timedelta(days=self.days), 0, -8)}"/>\n')
+        out.write(' <Me HKCharacteristicTypeIdentifierDateOfBirth="1990-04-12" '
+                  'HKCharacteristicTypeIdentifierBiologicalSex="HKBiologicalSexNotSet" '
+                  'HKCharacteristicTypeIdentifierBloodType="HKBloodTypeNotSet" '
+                  'HKCharacteristicTypeIdentifierFitzpatrickSkinType="HKFitzpatrickSkinTypeNotSet" '
+                  'HKCharacteristicTypeIdentifierCardioFitnessMedicationsUse="None"/>\n')
+        for section in self.sections():
+            section(out)
+        out.write("</HealthData>\n")
+
+    def write_gpx(self, out: TextIO, day: date, start: float, seconds: int, index: int):
+        rng = random.Random(f"{self.seed}:route:{index}")
+        tz = self.timeline.offset(day)
+        lat, lon = 37.7749 + rng.uniform(-0.05, 0.05), -122.4194 + rng.uniform(-0.05, 0.05)
+        heading = rng.uniform(0, 2 * math.pi)
+        begin = datetime(day.year, day.month, day.day) + timedelta(seconds=int(start) - tz * 3600)
+        out.write('<?xml version="1.0" encoding="UTF-8"?>\n<gpx version="1.1" creator="Apple Health Export" '
+                  'xmlns="http://www.topografix.com/GPX/1/1">\n <metadata>\n  '
+                  f'<time>{begin:%Y-%m-%dT%H:%M:%SZ}</time>\n </metadata>\n <trk>\n  '
+                  f'<name>Route {begin:%Y-%m-%d %I:%M%p}</name>\n  <trkseg>\n')
+        for t in range(seconds):
+            heading += rng.gauss(0, 0.05)
+            lat += math.cos(heading) * 0.00003
+            lon += math.sin(heading) * 0.00004
+            elevation = 20 + 8 * math.sin(t / 300)
+            out.write(f'   <trkpt lon="{lon:.6f}" lat="{lat:.6f}"><ele>{elevation:.6f}</ele>'
+                      f'<time>{begin + timedelta(seconds=t):%Y-%m-%dT%H:%M:%SZ}</time>'
+                      '<extensions><speed>2.8</speed><course>-1.0</course>'
+                      '<hAcc>1.5</hAcc><vAcc>1.2</vAcc></extensions></trkpt>\n')
+        out.write("  </trkseg>\n </trk>\n</gpx>\n")
+
+
+def estimate_bytes_per_day(seed: int) -> float:
+    """Measure the XML size of a sample of days"""
+    sample_days = 14
+    writer = ExportWriter(date(2024, 1, 1), sample_days, seed)
+    buffer = io.StringIO()
+    for section in writer.sections():
+        section(buffer)
+    return len(buffer.getvalue().encode()) / sample_days
+
+
+def days_for_size(size_mb: float, seed: int) -> int:
+    return max(1, math.ceil(size_mb * 1024 * 1024 / estimate_bytes_per_day(seed)))
+
+
+def generate(output: str, size_mb: float, seed: int = 42, as_zip: Optional[bool] = None,
+             end_date: date = date(2025, 1, 1)) -> str:
+    """
+    Generate an export of roughly size_mb of XML and return its path
+
+    Writes a ZIP (with export.xml, export_cda.xml and workout-routes/*.gpx)
+    when output ends with .zip or as_zip is set, otherwise a bare export.xml.
+    """
+    as_zip = output.endswith(".zip") if as_zip is None else as_zip
+    days = days_for_size(size_mb, seed)
+    writer = ExportWriter(end_date - timedelta(days=days), days, seed)
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+
+    if not as_zip:
+        with open(output, "w", encoding="utf-8", buffering=1 << 20) as f:
+            writer.write_xml(f)
+        return output
+
+    with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+        with archive.open(_zip_info("export.xml"), "w", force_zip64=True) as raw:
+            with io.TextIOWrapper(raw, encoding="utf-8", write_through=False) as f:
+                writer.write_xml(f)
+        with archive.open(_zip_info("export_cda.xml"), "w") as raw:
+            raw.write(b'<?xml version="1.0" encoding="UTF-8"?>\n<ClinicalDocument xmlns="urn:hl7-org:v3"/>\n')
+        for index, (path, day, start, seconds) in enumerate(writer.routes):
+            with archive.open(_zip_info(path.lstrip("/")), "w") as raw:
+                with io.TextIOWrapper(raw, encoding="utf-8") as f:
+                    writer.write_gpx(f, day, start, seconds, index)
+    return output
+
+
+def _zip_info(name: str) -> zipfile.ZipInfo:
+    info = zipfile.ZipInfo(f"{EXPORT_DIR}/{name}", date_time=ZIP_TIMESTAMP)
+    info.compress_type = zipfile.ZIP_DEFLATED
+    return info
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-o", "--output", required=True, help="export.xml or export.zip path")
+    parser.add_argument("--size-mb", type=float, default=10, help="approximate export.xml size")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--zip", action="store_true", help="write a ZIP archive with workout routes")
+    args = parser.parse_args()
+
+    path = generate(args.output, args.size_mb, args.seed, as_zip=args.zip or None)
+    print(f"Wrote {path} ({os.path.getsize(path) / 1024 / 1024:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+"""
+Concurrent multi-user load test with latency SLO reports
+
+Seeds synthetic users and metric history straight into Postgres, then runs
+virtual users against a running API with a realistic request mix: dashboard
+metric reads, intervention CRUD, analysis runs and uploads (each made unique,
+so it starts an import despite upload deduplication). Reports
+p50/p95/p99 latency and error rate per endpoint and exits non-zero when an SLO
+is breached.
+
+The API has no authentication yet, so every virtual user acts as the
+placeholder account; seeded users only make tables and indexes realistically
+large.
+
+Run from the backend directory against a local app (uvicorn app.main:app)
+with local Postgres/Redis:
+    python -m benchmarks.load_test --seed-users 200 --users 100 --duration 60
+    python -m benchmarks.load_test --users 50 --slo "GET /health-data/metrics:p95=250,p99=600"
+"""
+import argparse
+import asyncio
+import io
+import os
+import random
+import sys
+import tempfile
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from time import perf_counter
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.generate_export import generate
+
+PLACEHOLDER_USER_ID = "00000000-0000-0000-0000-000000000000"
+SEED_EMAIL_DOMAIN = "load-test.invalid"
+METRIC_TYPES = ["hrv", "resting_hr", "sleep_duration", "steps", "active_energy"]
+
+DEFAULT_SLO = {"p95": 500.0, "p99": 1500.0, "error_rate": 0.01}
+
+
+@dataclass
+class EndpointStats:
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+
+    @property
+    def count(self) -> int:
+        return len(self.latencies)
+
+    def percentile(self, q: float) -> float:
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))] * 1000 if ordered else 0.0
+
+
+def with_zip_comment(data: bytes, comment: bytes) -> bytes:
+    """A ZIP archive without a comment, with comment set as its archive comment"""
+    # The end of central directory record ends the file, with the comment length last
+    return data[:-2] + len(comment).to_bytes(2, "little") + comment
+
+
+class LoadTest:
+    def __init__(self, client: httpx.AsyncClient, rng: random.Random, upload_bytes: bytes, history_days: int):
+        self.client = client
+        self.rng = rng
+        self.upload_bytes = upload_bytes
+        self.history_days = history_days
+        self.stats: Dict[str, EndpointStats] = defaultdict(EndpointStats)
+        self.intervention_ids: List[str] = []
+
+    async def request(self, name: str, method: str, url: str, ok=(200, 201, 204), **kwargs) -> Optional[httpx.Response]:
+        start = perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.stats[name].latencies.append(perf_counter() - start)
+            self.stats[name].errors += 1
+            return None
+        self.stats[name].latencies.append(perf_counter() - start)
+        if response.status_code not in ok:
+            self.stats[name].errors += 1
+        return response
+
+    # Actions, weighted in ACTIONS below
+
+    async def read_metrics(self):
+        days = self.rng.choice([30, 90, 365, 365 * 3])
+        end = date.today() - timedelta(days=self.rng.randint(0, 30))
+        await self.request(
+            "GET /health-data/metrics", "GET", "/health-data/metrics",
+            params={
+                "metric_type": self.rng.choice(METRIC_TYPES),
+                "start_date": (end - timedelta(days=days)).isoformat(),
+                "end_date": end.isoformat(),
+            },
+        )
+
+    async def list_interventions(self):
+        response = await self.request("GET /interventions", "GET", "/interventions")
+        if response is not None and response.status_code == 200:
+            self.intervention_ids = [item["id"] for item in response.json()][:200]
+
+    async def get_intervention(self):
+        if self.intervention_ids:
+            await self.request("GET /interventions/{id}", "GET", f"/interventions/{self.rng.choice(self.intervention_ids)}",
+                               ok=(200, 404))
+
+    async def create_intervention(self):
+        start = date.today() - timedelta(days=self.rng.randint(15, min(300, self.history_days)))
+        response = await self.request(
+            "POST /interventions", "POST", "/interventions",
+            json={
+                "name": f"Load test {self.rng.randint(0, 10**6)}",
+                "category": self.rng.choice(["supplement", "diet", "exercise", "sleep"]),
+                "start_date": start.isoformat(),
+                "baseline_days": 14,
+            },
+        )
+        if response is not None and response.status_code == 201:
+            self.intervention_ids.append(response.json()["id"])
+
+    async def update_intervention(self):
+        if self.intervention_ids:
+            await self.request("PATCH /interventions/{id}", "PATCH", f"/interventions/{self.rng.choice(self.intervention_ids)}",
+                               ok=(200, 404), json={"notes": f"updated {self.rng.random():.6f}"})
+
+    async def delete_intervention(self):
+        if len(self.intervention_ids) > 20:
+            intervention_id = self.intervention_ids.pop(self.rng.randrange(len(self.intervention_ids)))
+            await self.request("DELETE /interventions/{id}", "DELETE", f"/interventions/{intervention_id}", ok=(204, 404))
+
+    async def run_analysis(self):
+        if self.intervention_ids:
+            await self.request("POST /analysis/interventions/{id}", "POST",
+                               f"/analysis/interventions/{self.rng.choice(self.intervention_ids)}", ok=(200, 404))
+
+    async def analysis_results(self):
+        if self.intervention_ids:
+            await self.request("GET /analysis/interventions/{id}/results", "GET",
+                               f"/analysis/interventions/{self.rng.choice(self.intervention_ids)}/results", ok=(200, 404))
+
+    async def list_imports(self):
+        await self.request("GET /health-data/imports", "GET", "/health-data/imports")
+
+    async def upload(self):
+        # A unique archive comment gives every upload its own content hash, so
+        # each one is stored and imported rather than answered with the first
+        # import (a deduplicated 200 counts as an error)
+        content = with_zip_comment(self.upload_bytes, f"load-test {uuid.uuid4()}".encode())
+        await self.request(
+            "POST /health-data/upload", "POST", "/health-data/upload", ok=(201,),
+            files={"file": ("export.zip", io.BytesIO(content), "application/zip")},
+        )
+
+
+ACTIONS = [
+    (LoadTest.read_metrics, 50),
+    (LoadTest.list_interventions, 10),
+    (LoadTest.get_intervention, 5),
+    (LoadTest.create_intervention, 5),
+    (LoadTest.update_intervention, 5),
+    (LoadTest.delete_intervention, 3),
+    (LoadTest.run_analysis, 7),
+    (LoadTest.analysis_results, 8),
+    (LoadTest.list_imports, 5),
+    (LoadTest.upload, 2),
+]
+
+
+async def virtual_user(test: LoadTest, deadline: float, think_time: float, seed: int):
+    rng = random.Random(seed)
+    actions, weights = zip(*ACTIONS)
+    while perf_counter() < deadline:
+        action = rng.choices(actions, weights)[0]
+        await action(test)
+        if think_time:
+            await asyncio.sleep(rng.expovariate(1 / think_time))
+
+
+async def seed_database(users: int, days: int, samples_per_day: int):
+    """Insert synthetic users with daily history (idempotent per email)"""
+    from sqlalchemy import text
+
+    from app.core.database import engine, Base
+    from app.models import analysis_result, data_import, health_metric, intervention, user  # noqa
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(text(
+            "INSERT INTO users (id, email) VALUES (:id, 'placeholder@example.invalid') "
+            "ON CONFLICT DO NOTHING"
+        ), {"id": PLACEHOLDER_USER_ID})
+        await conn.execute(text(
+            "INSERT INTO users (id, email) "
+            "SELECT gen_random_uuid(), 'load-' || g || '@" + SEED_EMAIL_DOMAIN + "' "
+            "FROM generate_series(1, :users) g ON CONFLICT (email) DO NOTHING"
+        ), {"users": users})
+
+        # Metric history for the placeholder user and every seeded user without data
+        await conn.execute(text(
+            "INSERT INTO health_metrics (id, user_id, metric_type, value, unit, date, timestamp, source_device) "
+            "SELECT gen_random_uuid(), u.id, m.metric_type, m.base + m.spread * (random() - 0.5), m.unit, "
+            "       d::date, d + make_interval(secs => s * 86400.0 / CAST(:samples AS integer)), 'Load Test Watch' "
+            "FROM users u "
+            "CROSS JOIN (VALUES ('hrv', 50.0, 30.0, 'ms'), ('resting_hr', 58.0, 10.0, 'count/min'), "
+            "            ('sleep_duration', 2.0, 2.0, 'hours'), ('steps', 400.0, 600.0, 'count'), "
+            "            ('active_energy', 5.0, 8.0, 'kcal')) AS m(metric_type, base, spread, unit) "
+            "CROSS JOIN generate_series((current_date - CAST(:days AS integer))::timestamptz, "
+            "                          current_date::timestamptz, interval '1 day') d "
+            "CROSS JOIN generate_series(0, CAST(:samples AS integer) - 1) s "
+            "WHERE (u.email LIKE '%@" + SEED_EMAIL_DOMAIN + "' OR u.id = CAST(:placeholder AS uuid)) "
+            "  AND NOT EXISTS (SELECT 1 FROM health_metrics h WHERE h.user_id = u.id)"
+        ), {"days": days, "samples": samples_per_day, "placeholder": PLACEHOLDER_USER_ID})
+
+
+async def cleanup_database():
+    from sqlalchemy import text
+
+    from app.core.database import engine
+
+    async with engine.begin() as conn:
+        await conn.execute(text("DELETE FROM users WHERE email LIKE '%@" + SEED_EMAIL_DOMAIN + "'"))
+
+
+def parse_slos(specs: List[str]) -> Dict[str, Dict[str, float]]:
+    """--slo "ENDPOINT:p95=300,error_rate=0.01" (ENDPOINT may be *)"""
+    slos: Dict[str, Dict[str, float]] = {"*": dict(DEFAULT_SLO)}
+    for spec in specs:
+        endpoint, _, limits = spec.rpartition(":")
+        target = slos.setdefault(endpoint or "*", dict(slos["*"]))
+        for limit in limits.split(","):
+            key, _, value = limit.partition("=")
+            target[key.strip()] = float(value)
+    return slos
+
+
+def report(stats: Dict[str, EndpointStats], slos: Dict[str, Dict[str, float]], elapsed: float) -> List[str]:
+    breaches = []
+    print(f"\n{'endpoint':<42}{'reqs':>7}{'rps':>8}{'err%':>7}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for name in sorted(stats):
+        s = stats[name]
+        error_rate = s.errors / s.count if s.count else 0.0
+        values = {"p50": s.percentile(0.50), "p95": s.percentile(0.95), "p99": s.percentile(0.99), "error_rate": error_rate}
+        print(f"{name:<42}{s.count:>7}{s.count / elapsed:>8.1f}{error_rate * 100:>6.1f}%"
+              f"{values['p50']:>8.0f}ms{values['p95']:>7.0f}ms{values['p99']:>7.0f}ms")
+        for key, limit in slos.get(name, slos["*"]).items():
+            if key in values and values[key] > limit:
+                breaches.append(f"{name} {key}={values[key]:.3g} > {limit:g}")
+    return breaches
+
+
+async def run(args) -> int:
+    if args.seed_users:
+        print(f"Seeding {args.seed_users} users x {args.history_days} days ...", flush=True)
+        await seed_database(args.seed_users, args.history_days, args.samples_per_day)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        upload_path = generate(os.path.join(workdir, "export.zip"), args.upload_mb, args.seed, as_zip=True)
+        with open(upload_path, "rb") as f:
+            upload_bytes = f.read()
+
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    async with httpx.AsyncClient(base_url=args.base_url.rstrip("/") + "/api/v1", limits=limits,
+                                 timeout=args.timeout) as client:
+        test = LoadTest(client, random.Random(args.seed), upload_bytes, args.history_days)
+        await test.list_interventions()
+        for _ in range(max(0, 25 - len(test.intervention_ids))):
+            await test.create_intervention()
+        test.stats.clear()
+
+        print(f"Running {args.users} virtual users for {args.duration}s against {args.base_url} ...", flush=True)
+        start = perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(*(
+            virtual_user(test, deadline, args.think_time, args.seed + i) for i in range(args.users)
+        ))
+        elapsed = perf_counter() - start
+
+    breaches = report(test.stats, parse_slos(args.slo), elapsed)
+
+    if args.cleanup:
+        await cleanup_database()
+
+    if breaches:
+        print(f"\nSLO breached ({len(breaches)}):")
+        for breach in breaches:
+            print(f"  {breach}")
+        return 1
+    print("\nAll SLOs met")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--users", type=int, default=50, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=60, help="seconds of load")
+    parser.add_argument("--think-time", type=float, default=0.5, help="mean seconds between a user's requests")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--seed-users", type=int, default=0, help="synthetic users to seed via DATABASE_URL")
+    parser.add_argument("--history-days", type=int, default=365)
+    parser.add_argument("--samples-per-day", type=int, default=4, help="seeded samples per metric per day")
+    parser.add_argument("--upload-mb", type=float, default=1, help="size of the export used for uploads")
+    parser.add_argument("--slo", action="append", default=[],
+                        help='"ENDPOINT:p95=MS,p99=MS,error_rate=FRACTION"; ENDPOINT "*" sets the default')
+    parser.add_argument("--cleanup", action="store_true", help="delete seeded users afterwards")
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@
 Celery application for background job processing
 """
 from celery import Celery
+from celery.schedules import crontab
 from app.core.config import settings
 
 celery_app = Celery(
@@ -19,7 +20,30 @@ celery_app.conf.update(
     task_track_started=True,
     task_time_limit=30 * 60,  # 30 minutes
     task_soft_time_limit=25 * 60,  # 25 minutes
+    # Periodic tasks (run with: celery -A celery_app beat)
+    beat_schedule={
+        "apply-retention": {
+            "task": "apply_retention",
+            "schedule": crontab(hour=3, minute=0),
+        },
+        "detect-change-points": {
+            "task": "detect_change_points",
+            "schedule": crontab(hour=3, minute=30),
+        },
+        "recompute-changed-analyses": {
+            "task": "recompute_changed_analyses",
+            "schedule": crontab(hour=settings.ANALYSIS_RECOMPUTE_HOURS, minute="*/15"),
+            # A run still queued when the next one is due is dropped
+            "options": {"expires": 15 * 60},
+        },
+        "expire-upload-sessions": {
+            "task": "expire_upload_sessions",
+            "schedule": crontab(minute=45),
+        },
+    },
 )
 
 # Import tasks
 from app.tasks import health_data_tasks  # noqa
+from app.tasks import maintenance_tasks  # noqa
+from app.tasks import monitoring  # noqa
@@ -3,9 +3,16 @@ Database initialization script
 Creates tables and sets up TimescaleDB
 """
 import asyncio
-from sqlalchemy import text
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
 from app.core.database import engine, Base
 from app.core.config import settings
+from app.core.timescale import setup_timescaledb
+import app.models  # noqa: F401  (registers every table on Base.metadata)
 
 
 async def init_database():
@@ -13,46 +20,11 @@ async def init_database():
     async with engine.begin() as conn:
         # Create all tables
         await conn.run_sync(Base.metadata.create_all)
-        
-        # Enable TimescaleDB extension
-        if settings.TIMESCALEDB_ENABLED:
-            print("Enabling TimescaleDB extension...")
-            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS timescaledb;"))
-            
-            # Create hypertable
-            try:
-                print("Creating hypertable...")
-                await conn.execute(text(
-                    "SELECT create_hypertable('health_metrics', 'timestamp', "
-                    "chunk_time_interval => INTERVAL '7 days', "
-                    "if_not_exists => TRUE);"
-                ))
-                print("✓ Hypertable created")
-            except Exception as e:
-                print(f"Note: {e}")
-            
-            # Enable compression
-            try:
-                print("Enabling compression...")
-                await conn.execute(text(
-                    "ALTER TABLE health_metrics SET ("
-                    "timescaledb.compress, "
-                    "timescaledb.compress_segmentby = 'user_id, metric_type'"
-                    ");"
-                ))
-                print("✓ Compression enabled")
-            except Exception as e:
-                print(f"Note: {e}")
-            
-            # Add compression policy
-            try:
-                print("Adding compression policy...")
-                await conn.execute(text(
-                    "SELECT add_compression_policy('health_metrics', INTERVAL '7 days', if_not_exists => TRUE);"
-                ))
-                print("✓ Compression policy added")
-            except Exception as e:
-                print(f"Note: {e}")
+    
+    # Each TimescaleDB step commits on its own, after the tables exist
+    if settings.TIMESCALEDB_ENABLED:
+        print("Setting up TimescaleDB...")
+        await setup_timescaledb(engine, log=print)
     
     print("\n✓ Database initialization complete!")
 
@@ -0,0 +1,186 @@
+"""
+Convert an existing health_metrics table to the configured hypertable layout
+
+TimescaleDB can only add hash (space) partitioning to an empty hypertable, and
+older tables have a primary key on id alone, which a hypertable can't have.
+This script copies the data into a new hypertable built from the current
+settings (TIMESCALEDB_SPACE_PARTITIONS, TIMESCALEDB_CHUNK_INTERVAL_DAYS)
+and swaps it in:
+
+  1. create health_metrics_new with the (id, timestamp, user_id) primary key
+     and turn it into a hypertable
+  2. copy rows in time windows, one commit per window (safe to re-run:
+     an existing health_metrics_new is reused and copied rows are skipped)
+  3. in one transaction: lock the old table, check the row counts match,
+     rename old -> health_metrics_old, new -> health_metrics and recreate
+     the model's indexes
+  4. reapply compression settings and policies
+
+Stop Celery import workers before running it. Imports that write during the
+copy make the counts differ, and the swap then aborts; re-running copies the
+missing rows.
+
+Run from the backend directory:
+    python scripts/migrate_hypertable.py --dry-run
+    python scripts/migrate_hypertable.py --window-days 30
+    python scripts/migrate_hypertable.py --drop-old
+"""
+import argparse
+import asyncio
+import sys
+from datetime import timedelta
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.database import engine
+from app.core.timescale import (
+    HYPERTABLE,
+    chunk_interval_days,
+    create_hypertable_sql,
+    hypertable_dimensions,
+    setup_timescaledb,
+)
+from app.models.health_metric import HealthMetric
+
+NEW_TABLE = f"{HYPERTABLE}_new"
+OLD_TABLE = f"{HYPERTABLE}_old"
+PRIMARY_KEY = ("id", "timestamp", "user_id")
+
+
+def target_dimensions():
+    return ["timestamp", "user_id"] if settings.TIMESCALEDB_SPACE_PARTITIONS > 0 else ["timestamp"]
+
+
+async def primary_key_columns(table: str):
+    async with engine.connect() as conn:
+        result = await conn.execute(
+            text(
+                "SELECT a.attname FROM pg_index i "
+                "JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey) "
+                "WHERE i.indrelid = CAST(:table AS regclass) AND i.indisprimary"
+            ),
+            {"table": table},
+        )
+        return sorted(row[0] for row in result)
+
+
+async def create_new_table() -> bool:
+    """Create the target hypertable; False if it exists from an earlier run"""
+    async with engine.begin() as conn:
+        if (await conn.execute(text(f"SELECT to_regclass('{NEW_TABLE}')"))).scalar() is not None:
+            return False
+        await conn.execute(text(f"CREATE TABLE {NEW_TABLE} (LIKE {HYPERTABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+        await conn.execute(text(
+            f"ALTER TABLE {NEW_TABLE} ADD CONSTRAINT {NEW_TABLE}_pkey PRIMARY KEY ({', '.join(PRIMARY_KEY)})"
+        ))
+        await conn.execute(text(
+            f"ALTER TABLE {NEW_TABLE} ADD CONSTRAINT {NEW_TABLE}_user_id_fkey "
+            "FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE"
+        ))
+        await conn.execute(text(create_hypertable_sql(NEW_TABLE)))
+    return True
+
+
+async def copy_rows(window_days: int):
+    async with engine.connect() as conn:
+        bounds = (await conn.execute(text(f"SELECT min(timestamp), max(timestamp) FROM {HYPERTABLE}"))).one()
+    if bounds[0] is None:
+        print("No rows to copy")
+        return
+
+    start, last = bounds
+    window = timedelta(days=window_days)
+    copied = 0
+    while start <= last:
+        end = start + window
+        async with engine.begin() as conn:
+            result = await conn.execute(
+                text(
+                    f"INSERT INTO {NEW_TABLE} SELECT * FROM {HYPERTABLE} "
+                    "WHERE timestamp >= :start AND timestamp < :end "
+                    f"ON CONFLICT ({', '.join(PRIMARY_KEY)}) DO NOTHING"
+                ),
+                {"start": start, "end": end},
+            )
+        copied += result.rowcount
+        print(f"  {start:%Y-%m-%d} .. {end:%Y-%m-%d}: {result.rowcount} rows ({copied} total)")
+        start = end
+
+
+async def swap_tables(drop_old: bool):
+    async with engine.begin() as conn:
+        # Blocks writers (and readers) until the swap commits
+        await conn.execute(text(f"LOCK TABLE {HYPERTABLE} IN ACCESS EXCLUSIVE MODE"))
+        old_count = (await conn.execute(text(f"SELECT count(*) FROM {HYPERTABLE}"))).scalar()
+        new_count = (await conn.execute(text(f"SELECT count(*) FROM {NEW_TABLE}"))).scalar()
+        if old_count != new_count:
+            raise RuntimeError(
+                f"Row counts differ ({HYPERTABLE}={old_count}, {NEW_TABLE}={new_count}); "
+                "were imports running? Re-run to copy the missing rows."
+            )
+
+        await conn.execute(text(f"ALTER TABLE {HYPERTABLE} RENAME TO {OLD_TABLE}"))
+        indexes = await conn.execute(
+            text("SELECT indexname FROM pg_indexes WHERE tablename = :table"),
+            {"table": OLD_TABLE},
+        )
+        for (index,) in indexes.all():
+            await conn.execute(text(f'ALTER INDEX "{index}" RENAME TO "{index}_old"'))
+
+        await conn.execute(text(f"ALTER TABLE {NEW_TABLE} RENAME TO {HYPERTABLE}"))
+        await conn.execute(text(f"ALTER INDEX {NEW_TABLE}_pkey RENAME TO {HYPERTABLE}_pkey"))
+        await conn.run_sync(lambda sync_conn: [index.create(sync_conn) for index in HealthMetric.__table__.indexes])
+
+        if drop_old:
+            await conn.execute(text(f"DROP TABLE {OLD_TABLE}"))
+
+
+async def migrate(window_days: int, drop_old: bool, dry_run: bool, force: bool):
+    dimensions = await hypertable_dimensions(engine)
+    primary_key = await primary_key_columns(HYPERTABLE)
+    print(f"Current: dimensions={dimensions or 'none (plain table)'}, primary key={primary_key}")
+    print(
+        f"Target:  dimensions={target_dimensions()}, primary key={sorted(PRIMARY_KEY)}, "
+        f"chunk interval={chunk_interval_days()} days, partitions={settings.TIMESCALEDB_SPACE_PARTITIONS}"
+    )
+
+    if dimensions == target_dimensions() and primary_key == sorted(PRIMARY_KEY) and not force:
+        print("Already up to date (use --force to rebuild anyway)")
+        return
+    if dry_run:
+        return
+
+    if await create_new_table():
+        print(f"Created {NEW_TABLE}")
+    else:
+        print(f"Resuming into existing {NEW_TABLE}")
+    print(f"Copying rows in {window_days}-day windows ...")
+    await copy_rows(window_days)
+    print("Swapping tables ...")
+    await swap_tables(drop_old)
+    print("Applying compression settings and policies ...")
+    await setup_timescaledb(engine, log=print)
+
+    print(f"\n✓ {HYPERTABLE} migrated" + ("" if drop_old else f"; old data kept in {OLD_TABLE}"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--window-days", type=int, default=30, help="time window copied per transaction")
+    parser.add_argument("--drop-old", action="store_true", help=f"drop {OLD_TABLE} after the swap")
+    parser.add_argument("--dry-run", action="store_true", help="only report the current and target layout")
+    parser.add_argument("--force", action="store_true", help="rebuild even if the layout already matches")
+    args = parser.parse_args()
+
+    if not settings.TIMESCALEDB_ENABLED:
+        parser.error("TIMESCALEDB_ENABLED is false")
+    asyncio.run(migrate(args.window_days, args.drop_old, args.dry_run, args.force))
+
+
+if __name__ == "__main__":
+    main()
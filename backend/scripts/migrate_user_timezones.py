@@ -0,0 +1,60 @@
+"""
+Clear the 'UTC' timezone that older user rows got by default
+
+users.timezone used to default to 'UTC', so existing users all have it set
+even though they never chose a timezone. A timezone buckets samples into
+local days by that zone; without one each record's own UTC offset is used,
+which is what samples imported before local-day bucketing already reflect.
+Left as 'UTC', new imports for these users would put evening samples on the
+next day.
+
+The default left no trace of who picked 'UTC' themselves, so this sets
+every 'UTC' to NULL except the users passed with --keep. For someone who
+really lives in UTC the result is the same anyway, since their records
+carry a +0000 offset. Their samples keep their dates: no re-bucketing is
+needed.
+
+Run from the backend directory:
+    python scripts/migrate_user_timezones.py --dry-run
+    python scripts/migrate_user_timezones.py --keep <user_id> --keep <user_id>
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+from uuid import UUID
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import func, select, update
+
+from app.core.database import engine
+from app.models.user import User
+
+
+async def migrate(keep, dry_run: bool):
+    condition = [User.timezone == "UTC"]
+    if keep:
+        condition.append(User.id.notin_(keep))
+
+    async with engine.begin() as conn:
+        count = (await conn.execute(select(func.count()).select_from(User).where(*condition))).scalar()
+        print(f"{count} user(s) with the old 'UTC' default" + (f" ({len(keep)} kept)" if keep else ""))
+        if dry_run or not count:
+            return
+        result = await conn.execute(update(User).where(*condition).values(timezone=None))
+    print(f"\n✓ Cleared the timezone of {result.rowcount} user(s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keep", type=UUID, action="append", default=[], help="user id whose 'UTC' is deliberate")
+    parser.add_argument("--dry-run", action="store_true", help="only count the users that would change")
+    args = parser.parse_args()
+
+    asyncio.run(migrate(args.keep, args.dry_run))
+
+
+if __name__ == "__main__":
+    main()